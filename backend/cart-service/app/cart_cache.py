@@ -0,0 +1,83 @@
+"""
+Per-process cache of carts for Cart Service
+
+A cart only changes through its user's own cart requests, so CartDB serves
+repeat reads from here and writes every change it makes through to it.
+
+Every write increments the cart's ``version`` attribute (carts written
+before it existed count as version 0). Before serving a cached cart, CartDB
+reads just the stored version; a newer one (written by another worker or
+Lambda instance) drops the entry and the full cart is read instead. That
+projected read is smaller than the cart, but still a round trip. A read
+never replaces a newer cached cart, and CartDB's writes are conditional on
+the version they started from, so a stale cached cart is re-read instead of
+written over. Paths that must see every committed write read with
+``consistent=True`` and skip the cache. Entries expire after
+CART_CACHE_TTL_SECONDS.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, Callable
+
+from shared.env_config import config
+from shared import metrics
+
+
+def cart_version(cart: Dict[str, Any]) -> int:
+    """Version of a cart item (0 if it was never written with one)"""
+    return int(cart.get('version', 0))
+
+
+class CartCache:
+    """Bounded cache of carts by user_id (thread-safe; hands out copies)"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_items: Optional[int] = None):
+        self.ttl_seconds = config.CART_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_items = config.CART_CACHE_MAX_ITEMS if max_items is None else max_items
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str,
+            stored_version: Optional[Callable[[], Optional[int]]] = None) -> Optional[Dict[str, Any]]:
+        """The cached cart, or None if it is not cached, has expired or ``stored_version()`` is newer"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[user_id]
+                entry = None
+        if entry is not None and stored_version is not None:
+            version = stored_version()
+            if version is not None and version > cart_version(entry[1]):
+                with self._lock:
+                    if self._entries.get(user_id) is entry:
+                        del self._entries[user_id]
+                entry = None
+        metrics.record_cache_lookup("carts", entry is not None)
+        return copy.deepcopy(entry[1]) if entry is not None else None
+
+    def put(self, cart: Dict[str, Any], written: bool = False):
+        """Cache a cart just read, unless a newer version of it is cached, or just ``written`` (always cached)"""
+        if self.ttl_seconds <= 0:
+            return
+        user_id = cart['user_id']
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if not written and entry is not None and cart_version(entry[1]) > cart_version(cart):
+                return
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(cart))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Drop one user's cart (after a write outside CartDB), or all of them"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+cart_cache = CartCache()
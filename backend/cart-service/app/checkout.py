@@ -0,0 +1,393 @@
+"""
+Transactional checkout for Cart Service
+
+A checkout is one TransactWriteItems call. For every cart line it either
+consumes the line's stock reservations or, for lines without one,
+decrements product stock with a ``stock >= :q`` condition. It also clears
+the cart under an ``updated_at`` condition. Either everything is applied
+or nothing is, and the cancellation reasons say which lines failed.
+
+Carts needing more actions than one transaction allows are split into
+chunks. Each chunk is atomic and removes its own lines from the cart, so
+a failure in a later chunk leaves the earlier lines checked out. A line
+holding too many reservations for one transaction (one per add) first
+has them merged into one reservation, atomically with the cart update,
+so its stock is never released along the way.
+"""
+import logging
+import random
+import time
+import uuid
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable
+
+from botocore.exceptions import ClientError
+
+from shared.env_config import config
+from shared.dynamodb_utils import (
+    TRANSACTION_MAX_ITEMS,
+    batch_get_items,
+    get_dynamodb_resource,
+    safe_get_item,
+    transact_write_items
+)
+from .database import convert_floats_to_decimals
+from .cart_cache import cart_cache
+
+logger = logging.getLogger(__name__)
+
+# Attempts per chunk when transactions on the same items collide
+CONFLICT_ATTEMPTS = 3
+
+# Actions a line may have, leaving room for the cart update and a stock decrement replacing expired reservations
+LINE_MAX_ACTIONS = TRANSACTION_MAX_ITEMS - 2
+
+# Reservations merged per transaction (their deletes, the merged reservation and the cart update)
+MERGE_BATCH = TRANSACTION_MAX_ITEMS - 2
+
+
+class CheckoutLine:
+    """A cart line and the transaction actions that check it out"""
+
+    def __init__(self, item: Dict[str, Any]):
+        self.item = item
+        self.product_id = item['product_id']
+        self.quantity = int(item['quantity'])
+        # (reservation_id, None) consumes a reservation, (None, quantity) decrements stock
+        self.actions = [(reservation_id, None) for reservation_id in item.get('reservation_ids', [])]
+        if not self.actions:
+            self.actions = [(None, self.quantity)]
+        self.status = 'not_attempted'
+        self.reason: Optional[str] = None
+        self.available: Optional[int] = None
+        self.fell_back = False
+        self.checkout_reservations: List[str] = []
+
+    def fall_back_to_stock(self):
+        """Replace reservations that no longer exist by a conditional stock decrement"""
+        reservations = get_dynamodb_resource().Table(config.RESERVATIONS_TABLE_NAME)
+        live, reserved = [], 0
+        for reservation_id, _ in self.actions:
+            if reservation_id is None:
+                continue
+            reservation = safe_get_item(reservations, {'reservation_id': reservation_id})
+            if reservation is not None:
+                live.append((reservation_id, None))
+                reserved += int(reservation['quantity'])
+        self.actions = live
+        if self.quantity > reserved:
+            self.actions.append((None, self.quantity - reserved))
+        self.fell_back = True
+
+    def use_reservation(self, reservation_id: str):
+        """Replace the stock decrement by a reservation made for the checkout"""
+        self.actions = [action for action in self.actions if action[0] is not None] + [(reservation_id, None)]
+        self.checkout_reservations.append(reservation_id)
+
+    def to_response(self) -> Dict[str, Any]:
+        """Outcome of this line for the checkout response"""
+        return {
+            'product_id': self.product_id,
+            'quantity': self.quantity,
+            'price': float(self.item['price']),
+            'status': self.status,
+            'reason': self.reason,
+            'available': self.available
+        }
+
+
+def _line_action(line: CheckoutLine, reservation_id: Optional[str], quantity: Optional[int]) -> Dict[str, Any]:
+    if reservation_id is not None:
+        # The reserved units are already out of stock; consuming the reservation keeps them out
+        return {'Delete': {
+            'TableName': config.RESERVATIONS_TABLE_NAME,
+            'Key': {'reservation_id': reservation_id},
+            'ConditionExpression': 'attribute_exists(reservation_id) AND product_id = :product_id',
+            'ExpressionAttributeValues': {':product_id': line.product_id}
+        }}
+    return {'Update': {
+        'TableName': config.PRODUCTS_TABLE_NAME,
+        'Key': {'id': line.product_id},
+        'UpdateExpression': 'SET stock = stock - :quantity',
+        # Products with sharded stock counters are reserved through product-service instead
+        'ConditionExpression': 'attribute_exists(id) AND attribute_not_exists(stock_shards) AND stock >= :quantity',
+        'ExpressionAttributeValues': {':quantity': quantity},
+        'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+    }}
+
+
+def _chunk_size(chunk: List[CheckoutLine]) -> int:
+    """Actions in a chunk's transaction, its cart update included"""
+    return sum(len(line.actions) for line in chunk) + 1
+
+
+def _next_chunk(lines: List[CheckoutLine]) -> List[CheckoutLine]:
+    """The leading lines whose actions plus the cart update fit in one transaction (at least one line)"""
+    chunk = []
+    for line in lines:
+        if chunk and _chunk_size(chunk + [line]) > TRANSACTION_MAX_ITEMS:
+            break
+        chunk.append(line)
+    return chunk
+
+
+class Checkout:
+    """Checks out a user's cart in as few transactions as possible"""
+
+    def __init__(self, user_id: str, cart: Dict[str, Any],
+                 reserve: Optional[Callable[[str, int], Optional[str]]] = None,
+                 release: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        """`reserve`/`release` reserve stock through product-service, for products with sharded stock"""
+        self.user_id = user_id
+        self.reserve = reserve
+        self.release = release
+        self.cart_updated_at = cart.get('updated_at')
+        self.lines = [CheckoutLine(item) for item in cart.get('items', [])]
+
+    def run(self) -> Dict[str, Any]:
+        """Check out every line; returns the overall status and the outcome per line"""
+        pending = list(self.lines)
+        try:
+            if all(self._merge_reservations(line) for line in self.lines):
+                while pending:
+                    chunk = _next_chunk(pending)
+                    if not self._commit_chunk(chunk, pending):
+                        break
+                    pending = [line for line in pending if line not in chunk]
+        finally:
+            # The transactions write the cart without going through CartDB
+            cart_cache.invalidate(self.user_id)
+
+        checked_out = [line for line in self.lines if line.status == 'checked_out']
+        if len(checked_out) == len(self.lines):
+            status = 'completed'
+        elif checked_out:
+            status = 'partial'
+        else:
+            status = 'failed'
+        return {
+            'status': status,
+            'lines': [line.to_response() for line in self.lines],
+            'total': sum(float(line.item['price']) * line.quantity for line in checked_out)
+        }
+
+    def _commit_chunk(self, chunk: List[CheckoutLine], pending: List[CheckoutLine]) -> bool:
+        """Apply one chunk atomically (dropping trailing lines that no longer fit); False if it was cancelled"""
+        conflicts = 0
+        while True:
+            # A stock decrement replacing expired reservations may have outgrown the transaction
+            while len(chunk) > 1 and _chunk_size(chunk) > TRANSACTION_MAX_ITEMS:
+                chunk.pop()
+            remaining = [line for line in pending if line not in chunk]
+            actions, owners = [], []
+            for line in chunk:
+                for reservation_id, quantity in line.actions:
+                    actions.append(_line_action(line, reservation_id, quantity))
+                    owners.append((line, 'reservation' if reservation_id else 'stock'))
+            actions.append(self._cart_action([line.item for line in remaining]))
+            owners.append((None, 'cart'))
+
+            reasons = self._transact(actions, chunk)
+            if reasons is None:
+                return False
+            if not reasons:
+                for line in chunk:
+                    line.status = 'checked_out'
+                self.cart_updated_at = actions[-1]['Update']['ExpressionAttributeValues'][':updated_at']
+                return True
+
+            failed = [
+                (line, kind, reason) for (line, kind), reason in zip(owners, reasons)
+                if reason.get('Code') != 'None'
+            ]
+            if any(reason['Code'] == 'TransactionConflict' for _, _, reason in failed):
+                conflicts += 1
+                if conflicts < CONFLICT_ATTEMPTS:
+                    time.sleep(random.uniform(0, 0.05 * 2 ** conflicts))
+                    continue
+
+            # Reservations that expired and were returned to stock: take the units from stock instead
+            expired = {
+                line for line, kind, reason in failed
+                if kind == 'reservation' and reason['Code'] == 'ConditionalCheckFailed' and not line.fell_back
+            }
+            if expired:
+                for line in expired:
+                    line.fall_back_to_stock()
+                continue
+
+            # Sharded stock can't be decremented in this transaction: reserve it, then consume the reservation
+            if self._reserve_sharded(failed):
+                continue
+
+            self._record_failures(chunk, failed)
+            self._release_checkout_reservations(chunk)
+            return False
+
+    def _merge_reservations(self, line: CheckoutLine) -> bool:
+        """Merge a line's reservations until the line fits a transaction; False (checkout failed) if that failed"""
+        dropped = False
+        conflicts = 0
+        while len(line.actions) > LINE_MAX_ACTIONS:
+            batch = [reservation_id for reservation_id, _ in line.actions[:MERGE_BATCH]]
+            rest = line.actions[len(batch):]
+            live = [
+                reservation for reservation in batch_get_items(
+                    config.RESERVATIONS_TABLE_NAME, [{'reservation_id': reservation_id} for reservation_id in batch]
+                )
+                if reservation['product_id'] == line.product_id
+            ]
+            dropped = dropped or len(live) < len(batch)
+            if not live:
+                # All of them expired: they no longer hold stock, the fallback below takes it from stock
+                line.actions = rest
+                continue
+
+            merged_id = str(uuid.uuid4())
+            now = int(time.time())
+            item = dict(line.item, reservation_ids=[merged_id] + [reservation_id for reservation_id, _ in rest])
+            actions = [_line_action(line, reservation['reservation_id'], None) for reservation in live]
+            actions.append({'Put': {
+                'TableName': config.RESERVATIONS_TABLE_NAME,
+                'Item': {
+                    'reservation_id': merged_id,
+                    'product_id': line.product_id,
+                    'quantity': sum(int(reservation['quantity']) for reservation in live),
+                    'owner': self.user_id,
+                    'created_at': now,
+                    # Held no longer than the earliest of the merged reservations
+                    'expires_at': min(int(reservation['expires_at']) for reservation in live)
+                },
+                'ConditionExpression': 'attribute_not_exists(reservation_id)'
+            }})
+            actions.append(self._cart_action(
+                [item if other is line else other.item for other in self.lines]
+            ))
+
+            reasons = self._transact(actions, self.lines, line)
+            if reasons is None:
+                return False
+            if not reasons:
+                line.item = item
+                line.actions = [(merged_id, None)] + rest
+                self.cart_updated_at = actions[-1]['Update']['ExpressionAttributeValues'][':updated_at']
+                continue
+
+            owners = [(line, 'reservation')] * len(live) + [(line, 'reservation'), (None, 'cart')]
+            failed = [
+                (owner, kind, reason) for (owner, kind), reason in zip(owners, reasons)
+                if reason.get('Code') != 'None'
+            ]
+            # A reservation expired or another transaction touched them since they were read: read them again
+            retryable = all(
+                kind == 'reservation' or reason['Code'] == 'TransactionConflict' for _, kind, reason in failed
+            )
+            conflicts += 1
+            if retryable and conflicts < CONFLICT_ATTEMPTS:
+                time.sleep(random.uniform(0, 0.05 * 2 ** conflicts))
+                continue
+            self._record_failures(self.lines, failed)
+            return False
+
+        if dropped:
+            # Expired reservations were dropped: take the units they held from stock instead
+            line.fall_back_to_stock()
+        return True
+
+    def _transact(self, actions: List[Dict[str, Any]], chunk: List[CheckoutLine],
+                  line: Optional[CheckoutLine] = None) -> Optional[List[Dict[str, Any]]]:
+        """transact_write_items; None (with the chunk failed) if DynamoDB rejected the request as invalid"""
+        try:
+            return transact_write_items(actions, client_request_token=str(uuid.uuid4()))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ValidationException':
+                raise
+            logger.error(f"Checkout transaction for {self.user_id} rejected: {e}")
+            for chunk_line in chunk:
+                chunk_line.status = 'failed'
+                chunk_line.reason = 'invalid_request' if line in (None, chunk_line) else 'not_applied'
+            self._release_checkout_reservations(chunk)
+            return None
+
+    def _reserve_sharded(self, failed: List[tuple]) -> bool:
+        """Reserve the units of lines whose product uses sharded stock; True if any were reserved"""
+        if self.reserve is None:
+            return False
+        reserved = False
+        for line, kind, reason in failed:
+            if kind != 'stock' or reason['Code'] != 'ConditionalCheckFailed' or line.checkout_reservations:
+                continue
+            product = reason.get('Item') or self._read_product(line.product_id)
+            if not product or not product.get('stock_shards'):
+                continue
+            quantity = sum(q for reservation_id, q in line.actions if reservation_id is None)
+            reservation_id = self.reserve(line.product_id, quantity)
+            if reservation_id is None:
+                continue
+            line.use_reservation(reservation_id)
+            reserved = True
+        return reserved
+
+    def _release_checkout_reservations(self, chunk: List[CheckoutLine]):
+        """Give back reservations made for a checkout that was cancelled"""
+        reservations = [
+            {'product_id': line.product_id, 'reservation_ids': line.checkout_reservations}
+            for line in chunk if line.checkout_reservations
+        ]
+        if reservations and self.release is not None:
+            self.release(reservations)
+
+    def _cart_action(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Set the cart's items (removing a chunk's lines), unless the cart changed since it was read"""
+        values = {
+            ':items': convert_floats_to_decimals(items),
+            ':updated_at': datetime.utcnow().isoformat(),
+            ':one': 1
+        }
+        if self.cart_updated_at:
+            condition = 'updated_at = :seen'
+            values[':seen'] = self.cart_updated_at
+        else:
+            condition = 'attribute_not_exists(updated_at)'
+        return {'Update': {
+            'TableName': config.CARTS_TABLE_NAME,
+            'Key': {'user_id': self.user_id},
+            # Bumping the version makes cart caches in other processes re-read before writing
+            'UpdateExpression': 'SET #items = :items, updated_at = :updated_at ADD #version :one',
+            'ConditionExpression': condition,
+            'ExpressionAttributeNames': {'#items': 'items', '#version': 'version'},
+            'ExpressionAttributeValues': values
+        }}
+
+    def _record_failures(self, chunk: List[CheckoutLine], failed: List[tuple]):
+        for line in chunk:
+            line.status = 'failed'
+        for line, kind, reason in failed:
+            code = reason['Code']
+            if kind == 'cart':
+                for chunk_line in chunk:
+                    chunk_line.reason = chunk_line.reason or ('cart_changed' if code == 'ConditionalCheckFailed' else code)
+            elif code == 'TransactionConflict':
+                line.reason = 'conflict'
+            elif code != 'ConditionalCheckFailed':
+                line.reason = code
+            elif kind == 'reservation':
+                line.reason = 'reservation_expired'
+            else:
+                product = reason.get('Item') or self._read_product(line.product_id)
+                if product is None:
+                    line.reason = 'product_not_found'
+                else:
+                    line.reason = 'insufficient_stock'
+                    line.available = int(product.get('stock', 0))
+        for line in chunk:
+            if line.reason is None:
+                # Cancelled because of another line in the same transaction
+                line.reason = 'not_applied'
+        logger.info(f"Checkout for {self.user_id} cancelled: " + ", ".join(
+            f"{line.product_id}={line.reason}" for line in chunk if line.reason != 'not_applied'))
+
+    def _read_product(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """Current product item, for stock failures reported without the item"""
+        products = get_dynamodb_resource().Table(config.PRODUCTS_TABLE_NAME)
+        return safe_get_item(products, {'id': product_id})
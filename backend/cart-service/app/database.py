@@ -4,23 +4,32 @@ Database configuration for Cart Service - DynamoDB
 import os
 import sys
 import uuid
+import logging
 from decimal import Decimal
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 from datetime import datetime
 from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
 
 # Add shared module to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
 
 from shared.dynamodb_utils import (
     get_dynamodb_resource, 
+    call_with_retry,
     create_table_if_not_exists,
     safe_get_item,
     safe_put_item,
-    safe_update_item,
     safe_delete_item,
-    safe_query
+    safe_query,
+    conditional_update_item
 )
+from .cart_cache import cart_cache, cart_version
+
+logger = logging.getLogger(__name__)
+
+# Attempts of a cart write when the cart changed since it was read (another request, worker or Lambda)
+WRITE_ATTEMPTS = 3
 
 def convert_floats_to_decimals(obj):
     """Recursively convert float values to Decimal for DynamoDB compatibility"""
@@ -65,13 +74,39 @@ class CartDB:
     def __init__(self):
         self.table = get_carts_table()
     
-    def get_cart(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """Get cart by user ID"""
-        item = safe_get_item(self.table, {'user_id': user_id})
+    def get_cart(self, user_id: str, consistent: bool = False) -> Optional[Dict[str, Any]]:
+        """Get cart by user ID, from the cart cache when its stored version is not newer.
+
+        ``consistent`` skips the cache and makes a strongly consistent read,
+        for paths that must see every committed write (checkout).
+        """
+        if not consistent:
+            cart = cart_cache.get(user_id, stored_version=lambda: self._stored_version(user_id))
+            if cart is not None:
+                return cart
+        item = safe_get_item(self.table, {'user_id': user_id}, consistent_read=consistent)
         if item:
-            return self._convert_decimals(item)
+            cart = self._convert_decimals(item)
+            cart_cache.put(cart)
+            return cart
         return None
     
+    def _stored_version(self, user_id: str) -> Optional[int]:
+        """Version of the stored cart (a projected read), or None if it was not found or the read failed"""
+        try:
+            response = call_with_retry(
+                'GetItem', self.table.get_item,
+                Key={'user_id': user_id},
+                ProjectionExpression='#user_id, #version',
+                ExpressionAttributeNames={'#user_id': 'user_id', '#version': 'version'},
+                ReturnConsumedCapacity='TOTAL'
+            )
+        except ClientError as e:
+            logger.error(f"Error reading cart version: {e}")
+            return None
+        item = response.get('Item')
+        return cart_version(item) if item else None
+    
     def create_cart(self, user_id: str) -> str:
         """Create a new cart for user"""
         cart_id = str(uuid.uuid4())
@@ -84,34 +119,29 @@ class CartDB:
         }
         
         success = safe_put_item(self.table, cart_data)
+        if success:
+            cart_cache.put(cart_data, written=True)
         return cart_id if success else None
     
-    def add_item_to_cart(self, user_id: str, product_id: str, quantity: int, price: float) -> bool:
+    def add_item_to_cart(self, user_id: str, product_id: str, quantity: int, price: float,
+                         reservation_id: Optional[str] = None) -> bool:
         """Add item to cart or update quantity if exists"""
-        cart = self.get_cart(user_id)
-        
-        if not cart:
+        if not self.get_cart(user_id):
             # Create new cart
             cart_id = self.create_cart(user_id)
             if not cart_id:
                 return False
-            cart = self.get_cart(user_id)
         
-        # Find existing item
-        items = cart.get('items', [])
-        existing_item = None
-        item_index = -1
-        
-        for i, item in enumerate(items):
-            if item['product_id'] == product_id:
-                existing_item = item
-                item_index = i
-                break
-        
-        if existing_item:
-            # Update existing item
-            items[item_index]['quantity'] = existing_item['quantity'] + quantity
-        else:
+        def add(cart: Dict[str, Any]) -> List[Dict[str, Any]]:
+            items = [dict(item) for item in cart.get('items', [])]
+            for item in items:
+                if item['product_id'] == product_id:
+                    # Update existing item
+                    item['quantity'] = item['quantity'] + quantity
+                    if reservation_id:
+                        item['reservation_ids'] = item.get('reservation_ids', []) + [reservation_id]
+                    return items
+            
             # Add new item
             new_item = {
                 'id': str(uuid.uuid4()),
@@ -119,52 +149,26 @@ class CartDB:
                 'quantity': quantity,
                 'price': Decimal(str(price))
             }
+            if reservation_id:
+                new_item['reservation_ids'] = [reservation_id]
             items.append(new_item)
+            return items
         
-        # Update cart - convert all floats to Decimals for DynamoDB
-        return safe_update_item(
-            self.table,
-            {'user_id': user_id},
-            'SET #items = :items, updated_at = :updated_at',
-            {
-                ':items': convert_floats_to_decimals(items),
-                ':updated_at': datetime.utcnow().isoformat()
-            },
-            expression_attribute_names={'#items': 'items'}
-        )
+        return self._update_items(user_id, add) is not None
     
-    def remove_item_from_cart(self, user_id: str, product_id: str) -> bool:
-        """Remove item from cart"""
-        cart = self.get_cart(user_id)
-        if not cart:
-            return False
-        
-        items = cart.get('items', [])
-        updated_items = [item for item in items if item['product_id'] != product_id]
-        
-        return safe_update_item(
-            self.table,
-            {'user_id': user_id},
-            'SET #items = :items, updated_at = :updated_at',
-            {
-                ':items': convert_floats_to_decimals(updated_items),
-                ':updated_at': datetime.utcnow().isoformat()
-            },
-            expression_attribute_names={'#items': 'items'}
+    def remove_item_from_cart(self, user_id: str, product_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Remove item from cart; returns the removed items, or None if the cart doesn't exist"""
+        cart = self._update_items(
+            user_id, lambda cart: [item for item in cart.get('items', []) if item['product_id'] != product_id]
         )
+        if cart is None:
+            return None
+        return [item for item in cart.get('items', []) if item['product_id'] == product_id]
     
-    def clear_cart(self, user_id: str) -> bool:
-        """Clear all items from cart"""
-        return safe_update_item(
-            self.table,
-            {'user_id': user_id},
-            'SET #items = :items, updated_at = :updated_at',
-            {
-                ':items': [],
-                ':updated_at': datetime.utcnow().isoformat()
-            },
-            expression_attribute_names={'#items': 'items'}
-        )
+    def clear_cart(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Clear all items from cart; returns the removed items, or None if the cart doesn't exist"""
+        cart = self._update_items(user_id, lambda cart: [])
+        return cart.get('items', []) if cart is not None else None
     
     def calculate_cart_total(self, cart: Dict[str, Any]) -> float:
         """Calculate total price of cart"""
@@ -173,6 +177,50 @@ class CartDB:
             total += float(item['price']) * item['quantity']
         return total
     
+    def _update_items(self, user_id: str,
+                      update: Callable[[Dict[str, Any]], List[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Replace the cart's items by ``update(cart)`` if the cart is unchanged since it was read.
+
+        Starts from the cached cart; when its version no longer matches, the
+        cart is re-read consistently and ``update`` applied again.
+        Returns the cart the update was applied to, or None if there is no
+        cart or the write failed.
+        """
+        cart = self.get_cart(user_id)
+        for _ in range(WRITE_ATTEMPTS):
+            if not cart:
+                return None
+            values = {
+                ':items': convert_floats_to_decimals(update(cart)),
+                ':updated_at': datetime.utcnow().isoformat(),
+                ':one': 1
+            }
+            version = cart_version(cart)
+            if version:
+                condition = '#version = :seen'
+                values[':seen'] = version
+            else:
+                condition = 'attribute_not_exists(#version)'
+            try:
+                attributes = conditional_update_item(
+                    self.table,
+                    {'user_id': user_id},
+                    'SET #items = :items, updated_at = :updated_at ADD #version :one',
+                    condition,
+                    values,
+                    expression_attribute_names={'#items': 'items', '#version': 'version'}
+                )
+            except ClientError as e:
+                logger.error(f"Error updating cart: {e}")
+                return None
+            if attributes is not None:
+                cart_cache.put(self._convert_decimals(attributes), written=True)
+                return cart
+            # Changed by another request since it was read
+            cart = self.get_cart(user_id, consistent=True)
+        logger.warning(f"Cart for {user_id} kept changing; gave up after {WRITE_ATTEMPTS} attempts")
+        return None
+    
     def _convert_decimals(self, item: Dict[str, Any]) -> Dict[str, Any]:
         """Convert Decimal values to float for JSON serialization"""
         def convert_value(value):
@@ -4,10 +4,12 @@ Cart Service - FastAPI microservice for managing shopping carts
 import os
 import logging
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
 from mangum import Mangum
-from .routes import router
-from .database import create_tables
+from .routes import router, get_http_session
+from .database import create_tables, get_carts_table
+from shared.env_config import settings
+from shared.app_setup import setup_service_app
+from shared.dynamodb_utils import safe_get_item
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,14 +24,8 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Middleware (CORS, deadlines, timings) and error handlers
+setup_service_app(app)
 
 # Include routes
 app.include_router(router, prefix="/api")
@@ -46,6 +42,25 @@ async def root():
     }
 
 
+def init_service():
+    """Create long-lived clients once per process"""
+    get_carts_table()
+    if settings.USE_COGNITO_AUTH and settings.COGNITO_USER_POOL_ID:
+        from shared.cognito_auth import get_cognito_jwks
+        try:
+            get_cognito_jwks()
+        except Exception as e:
+            logger.warning(f"JWKS prefetch failed, will retry on first request: {e}")
+
+
+def warm_up():
+    """Prepare a server worker (app.server) before it accepts requests"""
+    init_service()
+    # Open a DynamoDB connection and import the HTTP client before the first request needs them
+    safe_get_item(get_carts_table(), {'user_id': '__warm-up__'})
+    get_http_session()
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", "8002"))
@@ -56,5 +71,15 @@ if __name__ == "__main__":
         reload=os.getenv("ENV", "local") == "local",
     )
 
-# AWS Lambda handler (for container image or ZIP with Lambda runtime)
-handler = Mangum(app)
\ No newline at end of file
+
+# The in-memory storage engine (STORAGE_BACKEND=memory) starts empty: give it this service's tables
+if settings.STORAGE_BACKEND == "memory":
+    create_tables()
+
+# Run one-time initialization during the Lambda init phase, not on the first request
+if settings.is_lambda():
+    init_service()
+
+# AWS Lambda handler (for container image or ZIP with Lambda runtime).
+# Lifespan events are skipped because Mangum would run them on every invocation.
+handler = Mangum(app, lifespan="off")
\ No newline at end of file
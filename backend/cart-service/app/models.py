@@ -1,8 +1,8 @@
 """
 Pydantic models for Cart Service
 """
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -16,8 +16,18 @@ class CartItemCreate(CartItemBase):
     pass
 
 
+class CartProduct(BaseModel):
+    """Current product details of a cart line (GET /cart?expand=products)"""
+    name: str
+    category: str
+    image_url: str
+    price: float
+    stock: int
+
+
 class CartItem(CartItemBase):
     id: str
+    product: Optional[CartProduct] = None
     
     class Config:
         from_attributes = True
@@ -40,7 +50,22 @@ class Cart(CartBase):
 
 class AddToCartRequest(BaseModel):
     product_id: str
-    quantity: int = 1
+    quantity: int = Field(default=1, ge=1)
+
+
+class CheckoutLine(BaseModel):
+    product_id: str
+    quantity: int
+    price: float
+    status: str
+    reason: Optional[str] = None
+    available: Optional[int] = None
+
+
+class CheckoutResponse(BaseModel):
+    status: str
+    lines: List[CheckoutLine]
+    total: float
 
 
 class LoginRequest(BaseModel):
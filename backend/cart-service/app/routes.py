@@ -2,22 +2,66 @@
 Routes for Cart Service
 """
 import uuid
-import requests
 import os
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+import time
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
 # Remove SQLAlchemy import
 from datetime import timedelta
-from typing import List
+from typing import List, Optional, Literal
 
+from shared.env_config import config
+from shared.instrumentation import track_call
+from shared.singleflight import SingleFlight
+from shared.product_repository import product_repository
+from shared.resilience import (
+    CircuitBreaker, CircuitOpenError, LatencyTracker, call_timeout, deadline_headers, hedged
+)
 from .database import get_db, CartDB
-from .models import Cart, CartItem, AddToCartRequest, LoginRequest, LoginResponse
+from .models import Cart, CartItem, CartProduct, AddToCartRequest, CheckoutResponse, LoginRequest, LoginResponse
+from .checkout import Checkout
 from .auth import create_access_token, verify_token, verify_user_token, authenticate_user, ACCESS_TOKEN_EXPIRE_MINUTES, MockCognitoAuth
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # Product service URL for validation
 PRODUCT_SERVICE_URL = os.getenv("PRODUCT_SERVICE_URL", "http://localhost:8001/api")
 
+# Pooled HTTP session for product-service calls; requests is imported on first use
+_http_session = None
+
+# Identical product lookups in flight at the same time share one request
+_product_reads = SingleFlight("product_lookups")
+
+# Fails product-service calls fast while most of them are failing
+_product_service_breaker = CircuitBreaker("product-service")
+
+# Recent product read latencies; a read slower than their p95 is hedged
+_product_read_latency = LatencyTracker()
+
+
+def get_http_session():
+    """Get the shared HTTP session for inter-service calls"""
+    global _http_session
+    if _http_session is None:
+        import requests
+        _http_session = requests.Session()
+    return _http_session
+
+
+def route_product_calls_to(app):
+    """Serve product-service calls from an ASGI app in this process (combined deployment)"""
+    global PRODUCT_SERVICE_URL
+    from shared.asgi_transport import ASGIAdapter
+    
+    base_url = "http://product-service.in-process"
+    get_http_session().mount(f"{base_url}/", ASGIAdapter(app))
+    PRODUCT_SERVICE_URL = f"{base_url}/api"
+
 
 @router.get("/health")
 async def health_check():
@@ -73,19 +117,24 @@ async def login(login_request: LoginRequest):
         )
 
 
-@router.get("/cart", response_model=Cart)
+@router.get("/cart", response_model=Cart, response_model_exclude_none=True)
 async def get_cart(
+    expand: Optional[Literal["products"]] = Query(
+        default=None,
+        description="'products' adds each line's current name, image, price and stock"
+    ),
     current_user=Depends(verify_user_token),
     db: CartDB = Depends(get_db)
 ):
     """Get user's cart"""
-    cart = db.get_cart(current_user.user_id)
+    # CartDB calls block (DynamoDB, retry backoff): they run in the threadpool
+    cart = await run_in_threadpool(db.get_cart, current_user.user_id)
     
     if not cart:
         # Create new cart if doesn't exist
-        cart_id = db.create_cart(current_user.user_id)
+        cart_id = await run_in_threadpool(db.create_cart, current_user.user_id)
         if cart_id:
-            cart = db.get_cart(current_user.user_id)
+            cart = await run_in_threadpool(db.get_cart, current_user.user_id)
         else:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -100,10 +149,19 @@ async def get_cart(
     created_at = datetime.fromisoformat(cart['created_at'])
     updated_at = datetime.fromisoformat(cart['updated_at']) if cart.get('updated_at') else created_at
     
+    items = [CartItem(**item) for item in cart.get('items', [])]
+    if expand == "products" and items:
+        # One BatchGetItem for the lines not in the product cache; deleted products stay unexpanded
+        products = await run_in_threadpool(product_repository.get_many, [item.product_id for item in items])
+        for item in items:
+            product = products.get(item.product_id)
+            if product is not None:
+                item.product = CartProduct(**product)
+
     cart_response = Cart(
         id=cart['id'],
         user_id=cart['user_id'],
-        items=[CartItem(**item) for item in cart.get('items', [])],
+        items=items,
         total=total,
         created_at=created_at,
         updated_at=updated_at
@@ -112,35 +170,166 @@ async def get_cart(
     return cart_response
 
 
-async def validate_product(product_id: str, quantity: int):
-    """Validate product exists and has sufficient stock"""
+def call_product_service(method: str, path: str, operation: str, hedge: bool = False, authenticated: bool = False,
+                         **kwargs):
+    """Call product-service behind the circuit breaker, within the request's deadline.
+
+    Raises HTTPException 504 once the deadline has passed and 503 when the
+    breaker is open or the call fails. ``hedge`` (idempotent calls only)
+    repeats a call slower than the recent p95 when PRODUCT_SERVICE_HEDGING is on.
+    ``authenticated`` calls (the reservation endpoints) carry SERVICE_API_KEY.
+    """
+    import requests
+    
+    timeout = call_timeout(config.PRODUCT_SERVICE_TIMEOUT_SECONDS)
+    if timeout <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Request deadline exceeded"
+        )
+    try:
+        _product_service_breaker.allow()
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Product service unavailable",
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+    
+    headers = deadline_headers(timeout)
+    if authenticated and config.SERVICE_API_KEY:
+        headers["X-Service-Key"] = config.SERVICE_API_KEY
+    
+    def send():
+        with track_call('http', operation):
+            return get_http_session().request(
+                method, f"{PRODUCT_SERVICE_URL}{path}", timeout=timeout, headers=headers, **kwargs
+            )
+    
+    started = time.perf_counter()
+    succeeded = False
     try:
-        response = requests.get(f"{PRODUCT_SERVICE_URL}/products/{product_id}")
-        if response.status_code == 404:
+        delay = _product_read_latency.percentile(95) if hedge and config.PRODUCT_SERVICE_HEDGING else None
+        response = hedged(operation, send, delay) if delay is not None else send()
+        succeeded = response.status_code < 500
+    except requests.RequestException as e:
+        logger.warning(f"{operation} failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Product service unavailable"
+        )
+    finally:
+        _product_service_breaker.record(succeeded)
+    
+    if hedge and succeeded:
+        _product_read_latency.observe(time.perf_counter() - started)
+    return response
+
+
+def fetch_product(product_id: str) -> dict:
+    """Get a product from product-service; 404 and an unavailable service raise HTTPException"""
+    response = call_product_service('GET', f"/products/{product_id}", 'product-service GET /products/{id}', hedge=True)
+    
+    if response.status_code == 404:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product with id {product_id} not found"
+        )
+    elif response.status_code != 200:
+        retry_after = response.headers.get("Retry-After")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Product service unavailable",
+            headers={"Retry-After": retry_after} if retry_after else None
+        )
+    
+    return response.json()
+
+
+def read_product(product_id: str) -> dict:
+    """Get a product's price and stock, from the products table or product-service (PRODUCT_READ_MODE)"""
+    if config.PRODUCT_READ_MODE == "direct":
+        product = product_repository.get(product_id)
+        if product is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Product with id {product_id} not found"
             )
-        elif response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Product service unavailable"
-            )
-        
-        product = response.json()
-        if product["stock"] < quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient stock. Available: {product['stock']}, Requested: {quantity}"
-            )
-        
         return product
-        
-    except requests.RequestException:
+    
+    # Concurrent adds of the same product share one product-service call (and its errors)
+    return _product_reads.do(product_id, fetch_product, product_id, timeout=config.SINGLEFLIGHT_TIMEOUT_SECONDS)
+
+
+async def validate_product(product_id: str, quantity: int):
+    """Validate product exists and has sufficient stock"""
+    product = await run_in_threadpool(read_product, product_id)
+    if product["stock"] < quantity:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Insufficient stock. Available: {product['stock']}, Requested: {quantity}"
+        )
+    
+    return product
+
+
+def post_reservation(product_id: str, quantity: int, user_id: str):
+    """Ask product-service to reserve stock; returns the HTTP response"""
+    response = call_product_service(
+        'POST', f"/products/{product_id}/reservations", 'product-service POST /products/{id}/reservations',
+        authenticated=True, json={"quantity": quantity, "owner": user_id}
+    )
+    if response.status_code in (401, 403):
+        # Misconfiguration, not an outage: SERVICE_API_KEY is unset in product-service or differs from ours
+        logger.error(f"Product service rejected the service key ({response.status_code}); check SERVICE_API_KEY")
+    return response
+
+
+async def reserve_stock(product_id: str, quantity: int, user_id: str) -> str:
+    """Reserve stock in product-service; returns the reservation id"""
+    # Blocking HTTP call (up to PRODUCT_SERVICE_TIMEOUT_SECONDS): keep it off the event loop
+    response = await run_in_threadpool(post_reservation, product_id, quantity, user_id)
+    
+    if response.status_code == 404:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product with id {product_id} not found"
+        )
+    elif response.status_code == 409:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=response.json().get("detail", "Insufficient stock")
+        )
+    elif response.status_code in (401, 403):
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Product service rejected the service key"
+        )
+    elif response.status_code != 201:
+        retry_after = response.headers.get("Retry-After")
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Product service unavailable"
+            detail="Product service unavailable",
+            headers={"Retry-After": retry_after} if retry_after else None
         )
+    
+    return response.json()["reservation_id"]
+
+
+def release_reservations(items: List[dict]):
+    """Return the stock reserved by cart items; failures are left to expire"""
+    for item in items:
+        for reservation_id in item.get('reservation_ids', []):
+            try:
+                response = call_product_service(
+                    'DELETE', f"/products/{item['product_id']}/reservations/{reservation_id}",
+                    'product-service DELETE /products/{id}/reservations/{id}', authenticated=True
+                )
+                # 404 means it was already released or expired
+                if response.status_code not in (200, 404):
+                    logger.warning(f"Releasing reservation {reservation_id} failed with {response.status_code}")
+            except HTTPException as e:
+                logger.warning(f"Releasing reservation {reservation_id} failed: {e.detail}")
 
 
 @router.post("/cart/add")
@@ -153,15 +342,22 @@ async def add_to_cart(
     # Validate product
     product = await validate_product(request.product_id, request.quantity)
     
+    # Hold the stock until the item leaves the cart (or the reservation expires)
+    reservation_id = await reserve_stock(request.product_id, request.quantity, current_user.user_id)
+    
     # Add item to cart
-    success = db.add_item_to_cart(
+    success = await run_in_threadpool(
+        db.add_item_to_cart,
         user_id=current_user.user_id,
         product_id=request.product_id,
         quantity=request.quantity,
-        price=product["price"]
+        price=product["price"],
+        reservation_id=reservation_id
     )
     
     if not success:
+        reserved = [{'product_id': request.product_id, 'reservation_ids': [reservation_id]}]
+        await run_in_threadpool(release_reservations, reserved)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to add product to cart"
@@ -177,14 +373,16 @@ async def remove_from_cart(
     db: CartDB = Depends(get_db)
 ):
     """Remove product from cart"""
-    success = db.remove_item_from_cart(current_user.user_id, product_id)
+    removed_items = await run_in_threadpool(db.remove_item_from_cart, current_user.user_id, product_id)
     
-    if not success:
+    if removed_items is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found in cart or cart doesn't exist"
         )
     
+    await run_in_threadpool(release_reservations, removed_items)
+    
     return {"message": "Product removed from cart successfully"}
 
 
@@ -194,12 +392,48 @@ async def clear_cart(
     db: CartDB = Depends(get_db)
 ):
     """Clear all items from cart"""
-    success = db.clear_cart(current_user.user_id)
+    removed_items = await run_in_threadpool(db.clear_cart, current_user.user_id)
     
-    if not success:
+    if removed_items is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cart not found"
+        )
+    
+    await run_in_threadpool(release_reservations, removed_items)
+    
+    return {"message": "Cart cleared successfully"}
+
+
+@router.post("/cart/checkout", response_model=CheckoutResponse)
+async def checkout(
+    response: Response,
+    current_user=Depends(verify_user_token),
+    db: CartDB = Depends(get_db)
+):
+    """Check out the cart: take its stock and clear it in one transaction"""
+    # Never check out a cached cart: it may miss a line added through another worker
+    cart = await run_in_threadpool(db.get_cart, current_user.user_id, consistent=True)
+    
+    if not cart:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cart not found"
         )
+    if not cart.get('items'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cart is empty"
+        )
+    
+    def reserve(product_id: str, quantity: int):
+        response = post_reservation(product_id, quantity, current_user.user_id)
+        return response.json()["reservation_id"] if response.status_code == 201 else None
+    
+    # Product-service calls and DynamoDB transactions block: run the checkout in the threadpool
+    checkout = Checkout(current_user.user_id, cart, reserve=reserve, release=release_reservations)
+    result = await run_in_threadpool(checkout.run)
+    if result['status'] != 'completed':
+        response.status_code = status.HTTP_409_CONFLICT
     
-    return {"message": "Cart cleared successfully"}
\ No newline at end of file
+    return CheckoutResponse(**result)
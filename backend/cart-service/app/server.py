@@ -0,0 +1,14 @@
+"""
+Production server for Cart Service: python -m app.server
+
+Runs one worker per available CPU (SERVER_WORKERS overrides it) behind
+gunicorn; see shared.server. The ``main`` module's uvicorn runner stays
+the development server.
+"""
+import os
+from shared.server import serve
+from .main import app, warm_up
+
+
+if __name__ == "__main__":
+    serve(app, port=int(os.getenv("PORT", "8002")), warm_up=warm_up)
@@ -0,0 +1 @@
+# Combined Service Package
@@ -0,0 +1,87 @@
+"""
+Combined Service - product-service and cart-service in one process
+
+For local and small deployments: both services' routes are served by one
+FastAPI app under their usual /api paths, sharing the DynamoDB clients,
+caches and worker processes. Cart-service's calls to product-service
+(product reads, reservations) go to this same app in-process instead of
+over HTTP. The services' own apps and Lambda handlers are unaffected.
+"""
+import os
+import logging
+from fastapi import FastAPI
+from mangum import Mangum
+from shared.app_setup import setup_service_app
+from shared.service_loader import load_service_module
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+product_main = load_service_module("product-service")
+cart_main = load_service_module("cart-service")
+product_routes = load_service_module("product-service", "routes")
+cart_routes = load_service_module("cart-service", "routes")
+product_catalog = load_service_module("product-service", "catalog")
+
+# Create FastAPI app
+app = FastAPI(
+    title="E-commerce Services",
+    description="Product and cart services served from one process",
+    version="1.0.0",
+    docs_url="/docs",
+    redoc_url="/redoc"
+)
+
+# Same middleware and error handlers as product-service (catalog response cache included)
+setup_service_app(app, catalog_version=product_catalog.catalog_version)
+
+
+# Registered before the services' routers, whose /api/health would otherwise answer
+@app.get("/api/health")
+async def health_check():
+    """Health check endpoint"""
+    return {"status": "healthy", "service": "combined-service", "services": ["product-service", "cart-service"]}
+
+
+# Include routes
+app.include_router(product_routes.router, prefix="/api")
+app.include_router(cart_routes.router, prefix="/api")
+
+# Cart -> product calls are answered by this app without leaving the process
+cart_routes.route_product_calls_to(app)
+
+
+@app.get("/")
+async def root():
+    """Root endpoint"""
+    return {
+        "service": "combined-service",
+        "version": "1.0.0",
+        "status": "running",
+        "docs": "/docs"
+    }
+
+
+def warm_up():
+    """Prepare a server worker (app.server) before it accepts requests"""
+    product_main.warm_up()
+    cart_main.warm_up()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    port = int(os.getenv("PORT", "8001"))
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=port,
+        reload=os.getenv("ENV", "local") == "local",
+    )
+
+
+# Lambda init-phase initialization already ran when the services' main modules were imported
+
+# AWS Lambda handler (for container image or ZIP with Lambda runtime).
+# Lifespan events are skipped because Mangum would run them on every invocation.
+handler = Mangum(app, lifespan="off")
@@ -0,0 +1,13 @@
+"""
+Production server for Combined Service: python -m app.server
+
+Runs one worker per available CPU (SERVER_WORKERS overrides it) behind
+gunicorn; see shared.server. Each worker serves both services.
+"""
+import os
+from shared.server import serve
+from .main import app, warm_up
+
+
+if __name__ == "__main__":
+    serve(app, port=int(os.getenv("PORT", "8001")), warm_up=warm_up)
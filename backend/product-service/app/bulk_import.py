@@ -0,0 +1,260 @@
+"""
+Bulk product import for Product Service
+
+Rows are read from CSV or NDJSON, validated against ProductCreate a batch
+at a time and written by a pool of threads sending BatchWriteItem calls
+(unprocessed items are resent with backoff). At most ``2 * workers``
+writes are in flight, so a file of any size streams through in constant
+memory and the write rate is bounded by the table's capacity.
+
+An imported row replaces the whole product item. Products using sharded
+stock are replaced in a transaction that also deletes their shard items,
+so the imported ``stock`` is the product's stock again, as after
+``disable_sharding``; a process still caching the shard count finds the
+shards gone and falls back to the product item.
+"""
+import codecs
+import csv
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from decimal import Decimal
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple, Callable
+
+from botocore.exceptions import ClientError
+from pydantic import TypeAdapter, ValidationError
+
+from shared.env_config import config
+from shared.dynamodb_utils import (
+    BATCH_WRITE_MAX_ITEMS,
+    DynamoDBError,
+    batch_get_items,
+    batch_write_items,
+    get_dynamodb_resource,
+    safe_get_item,
+    transact_write_items
+)
+from .database import _stock_shards
+from .models import ProductCreate
+from .stock import shard_id
+
+logger = logging.getLogger(__name__)
+
+# Rows validated together; large enough to amortise pydantic's per-call overhead
+VALIDATION_BATCH_ROWS = 1000
+
+# Rejected rows listed in the summary (the rest are only counted)
+MAX_REPORTED_ERRORS = 100
+
+# Attempts at replacing a sharded product whose shard count keeps changing
+SHARDED_PUT_ATTEMPTS = 3
+
+_rows_adapter = TypeAdapter(List[ProductCreate])
+
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Split a stream of byte chunks into text lines (keeping line endings, as csv expects)"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            yield line + '\n'
+    buffer += decoder.decode(b'', final=True)
+    if buffer:
+        yield buffer
+
+
+class ProductImporter:
+    """Validates product rows and writes them with parallel BatchWriteItem workers"""
+
+    def __init__(self, workers: Optional[int] = None, table_name: Optional[str] = None,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None, progress_every: int = 10000):
+        self.table_name = table_name or config.PRODUCTS_TABLE_NAME
+        self.workers = workers or config.IMPORT_WORKERS
+        self.progress = progress
+        self.progress_every = progress_every
+        self.rows = 0
+        self.imported = 0
+        self.invalid = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self._pending: deque = deque()
+        self._writes = set()
+        self._next_progress = progress_every
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="product-import")
+        self._started = time.perf_counter()
+
+    def run(self, lines: Iterable[str], fmt: str = 'ndjson') -> Dict[str, Any]:
+        """Import every row of a CSV or NDJSON line stream; returns the summary"""
+        batch = []
+        try:
+            for number, row in self._parse(lines, fmt):
+                batch.append((number, row))
+                if len(batch) >= VALIDATION_BATCH_ROWS:
+                    if not self.add_rows(batch):
+                        break
+                    batch = []
+            else:
+                self.add_rows(batch)
+        finally:
+            self.finish()
+        return self.summary()
+
+    def add_rows(self, rows: List[Tuple[int, Any]]) -> bool:
+        """Validate (row number, row) pairs and queue the valid ones; False once a write has failed"""
+        if self.error:
+            return False
+        self.rows += len(rows)
+
+        candidates = []
+        for number, row in rows:
+            if isinstance(row, dict):
+                candidates.append((number, row))
+            else:
+                self._reject(number, row if isinstance(row, str) else "Row is not an object")
+
+        try:
+            products = _rows_adapter.validate_python([row for _, row in candidates])
+        except ValidationError as e:
+            # Drop the rows named in the errors; the rest validate on their own
+            failed = {}
+            for error in e.errors():
+                index = error['loc'][0]
+                field = ".".join(str(part) for part in error['loc'][1:])
+                failed.setdefault(index, f"{field}: {error['msg']}" if field else error['msg'])
+            for index, message in failed.items():
+                self._reject(candidates[index][0], message)
+            candidates = [candidate for index, candidate in enumerate(candidates) if index not in failed]
+            products = _rows_adapter.validate_python([row for _, row in candidates])
+
+        for (_, row), product in zip(candidates, products):
+            item = product.model_dump()
+            item['id'] = str(row.get('id') or uuid.uuid4())
+            item['price'] = Decimal(str(item['price']))
+            self._pending.append(item)
+
+        self._submit_batches(flush=False)
+        return not self.error
+
+    def finish(self):
+        """Write the remaining rows and wait for every write to complete"""
+        if not self.error:
+            self._submit_batches(flush=True)
+        while self._writes:
+            self._collect(wait(self._writes).done)
+        self._executor.shutdown()
+        logger.info(
+            f"Product import finished: {self.imported} imported, {self.invalid} invalid "
+            f"of {self.rows} rows in {time.perf_counter() - self._started:.1f}s"
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        """Counts, throughput and rejected rows so far"""
+        seconds = time.perf_counter() - self._started
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'invalid': self.invalid,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(self.imported / seconds, 1) if seconds > 0 else 0.0,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+            'error': self.error
+        }
+
+    def _parse(self, lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, Any]]:
+        """Yield (row number, row); rows that can't be parsed are yielded as an error message"""
+        if fmt == 'csv':
+            for number, row in enumerate(csv.DictReader(lines), start=1):
+                yield number, row
+            return
+
+        number = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row = f"Invalid JSON: {e}"
+            yield number, row
+
+    def _reject(self, number: int, message: str):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': number, 'error': message})
+
+    def _submit_batches(self, flush: bool):
+        """Hand full batches (and on flush, the remainder) to the writers, waiting while too many are in flight"""
+        while len(self._pending) >= BATCH_WRITE_MAX_ITEMS or (flush and self._pending):
+            # One call can't put the same key twice; the later row wins
+            batch = {}
+            while self._pending and len(batch) < BATCH_WRITE_MAX_ITEMS:
+                item = self._pending.popleft()
+                batch[item['id']] = item
+
+            while len(self._writes) >= 2 * self.workers:
+                self._collect(wait(self._writes, return_when=FIRST_COMPLETED).done)
+            if self.error:
+                self._pending.clear()
+                return
+            self._writes.add(self._executor.submit(self._write, list(batch.values())))
+
+    def _write(self, items: List[Dict[str, Any]]) -> int:
+        """Put a batch of products (sharded ones with their shard items deleted); returns how many were written"""
+        existing = batch_get_items(
+            self.table_name, [{'id': item['id']} for item in items], ProjectionExpression='id, stock_shards'
+        )
+        sharded = {product['id']: int(product['stock_shards']) for product in existing if product.get('stock_shards')}
+        written = batch_write_items(self.table_name, [item for item in items if item['id'] not in sharded])
+        for item in items:
+            if item['id'] in sharded:
+                written += self._put_sharded(item, sharded[item['id']])
+        return written
+
+    def _put_sharded(self, item: Dict[str, Any], shards: int) -> int:
+        """Replace a product using sharded stock and delete its shard items atomically; returns 1 if written"""
+        for _ in range(SHARDED_PUT_ATTEMPTS):
+            if not shards:
+                return batch_write_items(self.table_name, [item])
+            actions = [{'Delete': {
+                'TableName': config.STOCK_SHARDS_TABLE_NAME,
+                'Key': {'shard_id': shard_id(item['id'], n)}
+            }} for n in range(shards)]
+            actions.append({'Put': {
+                'TableName': self.table_name,
+                'Item': item,
+                'ConditionExpression': 'stock_shards = :shards',
+                'ExpressionAttributeValues': {':shards': shards}
+            }})
+            if not transact_write_items(actions):
+                _stock_shards.pop(item['id'], None)
+                return 1
+            # Sharding was changed meanwhile: read the shard count again
+            product = safe_get_item(get_dynamodb_resource().Table(self.table_name), {'id': item['id']})
+            shards = int(product['stock_shards']) if product and product.get('stock_shards') else 0
+        logger.warning(f"Product {item['id']} not imported: its stock sharding kept changing")
+        return 0
+
+    def _collect(self, done):
+        for write in done:
+            self._writes.discard(write)
+            try:
+                self.imported += write.result()
+            except (DynamoDBError, ClientError) as e:
+                # Retries are exhausted (or the table rejects the writes): stop instead of failing every row
+                if not self.error:
+                    logger.error(f"Product import aborted: {e}")
+                    self.error = str(e)
+
+        if self.imported >= self._next_progress:
+            self._next_progress = (self.imported // self.progress_every + 1) * self.progress_every
+            summary = self.summary()
+            logger.info(f"Product import: {summary['imported']} imported ({summary['rows_per_second']:.0f} rows/s)")
+            if self.progress:
+                self.progress(summary)
@@ -0,0 +1,204 @@
+"""
+Columnar in-memory catalog snapshot for Product Service
+
+numpy is imported when the first snapshot is built, keeping it out of the
+service's import path.
+"""
+import logging
+import threading
+import time
+from typing import Optional, Dict, Any, Callable, Tuple
+
+from shared.env_config import config
+from shared.metrics import record_cache_lookup
+from .database import ProductDB
+from .snapshot import mapped_catalog, MappedCatalog
+from .product_store import ProductStore
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the price histogram buckets; the last bucket is open-ended
+PRICE_BUCKET_EDGES = (25.0, 50.0, 100.0, 250.0, 500.0, 1000.0)
+
+
+class CatalogSnapshot:
+    """Immutable columnar view of the products table used for aggregates"""
+
+    def __init__(self, store: ProductStore, version: int):
+        import numpy as np
+        
+        self.categories = sorted(store.categories)
+        self._category_index = {name: code for code, name in enumerate(self.categories)}
+
+        # Store codes are in first-seen order; renumber them to match the sorted names
+        recode = np.array([self._category_index[name] for name in store.categories], dtype=np.int32)
+        self.category_codes = recode[np.frombuffer(store.category_codes, dtype=np.uint32)]
+        self.price = np.frombuffer(store.price, dtype=np.float64)
+        self.stock = np.frombuffer(store.stock, dtype=np.int64)
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def from_mapped(cls, mapped: MappedCatalog, version: int) -> 'CatalogSnapshot':
+        """Snapshot whose columns are zero-copy views of a mapped snapshot file"""
+        import numpy as np
+        
+        snapshot = cls.__new__(cls)
+        snapshot.categories = list(mapped.categories)
+        snapshot._category_index = {name: code for code, name in enumerate(snapshot.categories)}
+        snapshot.category_codes = np.frombuffer(mapped.category_code, dtype=np.uint32)
+        snapshot.price = np.frombuffer(mapped.price, dtype=np.float64)
+        snapshot.stock = np.frombuffer(mapped.stock, dtype=np.int64)
+        snapshot.version = version
+        snapshot.loaded_at = time.monotonic()
+        return snapshot
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def facets(self, category: Optional[str] = None, min_price: Optional[float] = None,
+               max_price: Optional[float] = None, in_stock: Optional[bool] = None) -> Dict[str, Any]:
+        """Compute facet counts for the given filter.
+
+        Each facet ignores its own filter so the UI can offer the alternatives
+        (e.g. category counts are computed without the category filter).
+        """
+        import numpy as np
+        
+        everything = np.ones(len(self), dtype=bool)
+
+        category_mask = everything
+        if category is not None:
+            code = self._category_index.get(category)
+            if code is None:
+                category_mask = np.zeros(len(self), dtype=bool)
+            else:
+                category_mask = self.category_codes == code
+
+        price_mask = everything
+        if min_price is not None:
+            price_mask = price_mask & (self.price >= min_price)
+        if max_price is not None:
+            price_mask = price_mask & (self.price <= max_price)
+
+        stock_mask = everything
+        if in_stock is not None:
+            stock_mask = (self.stock > 0) if in_stock else (self.stock <= 0)
+
+        matching = category_mask & price_mask & stock_mask
+
+        category_counts = np.bincount(
+            self.category_codes[price_mask & stock_mask],
+            minlength=len(self.categories)
+        )
+        bucket_counts = np.bincount(
+            np.searchsorted(PRICE_BUCKET_EDGES, self.price[category_mask & stock_mask], side='right'),
+            minlength=len(PRICE_BUCKET_EDGES) + 1
+        )
+        stocked = self.stock[category_mask & price_mask] > 0
+        in_stock_count = int(np.count_nonzero(stocked))
+
+        lower_bounds = (0.0,) + PRICE_BUCKET_EDGES
+        upper_bounds = PRICE_BUCKET_EDGES + (None,)
+
+        return {
+            'total': int(np.count_nonzero(matching)),
+            'categories': [
+                {'category': name, 'count': int(count)}
+                for name, count in zip(self.categories, category_counts)
+                if count > 0
+            ],
+            'price_buckets': [
+                {'min': low, 'max': high, 'count': int(count)}
+                for low, high, count in zip(lower_bounds, upper_bounds, bucket_counts)
+            ],
+            'in_stock': in_stock_count,
+            'out_of_stock': len(stocked) - in_stock_count,
+            'catalog_version': self.version
+        }
+
+
+class CatalogCache:
+    """Holds the current catalog snapshot and refreshes it in the background.
+
+    The first call builds the snapshot synchronously; afterwards a stale
+    snapshot keeps being served while a background thread rebuilds it.
+    """
+
+    def __init__(self, loader: Callable[[], ProductStore], refresh_seconds: int):
+        self._loader = loader
+        self._refresh_seconds = refresh_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._version = 0
+        # Bumped as soon as the catalog is known to have changed, before the rebuild finishes
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self) -> CatalogSnapshot:
+        """Get the current snapshot, building it on first use"""
+        snapshot = self._snapshot
+        record_cache_lookup("catalog", snapshot is not None)
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build()
+                return self._snapshot
+
+        if time.monotonic() - snapshot.loaded_at > self._refresh_seconds:
+            self._refresh_in_background()
+        return snapshot
+
+    def invalidate(self):
+        """Force a refresh on next access"""
+        self.generation += 1
+        self._refresh_in_background()
+
+    def _build(self) -> CatalogSnapshot:
+        started = time.perf_counter()
+        mapped = mapped_catalog.get()
+        if mapped is not None:
+            # Aggregate over the mapped snapshot's columns instead of scanning the table
+            snapshot = CatalogSnapshot.from_mapped(mapped, self._version + 1)
+        else:
+            snapshot = CatalogSnapshot(self._loader(), self._version + 1)
+        self._version = snapshot.version
+        logger.info(
+            f"Catalog snapshot v{snapshot.version} built with {len(snapshot)} products "
+            f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return snapshot
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name="catalog-refresh", daemon=True).start()
+
+    def _refresh(self):
+        try:
+            snapshot = self._build()
+            with self._lock:
+                self._snapshot = snapshot
+        except Exception as e:
+            logger.error(f"Catalog refresh failed, keeping previous snapshot: {e}")
+        finally:
+            self._refreshing = False
+
+
+catalog = CatalogCache(
+    loader=lambda: ProductDB().get_catalog_fields(),
+    refresh_seconds=config.CATALOG_REFRESH_SECONDS
+)
+
+
+def catalog_version() -> Tuple[int, Optional[int]]:
+    """Changes whenever this process learns the catalog changed (an import, a newer mapped snapshot)"""
+    mapped = mapped_catalog.get()
+    return catalog.generation, mapped.version if mapped is not None else None
+
+
+def get_catalog() -> CatalogSnapshot:
+    """Catalog dependency - returns the current snapshot"""
+    return catalog.get()
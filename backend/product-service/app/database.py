@@ -4,6 +4,7 @@ Database configuration for Product Service - DynamoDB
 import os
 import sys
 import uuid
+import logging
 from decimal import Decimal
 from typing import Optional, List, Dict, Any
 from boto3.dynamodb.conditions import Key, Attr
@@ -11,17 +12,33 @@ from boto3.dynamodb.conditions import Key, Attr
 # Add shared module to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
 
+from botocore.exceptions import ClientError
+
 from shared.dynamodb_utils import (
     get_dynamodb_resource, 
+    call_with_retry,
     create_table_if_not_exists,
+    conditional_update_item,
     safe_get_item,
     safe_put_item,
     safe_scan,
-    safe_query
+    safe_query,
+    batch_get_items
 )
 
 # Import configuration
 from shared.env_config import config
+from shared.singleflight import SingleFlight
+from .stock import ShardedStock, shard_id
+from .product_store import ProductStore
+
+logger = logging.getLogger(__name__)
+
+# Shard counts of products known to use sharded stock counters
+_stock_shards: Dict[str, int] = {}
+
+# Identical reads in flight at the same time share one DynamoDB call
+_reads = SingleFlight("product_reads")
 
 def get_products_table():
     """Get DynamoDB products table"""
@@ -64,6 +81,73 @@ def create_products_table():
         ]
     )
 
+def get_reservations_table():
+    """Get DynamoDB stock reservations table"""
+    dynamodb = get_dynamodb_resource()
+    return dynamodb.Table(config.RESERVATIONS_TABLE_NAME)
+
+def create_reservations_table():
+    """Create stock reservations table if it doesn't exist"""
+    return create_table_if_not_exists(
+        table_name=config.RESERVATIONS_TABLE_NAME,
+        key_schema=[
+            {
+                'AttributeName': 'reservation_id',
+                'KeyType': 'HASH'
+            }
+        ],
+        attribute_definitions=[
+            {
+                'AttributeName': 'reservation_id',
+                'AttributeType': 'S'
+            },
+            {
+                'AttributeName': 'product_id',
+                'AttributeType': 'S'
+            },
+            {
+                'AttributeName': 'expires_at',
+                'AttributeType': 'N'
+            }
+        ],
+        global_secondary_indexes=[
+            {
+                'IndexName': 'product-expiry-index',
+                'KeySchema': [
+                    {
+                        'AttributeName': 'product_id',
+                        'KeyType': 'HASH'
+                    },
+                    {
+                        'AttributeName': 'expires_at',
+                        'KeyType': 'RANGE'
+                    }
+                ],
+                'Projection': {
+                    'ProjectionType': 'KEYS_ONLY'
+                }
+            }
+        ]
+    )
+
+def create_stock_shards_table():
+    """Create stock shards table if it doesn't exist"""
+    return create_table_if_not_exists(
+        table_name=config.STOCK_SHARDS_TABLE_NAME,
+        key_schema=[
+            {
+                'AttributeName': 'shard_id',
+                'KeyType': 'HASH'
+            }
+        ],
+        attribute_definitions=[
+            {
+                'AttributeName': 'shard_id',
+                'AttributeType': 'S'
+            }
+        ]
+    )
+
 class ProductDB:
     """DynamoDB model for Product"""
     
@@ -72,14 +156,42 @@ class ProductDB:
     
     def get_product(self, product_id: str) -> Optional[Dict[str, Any]]:
         """Get product by ID"""
+        return _reads.do(('product', product_id), self._read_product, product_id,
+                         timeout=config.SINGLEFLIGHT_TIMEOUT_SECONDS)
+    
+    def get_stock(self, product_id: str) -> Optional[int]:
+        """Current stock of a product (sharded stock summed), or None if it does not exist"""
+        return _reads.do(('stock', product_id), self._read_stock, product_id,
+                         timeout=config.SINGLEFLIGHT_TIMEOUT_SECONDS)
+    
+    def get_products(self, category: Optional[str] = None, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get products with optional category filter"""
+        return _reads.do(('products', category, limit, offset), self._read_products, category, limit, offset,
+                         timeout=config.SINGLEFLIGHT_TIMEOUT_SECONDS)
+    
+    def get_all_products(self) -> ProductStore:
+        """Get all products as a compact column store"""
+        return _reads.do(('all_products',), self._scan_store, timeout=config.SINGLEFLIGHT_TIMEOUT_SECONDS)
+    
+    def _read_product(self, product_id: str) -> Optional[Dict[str, Any]]:
         item = safe_get_item(self.table, {'id': product_id})
         if item:
             # Convert Decimal to float for JSON serialization
-            return self._convert_decimals(item)
+            return self._convert_decimals(self._with_sharded_stock([item])[0])
         return None
     
-    def get_products(self, category: Optional[str] = None, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
-        """Get products with optional category filter"""
+    def _read_stock(self, product_id: str) -> Optional[int]:
+        response = call_with_retry(
+            'GetItem', self.table.get_item,
+            Key={'id': product_id},
+            ProjectionExpression='#id, #stock, #stock_shards',
+            ExpressionAttributeNames={'#id': 'id', '#stock': 'stock', '#stock_shards': 'stock_shards'},
+            ReturnConsumedCapacity='TOTAL'
+        )
+        item = response.get('Item')
+        return int(self._with_sharded_stock([item])[0].get('stock', 0)) if item else None
+    
+    def _read_products(self, category: Optional[str], limit: int, offset: int) -> List[Dict[str, Any]]:
         if category:
             # Query by category using GSI
             items = safe_query(
@@ -94,13 +206,35 @@ class ProductDB:
         
         # Apply offset and convert decimals
         products = items[offset:offset + limit] if offset > 0 else items[:limit]
-        return [self._convert_decimals(item) for item in products]
-    
-    def get_all_products(self) -> List[Dict[str, Any]]:
-        """Get all products"""
-        items = safe_scan(self.table)
-        return [self._convert_decimals(item) for item in items]
+        return [self._convert_decimals(item) for item in self._with_sharded_stock(products)]
     
+    def get_catalog_fields(self) -> ProductStore:
+        """Get only the attributes needed for catalog aggregates"""
+        return self._scan_store(
+            ProjectionExpression='#id, #category, #price, #stock',
+            ExpressionAttributeNames={
+                '#id': 'id',
+                '#category': 'category',
+                '#price': 'price',
+                '#stock': 'stock'
+            }
+        )
+
+    def _scan_store(self, **kwargs) -> ProductStore:
+        """Scan the table into a ProductStore a page at a time, so the raw items of only one page are held"""
+        store = ProductStore()
+        kwargs.setdefault('ReturnConsumedCapacity', 'TOTAL')
+        try:
+            while True:
+                response = call_with_retry('Scan', self.table.scan, **kwargs)
+                store.extend(self._with_sharded_stock(response.get('Items', [])))
+                if 'LastEvaluatedKey' not in response:
+                    return store
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except ClientError as e:
+            logger.error(f"Error scanning products: {e}")
+            return ProductStore()
+
     def create_product(self, product_data: Dict[str, Any]) -> bool:
         """Create a new product"""
         # Convert float to Decimal for DynamoDB
@@ -109,6 +243,9 @@ class ProductDB:
     
     def get_categories(self) -> List[str]:
         """Get all unique categories"""
+        return _reads.do(('categories',), self._read_categories, timeout=config.SINGLEFLIGHT_TIMEOUT_SECONDS)
+    
+    def _read_categories(self) -> List[str]:
         items = safe_scan(self.table, ProjectionExpression='category')
         categories = set()
         for item in items:
@@ -116,6 +253,85 @@ class ProductDB:
                 categories.add(item['category'])
         return sorted(list(categories))
     
+    def decrement_stock(self, product_id: str, quantity: int) -> bool:
+        """Atomically take units out of stock; False if the product is missing or stock is short"""
+        shards = _stock_shards.get(product_id)
+        if shards is None:
+            # Unsharded products keep stock on the product item; the condition
+            # also fails if the product was switched to sharded counters
+            taken = conditional_update_item(
+                self.table,
+                {'id': product_id},
+                'SET stock = stock - :quantity',
+                'attribute_exists(id) AND attribute_not_exists(stock_shards) AND stock >= :quantity',
+                {':quantity': quantity},
+                return_values='NONE'
+            )
+            if taken is not None:
+                return True
+            shards = self._refresh_stock_shards(product_id)
+            if shards is None:
+                return False
+
+        if ShardedStock(product_id, shards).decrement(quantity):
+            return True
+        # Sharding may have been turned off since the shard count was cached
+        if self._refresh_stock_shards(product_id) is None:
+            return self.decrement_stock(product_id, quantity)
+        return False
+    
+    def restore_stock(self, product_id: str, quantity: int) -> bool:
+        """Put units back into stock; False if the product no longer exists or its shards kept changing"""
+        shards = _stock_shards.get(product_id)
+        if shards is None:
+            restored = conditional_update_item(
+                self.table,
+                {'id': product_id},
+                'SET stock = stock + :quantity',
+                'attribute_exists(id) AND attribute_not_exists(stock_shards)',
+                {':quantity': quantity},
+                return_values='NONE'
+            )
+            if restored is not None:
+                return True
+            shards = self._refresh_stock_shards(product_id)
+            if shards is None:
+                return False
+
+        if ShardedStock(product_id, shards).restore(quantity):
+            return True
+        # Sharding may have been turned off, or its shard count changed, since the shard count was cached
+        shards = self._refresh_stock_shards(product_id)
+        if shards is None:
+            return self.restore_stock(product_id, quantity)
+        return ShardedStock(product_id, shards).restore(quantity)
+    
+    def _refresh_stock_shards(self, product_id: str) -> Optional[int]:
+        """Re-read whether a product uses sharded stock; returns its shard count"""
+        item = safe_get_item(self.table, {'id': product_id})
+        shards = int(item['stock_shards']) if item and item.get('stock_shards') else None
+        if shards:
+            _stock_shards[product_id] = shards
+        else:
+            _stock_shards.pop(product_id, None)
+        return shards
+    
+    def _with_sharded_stock(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Replace the stock of sharded products by the sum of their shards (one batch read)"""
+        sharded = {item['id']: int(item['stock_shards']) for item in items if item.get('stock_shards')}
+        if not sharded:
+            return items
+        _stock_shards.update(sharded)
+        
+        keys = [{'shard_id': shard_id(product_id, n)} for product_id, shards in sharded.items() for n in range(shards)]
+        totals: Dict[str, int] = {}
+        for shard in batch_get_items(config.STOCK_SHARDS_TABLE_NAME, keys):
+            totals[shard['product_id']] = totals.get(shard['product_id'], 0) + int(shard['stock'])
+        return [
+            {**item, 'stock': totals.get(item['id'], 0)} if item['id'] in sharded else item
+            for item in items
+        ]
+    
     def _convert_decimals(self, item: Dict[str, Any]) -> Dict[str, Any]:
         """Convert Decimal values to float for JSON serialization"""
         converted = {}
@@ -145,3 +361,5 @@ def get_db():
 def create_tables():
     """Create all tables"""
     create_products_table()
+    create_reservations_table()
+    create_stock_shards_table()
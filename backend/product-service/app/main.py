@@ -4,9 +4,14 @@ Product Service - FastAPI microservice for managing products
 import os
 import logging
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
 from mangum import Mangum
+from shared.env_config import settings
+from shared.app_setup import setup_service_app
 from .routes import router
+from .database import create_tables, get_products_table, get_reservations_table
+from .stock import get_stock_shards_table
+from .snapshot import mapped_catalog
+from .catalog import catalog, catalog_version
 
 
 # Configure logging
@@ -22,14 +27,8 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Middleware (catalog response cache, CORS, deadlines, timings) and error handlers
+setup_service_app(app, catalog_version=catalog_version)
 
 # Include routes
 app.include_router(router, prefix="/api")
@@ -53,6 +52,22 @@ async def root():
     }
 
 
+def init_service():
+    """Create long-lived clients once per process"""
+    get_products_table()
+    get_reservations_table()
+    get_stock_shards_table()
+    # Map the catalog snapshot (if configured) before the first request needs it
+    mapped_catalog.get()
+
+
+def warm_up():
+    """Prepare a server worker (app.server) before it accepts requests"""
+    init_service()
+    # Builds the catalog aggregates, opening DynamoDB connections on the way
+    catalog.get()
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", "8001"))
@@ -64,5 +79,15 @@ if __name__ == "__main__":
         reload=os.getenv("ENV", "local") == "local",
     )
 
-# AWS Lambda handler (for container image or ZIP with Lambda runtime)
-handler = Mangum(app)
\ No newline at end of file
+
+# The in-memory storage engine (STORAGE_BACKEND=memory) starts empty: give it this service's tables
+if settings.STORAGE_BACKEND == "memory":
+    create_tables()
+
+# Run one-time initialization during the Lambda init phase, not on the first request
+if settings.is_lambda():
+    init_service()
+
+# AWS Lambda handler (for container image or ZIP with Lambda runtime).
+# Lifespan events are skipped because Mangum would run them on every invocation.
+handler = Mangum(app, lifespan="off")
\ No newline at end of file
@@ -1,8 +1,8 @@
 """
 Pydantic models for Product Service
 """
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 
 class ProductBase(BaseModel):
@@ -27,4 +27,52 @@ class Product(ProductBase):
 
 class ProductList(BaseModel):
     products: List[Product]
-    total: int
\ No newline at end of file
+    total: int
+
+
+class CategoryFacet(BaseModel):
+    category: str
+    count: int
+
+
+class PriceBucket(BaseModel):
+    min: float
+    max: Optional[float] = None
+    count: int
+
+
+class ProductFacets(BaseModel):
+    total: int
+    categories: List[CategoryFacet]
+    price_buckets: List[PriceBucket]
+    in_stock: int
+    out_of_stock: int
+    catalog_version: int
+
+
+class ReservationRequest(BaseModel):
+    quantity: int = Field(default=1, ge=1)
+    owner: Optional[str] = None
+
+
+class Reservation(BaseModel):
+    reservation_id: str
+    product_id: str
+    quantity: int
+    owner: Optional[str] = None
+    expires_at: int
+
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+
+class ImportSummary(BaseModel):
+    rows: int
+    imported: int
+    invalid: int
+    seconds: float
+    rows_per_second: float
+    errors: List[ImportRowError]
+    error: Optional[str] = None
@@ -0,0 +1,70 @@
+"""
+Compact in-memory product list for Product Service
+
+A list of product dicts costs roughly a kilobyte per product (the dict, a
+float and an int object per product, and a str per field). ProductStore
+keeps the same data as parallel columns instead: price and stock in typed
+``array`` columns (8 bytes each), category as a 4-byte code into a list of
+distinct names, and the remaining strings in plain lists. Products become
+dicts only when a response needs them (``row``), and the numeric columns can
+be handed to numpy without copying.
+"""
+from array import array
+from typing import Optional, List, Dict, Any, Iterable, Iterator
+
+
+class ProductStore:
+    """Column-oriented list of products"""
+
+    __slots__ = ('ids', 'names', 'descriptions', 'image_urls', 'categories',
+                 'category_codes', 'price', 'stock', '_category_index')
+
+    def __init__(self, items: Optional[Iterable[Dict[str, Any]]] = None):
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self.descriptions: List[str] = []
+        self.image_urls: List[str] = []
+        self.categories: List[str] = []
+        self.category_codes = array('I')
+        self.price = array('d')
+        self.stock = array('q')
+        self._category_index: Dict[str, int] = {}
+        if items is not None:
+            self.extend(items)
+
+    def append(self, item: Dict[str, Any]):
+        """Add one product item (as read from DynamoDB: numbers may be Decimal)"""
+        category = item.get('category', '')
+        code = self._category_index.get(category)
+        if code is None:
+            code = self._category_index[category] = len(self.categories)
+            self.categories.append(category)
+        self.ids.append(item.get('id', ''))
+        self.names.append(item.get('name', ''))
+        self.descriptions.append(item.get('description', ''))
+        self.image_urls.append(item.get('image_url', ''))
+        self.category_codes.append(code)
+        self.price.append(float(item.get('price', 0)))
+        self.stock.append(int(item.get('stock', 0)))
+
+    def extend(self, items: Iterable[Dict[str, Any]]):
+        for item in items:
+            self.append(item)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self.row(index) for index in range(len(self)))
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """One product as a response dict"""
+        return {
+            'id': self.ids[index],
+            'name': self.names[index],
+            'description': self.descriptions[index],
+            'price': self.price[index],
+            'category': self.categories[self.category_codes[index]],
+            'image_url': self.image_urls[index],
+            'stock': self.stock[index],
+        }
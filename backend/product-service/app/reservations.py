@@ -0,0 +1,127 @@
+"""
+Stock reservations for Product Service
+
+Reserving decrements stock with a conditional update (``stock >= :q``, on
+the product item or on a stock shard), so concurrent shoppers can never
+take more units than exist, without any locking: DynamoDB evaluates the
+condition and the write atomically. Each reservation is recorded with an
+``expires_at`` timestamp; releasing or expiring it deletes the record
+conditionally and puts the units back, so a reservation is returned to
+stock at most once.
+"""
+import logging
+import time
+import uuid
+from decimal import Decimal
+from typing import Optional, Dict, Any
+
+from boto3.dynamodb.conditions import Key, Attr
+
+from shared.env_config import config
+from shared.dynamodb_utils import (
+    DynamoDBError,
+    conditional_delete_item,
+    safe_put_item,
+    safe_query,
+    safe_scan
+)
+from .database import ProductDB, get_reservations_table
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationDB:
+    """Conditional stock decrements backed by expiring reservation records"""
+
+    def __init__(self):
+        self.db = ProductDB()
+        self.reservations = get_reservations_table()
+
+    def reserve(self, product_id: str, quantity: int, owner: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Take `quantity` units out of stock; returns the reservation, or None if stock is short"""
+        taken = self.db.decrement_stock(product_id, quantity)
+        if not taken and self.release_expired(product_id):
+            # Expired reservations were holding stock; try again with it returned
+            taken = self.db.decrement_stock(product_id, quantity)
+        if not taken:
+            return None
+
+        now = int(time.time())
+        reservation = {
+            'reservation_id': str(uuid.uuid4()),
+            'product_id': product_id,
+            'quantity': quantity,
+            'created_at': now,
+            'expires_at': now + config.RESERVATION_TTL_SECONDS
+        }
+        if owner:
+            reservation['owner'] = owner
+
+        try:
+            recorded = safe_put_item(self.reservations, reservation)
+        except DynamoDBError:
+            self._restore_stock(product_id, quantity)
+            raise
+        if not recorded:
+            self._restore_stock(product_id, quantity)
+            raise RuntimeError(f"Failed to record reservation for product {product_id}")
+
+        return reservation
+
+    def release(self, product_id: str, reservation_id: str) -> Optional[Dict[str, Any]]:
+        """Return a reservation's units to stock; returns the reservation, or None if it was already released"""
+        reservation = conditional_delete_item(
+            self.reservations,
+            {'reservation_id': reservation_id},
+            'product_id = :product_id',
+            {':product_id': product_id}
+        )
+        if reservation is None:
+            return None
+
+        self._restore_stock(product_id, int(reservation['quantity']))
+        return {key: int(value) if isinstance(value, Decimal) else value for key, value in reservation.items()}
+
+    def release_expired(self, product_id: Optional[str] = None) -> int:
+        """Return expired reservations to stock (for one product, or all); returns how many were released"""
+        now = int(time.time())
+        if product_id:
+            expired = safe_query(
+                self.reservations,
+                IndexName='product-expiry-index',
+                KeyConditionExpression=Key('product_id').eq(product_id) & Key('expires_at').lt(now)
+            )
+        else:
+            expired = safe_scan(
+                self.reservations,
+                FilterExpression=Attr('expires_at').lt(now),
+                ProjectionExpression='reservation_id'
+            )
+
+        released = 0
+        for item in expired:
+            # Only delete it if it is still expired and not released concurrently
+            reservation = conditional_delete_item(
+                self.reservations,
+                {'reservation_id': item['reservation_id']},
+                'expires_at < :now',
+                {':now': now}
+            )
+            if reservation is not None:
+                self._restore_stock(reservation['product_id'], int(reservation['quantity']))
+                released += 1
+
+        if released:
+            logger.info(f"Released {released} expired stock reservations")
+        return released
+
+    def _restore_stock(self, product_id: str, quantity: int):
+        """Put units back into stock (skipped if the product no longer exists)"""
+        if not self.db.restore_stock(product_id, quantity):
+            logger.warning(f"{quantity} reserved units of product {product_id} not restored "
+                           f"(product deleted or its stock shards changed)")
+
+
+def get_reservations():
+    """Reservations dependency - returns ReservationDB instance"""
+    return ReservationDB()
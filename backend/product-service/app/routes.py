@@ -1,14 +1,48 @@
 """
 Routes for Product Service
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import hmac
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, status, Query
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
+from shared.env_config import config
 from .database import get_db, ProductDB
-from .models import Product, ProductList
+from .models import Product, ProductList, ProductFacets, ReservationRequest, Reservation, ImportSummary
+from .catalog import catalog, get_catalog, CatalogSnapshot
+from .snapshot import get_mapped_catalog, MappedCatalog
+from .reservations import get_reservations, ReservationDB
 
 router = APIRouter()
 
 
+def verify_admin_key(x_admin_key: Optional[str] = Header(default=None)):
+    """Admin endpoints dependency - checks X-Admin-Key against ADMIN_API_KEY"""
+    if not config.ADMIN_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled (ADMIN_API_KEY is not set)"
+        )
+    if x_admin_key is None or not hmac.compare_digest(x_admin_key, config.ADMIN_API_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin key"
+        )
+
+
+def verify_service_key(x_service_key: Optional[str] = Header(default=None)):
+    """Inter-service endpoints dependency - checks X-Service-Key against SERVICE_API_KEY"""
+    if not config.SERVICE_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Service endpoints are disabled (SERVICE_API_KEY is not set)"
+        )
+    if x_service_key is None or not hmac.compare_digest(x_service_key, config.SERVICE_API_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid service key"
+        )
+
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -20,17 +54,23 @@ async def get_products(
     category: Optional[str] = Query(None, description="Filter by category"),
     limit: int = Query(100, ge=1, le=100, description="Number of products to return"),
     offset: int = Query(0, ge=0, description="Number of products to skip"),
-    db: ProductDB = Depends(get_db)
+    db: ProductDB = Depends(get_db),
+    mapped: Optional[MappedCatalog] = Depends(get_mapped_catalog)
 ):
     """Get list of all products with optional filtering"""
-    products = db.get_products(category=category, limit=limit, offset=offset)
+    if mapped is not None:
+        products, total = mapped.page(category=category, limit=limit, offset=offset)
+        return ProductList(products=[Product(**product) for product in products], total=total)
+    
+    # Reads run in the threadpool so identical concurrent requests can share one DynamoDB call
+    products = await run_in_threadpool(db.get_products, category, limit, offset)
     
     # Get total count (for pagination)
     if category:
-        all_products = db.get_products(category=category, limit=1000)  # Get more for count
+        all_products = await run_in_threadpool(db.get_products, category, 1000)  # Get more for count
         total = len(all_products)
     else:
-        all_products = db.get_all_products()
+        all_products = await run_in_threadpool(db.get_all_products)
         total = len(all_products)
     
     return ProductList(
@@ -39,10 +79,38 @@ async def get_products(
     )
 
 
+@router.get("/products/facets", response_model=ProductFacets)
+async def get_product_facets(
+    category: Optional[str] = Query(None, description="Filter by category"),
+    min_price: Optional[float] = Query(None, ge=0, description="Minimum price"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum price"),
+    in_stock: Optional[bool] = Query(None, description="Filter by stock availability"),
+    catalog: CatalogSnapshot = Depends(get_catalog)
+):
+    """Get facet counts (categories, price buckets, stock) for the current filter"""
+    return ProductFacets(**catalog.facets(
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock
+    ))
+
+
 @router.get("/products/{product_id}", response_model=Product)
-async def get_product(product_id: str, db: ProductDB = Depends(get_db)):
+async def get_product(
+    product_id: str,
+    db: ProductDB = Depends(get_db),
+    mapped: Optional[MappedCatalog] = Depends(get_mapped_catalog)
+):
     """Get product details by ID"""
-    product = db.get_product(product_id)
+    product = mapped.get(product_id) if mapped is not None else None
+    if product is not None:
+        # The snapshot's stock is as of its build; carts validate adds against this read, so it is read live
+        stock = await run_in_threadpool(db.get_stock, product_id)
+        product = dict(product, stock=stock) if stock is not None else None
+    if product is None:
+        # Not in the snapshot (or no snapshot): products added since it was built are still found
+        product = await run_in_threadpool(db.get_product, product_id)
     
     if product is None:
         raise HTTPException(
@@ -53,8 +121,92 @@ async def get_product(product_id: str, db: ProductDB = Depends(get_db)):
     return Product(**product)
 
 
+@router.post("/products/import", response_model=ImportSummary, dependencies=[Depends(verify_admin_key)])
+async def import_products(
+    request: Request,
+    fmt: Optional[str] = Query(None, alias="format", pattern="^(ndjson|csv)$",
+                               description="Body format; defaults to csv for a text/csv Content-Type, else ndjson"),
+    workers: Optional[int] = Query(None, ge=1, le=64, description="Parallel write workers")
+):
+    """Bulk import products from a streamed CSV or NDJSON body (admin only)"""
+    import anyio
+    from .bulk_import import ProductImporter, iter_lines
+
+    if fmt is None:
+        fmt = 'csv' if 'csv' in request.headers.get('content-type', '') else 'ndjson'
+
+    def body_chunks():
+        # The import runs in a worker thread; each chunk is read on the event loop
+        stream = request.stream()
+        while True:
+            try:
+                yield anyio.from_thread.run(stream.__anext__)
+            except StopAsyncIteration:
+                return
+
+    summary = await run_in_threadpool(ProductImporter(workers=workers).run, iter_lines(body_chunks()), fmt)
+    if summary['imported']:
+        catalog.invalidate()
+    return ImportSummary(**summary)
+
+
+@router.post("/products/reservations/release-expired", dependencies=[Depends(verify_service_key)])
+async def release_expired_reservations(reservations: ReservationDB = Depends(get_reservations)):
+    """Return all expired stock reservations to stock"""
+    return {"released": await run_in_threadpool(reservations.release_expired)}
+
+
+@router.post("/products/{product_id}/reservations", response_model=Reservation, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(verify_service_key)])
+async def reserve_stock(
+    product_id: str,
+    request: ReservationRequest,
+    reservations: ReservationDB = Depends(get_reservations),
+    db: ProductDB = Depends(get_db)
+):
+    """Reserve stock for a product (atomic conditional decrement)"""
+    # DynamoDB calls (and their retry backoff) run in the threadpool, off the event loop
+    reservation = await run_in_threadpool(reservations.reserve, product_id, request.quantity, owner=request.owner)
+
+    if reservation is None:
+        product = await run_in_threadpool(db.get_product, product_id)
+        if product is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Product with id {product_id} not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Insufficient stock. Available: {int(product['stock'])}, Requested: {request.quantity}"
+        )
+
+    return Reservation(**reservation)
+
+
+@router.delete("/products/{product_id}/reservations/{reservation_id}", response_model=Reservation,
+               dependencies=[Depends(verify_service_key)])
+async def release_reservation(
+    product_id: str,
+    reservation_id: str,
+    reservations: ReservationDB = Depends(get_reservations)
+):
+    """Release a stock reservation, returning its units to stock"""
+    reservation = await run_in_threadpool(reservations.release, product_id, reservation_id)
+
+    if reservation is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Reservation {reservation_id} not found or already released"
+        )
+
+    return Reservation(**reservation)
+
+
 @router.get("/categories")
-async def get_categories(db: ProductDB = Depends(get_db)):
+async def get_categories(
+    db: ProductDB = Depends(get_db),
+    mapped: Optional[MappedCatalog] = Depends(get_mapped_catalog)
+):
     """Get all product categories"""
-    categories = db.get_categories()
+    categories = mapped.categories if mapped is not None else await run_in_threadpool(db.get_categories)
     return {"categories": categories}
\ No newline at end of file
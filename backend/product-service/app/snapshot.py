@@ -0,0 +1,242 @@
+"""
+Memory-mapped catalog snapshot for Product Service
+
+A snapshot is a read-only binary file built offline from the products table
+(scripts/build-catalog-snapshot.py). Rows are sorted by id and stored as
+fixed-width columns (price, stock, category code) plus, for each string
+field, an offsets column into a shared UTF-8 heap. The file is mapped once
+per process and every column is a zero-copy memoryview over the mapping, so
+a cold container answers catalog reads without a DynamoDB round trip and
+workers on one host share the same page-cache pages. Stock in the file is
+as of the build: lists show it as is, but a single product read (which
+cart-service validates adds against) fetches its stock from DynamoDB.
+
+Layout (little-endian): header, section table of (offset, length) pairs in
+``SECTIONS`` order, then the 8-byte aligned sections.
+"""
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+
+from shared.env_config import config
+from .product_store import ProductStore
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'ECOMCAT\x00'
+FORMAT_VERSION = 1
+
+# magic, format version, product count, category count, snapshot version
+HEADER = struct.Struct('<8sIIIQ')
+SECTION = struct.Struct('<QQ')
+
+STRING_FIELDS = ('id', 'name', 'description', 'image_url')
+SECTIONS = (
+    'price', 'stock', 'category_code',
+    'id', 'name', 'description', 'image_url',
+    'category_rows', 'category_starts', 'category_names',
+    'heap'
+)
+
+
+class SnapshotFormatError(ValueError):
+    """File is not a catalog snapshot this version can read"""
+
+
+class MappedCatalog:
+    """Read-only view of one mapped snapshot file"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self.identity = _identity(os.fstat(f.fileno()))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        if len(buffer) < HEADER.size + SECTION.size * len(SECTIONS):
+            raise SnapshotFormatError(f"{path} is too short for a catalog snapshot")
+        magic, format_version, count, category_count, version = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise SnapshotFormatError(f"{path} is not a version {FORMAT_VERSION} catalog snapshot")
+
+        sections = {}
+        for index, name in enumerate(SECTIONS):
+            offset, length = SECTION.unpack_from(buffer, HEADER.size + index * SECTION.size)
+            if offset + length > len(buffer):
+                raise SnapshotFormatError(f"{path} is truncated")
+            sections[name] = buffer[offset:offset + length]
+
+        self.path = path
+        self.version = version
+        self.count = count
+        self.price = sections['price'].cast('d')
+        self.stock = sections['stock'].cast('q')
+        self.category_code = sections['category_code'].cast('I')
+        self._offsets = {field: sections[field].cast('Q') for field in STRING_FIELDS}
+        self._category_rows = sections['category_rows'].cast('I')
+        self._category_starts = sections['category_starts'].cast('I')
+        self._heap = sections['heap']
+
+        # Category names are few; decode them once
+        names = sections['category_names'].cast('Q')
+        self.categories = [str(self._heap[names[n]:names[n + 1]], 'utf-8') for n in range(category_count)]
+        self._category_index = {name: code for code, name in enumerate(self.categories)}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """Product by id (binary search over the sorted id column)"""
+        key = product_id.encode('utf-8')
+        offsets, heap = self._offsets['id'], self._heap
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if heap[offsets[middle]:offsets[middle + 1]].tobytes() < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and heap[offsets[low]:offsets[low + 1]].tobytes() == key:
+            return self.row(low)
+        return None
+
+    def page(self, category: Optional[str] = None, limit: int = 100, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of products (in id order) and the total matching count"""
+        if category is None:
+            rows: Iterable[int] = range(offset, min(self.count, offset + limit))
+            return [self.row(row) for row in rows], self.count
+
+        code = self._category_index.get(category)
+        if code is None:
+            return [], 0
+        start, end = self._category_starts[code], self._category_starts[code + 1]
+        rows = self._category_rows[min(end, start + offset):min(end, start + offset + limit)]
+        return [self.row(row) for row in rows], end - start
+
+    def row(self, row: int) -> Dict[str, Any]:
+        """Materialize one product; only its strings are copied out of the mapping"""
+        product = {field: self._string(field, row) for field in STRING_FIELDS}
+        product['price'] = self.price[row]
+        product['stock'] = self.stock[row]
+        product['category'] = self.categories[self.category_code[row]]
+        return product
+
+    def _string(self, field: str, row: int) -> str:
+        offsets = self._offsets[field]
+        return str(self._heap[offsets[row]:offsets[row + 1]], 'utf-8')
+
+
+class MappedCatalogLoader:
+    """Keeps the newest snapshot at ``path`` mapped, checking for a new file every few seconds.
+
+    A new snapshot should be moved into place with a rename; readers still
+    holding the previous one keep a valid mapping until they drop it.
+    """
+
+    def __init__(self, path: Optional[str], check_seconds: int):
+        self.path = path
+        self._check_seconds = check_seconds
+        self._current: Optional[MappedCatalog] = None
+        self._seen: Optional[Tuple[int, int, int]] = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[MappedCatalog]:
+        """Current snapshot, or None when no snapshot is configured or readable"""
+        if not self.path:
+            return None
+        if time.monotonic() - self._checked_at >= self._check_seconds:
+            self._check()
+        return self._current
+
+    def _check(self):
+        with self._lock:
+            if time.monotonic() - self._checked_at < self._check_seconds:
+                return
+            self._checked_at = time.monotonic()
+            try:
+                if _identity(os.stat(self.path)) == self._seen:
+                    return
+                mapped = MappedCatalog(self.path)
+            except (OSError, SnapshotFormatError) as e:
+                logger.error(f"Catalog snapshot {self.path} not loaded: {e}")
+                return
+
+            self._seen = mapped.identity
+            if self._current is not None and mapped.version <= self._current.version:
+                logger.warning(f"Ignoring catalog snapshot v{mapped.version}, v{self._current.version} is newer")
+                return
+            self._current = mapped
+            logger.info(f"Catalog snapshot v{mapped.version} mapped with {len(mapped)} products from {self.path}")
+
+
+def _identity(stat: os.stat_result) -> Tuple[int, int, int]:
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def write_snapshot(store: ProductStore, path: str, version: int) -> int:
+    """Write products as a snapshot file (atomically, via rename); returns its size in bytes"""
+    order = sorted(range(len(store)), key=store.ids.__getitem__)
+    count = len(order)
+    categories = sorted(store.categories)
+    category_index = {name: code for code, name in enumerate(categories)}
+    recode = [category_index[name] for name in store.categories]
+
+    heap = bytearray()
+
+    def add_strings(values: Iterable[str]) -> array:
+        offsets = array('Q', [len(heap)])
+        for value in values:
+            heap.extend(value.encode('utf-8'))
+            offsets.append(len(heap))
+        return offsets
+
+    codes = array('I', (recode[store.category_codes[index]] for index in order))
+    # Rows grouped by category (id order within each); category n owns category_rows[starts[n]:starts[n + 1]]
+    category_rows = array('I', sorted(range(count), key=codes.__getitem__))
+    sorted_codes = sorted(codes)
+    category_starts = array('I', (bisect_left(sorted_codes, code) for code in range(len(categories) + 1)))
+
+    sections = {
+        'price': array('d', (store.price[index] for index in order)).tobytes(),
+        'stock': array('q', (store.stock[index] for index in order)).tobytes(),
+        'category_code': codes.tobytes(),
+    }
+    columns = {'id': store.ids, 'name': store.names, 'description': store.descriptions, 'image_url': store.image_urls}
+    for field in STRING_FIELDS:
+        column = columns[field]
+        sections[field] = add_strings(str(column[index]) for index in order).tobytes()
+    sections['category_rows'] = category_rows.tobytes()
+    sections['category_starts'] = category_starts.tobytes()
+    sections['category_names'] = add_strings(categories).tobytes()
+    sections['heap'] = bytes(heap)
+
+    table = bytearray()
+    body = bytearray()
+    position = HEADER.size + SECTION.size * len(SECTIONS)
+    for name in SECTIONS:
+        padding = -(position + len(body)) % 8
+        body.extend(b'\x00' * padding)
+        table.extend(SECTION.pack(position + len(body), len(sections[name])))
+        body.extend(sections[name])
+
+    temporary = f"{path}.tmp-{os.getpid()}"
+    with open(temporary, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, count, len(categories), version))
+        f.write(table)
+        f.write(body)
+    os.replace(temporary, path)
+    return position + len(body)
+
+
+mapped_catalog = MappedCatalogLoader(config.CATALOG_SNAPSHOT_PATH, config.CATALOG_SNAPSHOT_CHECK_SECONDS)
+
+
+def get_mapped_catalog() -> Optional[MappedCatalog]:
+    """Mapped snapshot dependency - None when product reads go to DynamoDB"""
+    return mapped_catalog.get()
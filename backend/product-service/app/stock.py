@@ -0,0 +1,226 @@
+"""
+Sharded stock counters for hot products
+
+A product with a ``stock_shards`` attribute keeps its stock in that many
+shard items (``<product_id>#<n>``) in the stock shards table, each its own
+partition, so concurrent decrements no longer queue on the product item.
+A decrement takes from one random shard; when that shard runs short the
+shards are read together and the units are taken from several of them in
+one transaction. Availability is the sum of the shards (a single
+BatchGetItem).
+
+Shards are rebalanced in the background every ``STOCK_REBALANCE_SECONDS``,
+which also refreshes the product item's ``stock`` attribute used by scans
+(lists, catalog aggregates).
+"""
+import logging
+import random
+import threading
+import time
+from typing import Dict, List
+
+from shared.env_config import config
+from shared.dynamodb_utils import (
+    batch_get_items,
+    conditional_update_item,
+    get_dynamodb_resource,
+    transact_write_items
+)
+
+logger = logging.getLogger(__name__)
+
+# Attempts at a multi-shard take before reporting the stock as short
+MULTI_SHARD_ATTEMPTS = 3
+
+# When each product's shards were last rebalanced, and which are being rebalanced now
+_last_rebalanced: Dict[str, float] = {}
+_rebalancing = set()
+_rebalance_lock = threading.Lock()
+
+
+def get_stock_shards_table():
+    """Get DynamoDB stock shards table"""
+    dynamodb = get_dynamodb_resource()
+    return dynamodb.Table(config.STOCK_SHARDS_TABLE_NAME)
+
+
+def shard_id(product_id: str, shard: int) -> str:
+    return f"{product_id}#{shard}"
+
+
+def split_evenly(total: int, shards: int) -> List[int]:
+    """Split a stock level into `shards` parts differing by at most one unit"""
+    return [total // shards + (1 if n < total % shards else 0) for n in range(shards)]
+
+
+class ShardedStock:
+    """Stock of a product spread across independently written shard items"""
+
+    def __init__(self, product_id: str, shards: int):
+        self.product_id = product_id
+        self.shards = shards
+        self.table = get_stock_shards_table()
+
+    def read(self) -> Dict[int, int]:
+        """Stock per shard (scatter-gather)"""
+        items = batch_get_items(
+            config.STOCK_SHARDS_TABLE_NAME,
+            [{'shard_id': shard_id(self.product_id, n)} for n in range(self.shards)]
+        )
+        return {int(item['shard']): int(item['stock']) for item in items}
+
+    def total(self) -> int:
+        return sum(self.read().values())
+
+    def decrement(self, quantity: int) -> bool:
+        """Take units out of stock; False if stock is short"""
+        shard = random.randrange(self.shards)
+        attributes = conditional_update_item(
+            self.table,
+            {'shard_id': shard_id(self.product_id, shard)},
+            'SET stock = stock - :quantity',
+            'stock >= :quantity',
+            {':quantity': quantity},
+            return_values='NONE'
+        )
+        if attributes is not None:
+            self.maybe_rebalance()
+            return True
+
+        # The chosen shard ran short: take the units from several shards at once
+        for _ in range(MULTI_SHARD_ATTEMPTS):
+            levels = self.read()
+            if sum(levels.values()) < quantity:
+                return False
+            if self._take_from_shards(levels, quantity):
+                self.maybe_rebalance(force=True)
+                return True
+        return False
+
+    def restore(self, quantity: int) -> bool:
+        """Put units back into a random shard; False if that shard no longer exists"""
+        restored = conditional_update_item(
+            self.table,
+            {'shard_id': shard_id(self.product_id, random.randrange(self.shards))},
+            'SET stock = stock + :quantity',
+            'attribute_exists(shard_id)',
+            {':quantity': quantity},
+            return_values='NONE'
+        )
+        return restored is not None
+
+    def _take_from_shards(self, levels: Dict[int, int], quantity: int) -> bool:
+        """Atomically take `quantity` units, fullest shards first; False if a shard changed meanwhile"""
+        actions, needed = [], quantity
+        for shard, level in sorted(levels.items(), key=lambda entry: -entry[1]):
+            if needed <= 0:
+                break
+            take = min(level, needed)
+            if take <= 0:
+                continue
+            needed -= take
+            actions.append({'Update': {
+                'TableName': config.STOCK_SHARDS_TABLE_NAME,
+                'Key': {'shard_id': shard_id(self.product_id, shard)},
+                'UpdateExpression': 'SET stock = stock - :take',
+                'ConditionExpression': 'stock >= :take',
+                'ExpressionAttributeValues': {':take': take}
+            }})
+        return not transact_write_items(actions)
+
+    def rebalance(self) -> bool:
+        """Even out the shards and refresh the product's stock attribute; False if they changed meanwhile"""
+        levels = self.read()
+        total = sum(levels.values())
+        actions = []
+        for shard, target in enumerate(split_evenly(total, self.shards)):
+            actions.append({'Update': {
+                'TableName': config.STOCK_SHARDS_TABLE_NAME,
+                'Key': {'shard_id': shard_id(self.product_id, shard)},
+                'UpdateExpression': 'SET stock = :target, product_id = :product_id, #shard = :shard',
+                'ConditionExpression': 'stock = :seen' if shard in levels else 'attribute_not_exists(shard_id)',
+                'ExpressionAttributeNames': {'#shard': 'shard'},
+                'ExpressionAttributeValues': {
+                    ':target': target,
+                    ':product_id': self.product_id,
+                    ':shard': shard,
+                    **({':seen': levels[shard]} if shard in levels else {})
+                }
+            }})
+        actions.append({'Update': {
+            'TableName': config.PRODUCTS_TABLE_NAME,
+            'Key': {'id': self.product_id},
+            'UpdateExpression': 'SET stock = :total',
+            'ConditionExpression': 'stock_shards = :shards',
+            'ExpressionAttributeValues': {':total': total, ':shards': self.shards}
+        }})
+        return not transact_write_items(actions)
+
+    def maybe_rebalance(self, force: bool = False):
+        """Rebalance in a background thread when due (or when a shard ran short)"""
+        now = time.monotonic()
+        with _rebalance_lock:
+            if self.product_id in _rebalancing:
+                return
+            if not force and now - _last_rebalanced.setdefault(self.product_id, now) < config.STOCK_REBALANCE_SECONDS:
+                return
+            _rebalancing.add(self.product_id)
+        threading.Thread(target=self._rebalance_in_background, name="stock-rebalance", daemon=True).start()
+
+    def _rebalance_in_background(self):
+        try:
+            if not self.rebalance():
+                logger.info(f"Stock shards of {self.product_id} changed during rebalance, retrying later")
+        except Exception as e:
+            logger.error(f"Rebalancing stock shards of {self.product_id} failed: {e}")
+        finally:
+            with _rebalance_lock:
+                _rebalancing.discard(self.product_id)
+                _last_rebalanced[self.product_id] = time.monotonic()
+
+
+def enable_sharding(product_id: str, shards: int) -> bool:
+    """Move a product's stock into `shards` shard items; False if it is missing, already sharded or changed"""
+    products = get_dynamodb_resource().Table(config.PRODUCTS_TABLE_NAME)
+    product = products.get_item(Key={'id': product_id}).get('Item')
+    if product is None or product.get('stock_shards'):
+        return False
+
+    stock = int(product.get('stock', 0))
+    actions = [{'Put': {
+        'TableName': config.STOCK_SHARDS_TABLE_NAME,
+        'Item': {'shard_id': shard_id(product_id, n), 'product_id': product_id, 'shard': n, 'stock': level}
+    }} for n, level in enumerate(split_evenly(stock, shards))]
+    actions.append({'Update': {
+        'TableName': config.PRODUCTS_TABLE_NAME,
+        'Key': {'id': product_id},
+        'UpdateExpression': 'SET stock_shards = :shards',
+        'ConditionExpression': 'stock = :stock AND attribute_not_exists(stock_shards)',
+        'ExpressionAttributeValues': {':shards': shards, ':stock': stock}
+    }})
+    return not transact_write_items(actions)
+
+
+def disable_sharding(product_id: str) -> bool:
+    """Fold a product's shards back into its stock attribute; False if it is not sharded or changed"""
+    products = get_dynamodb_resource().Table(config.PRODUCTS_TABLE_NAME)
+    product = products.get_item(Key={'id': product_id}).get('Item')
+    if product is None or not product.get('stock_shards'):
+        return False
+
+    shards = int(product['stock_shards'])
+    levels = ShardedStock(product_id, shards).read()
+    actions = [{'Delete': {
+        'TableName': config.STOCK_SHARDS_TABLE_NAME,
+        'Key': {'shard_id': shard_id(product_id, shard)},
+        'ConditionExpression': 'stock = :seen',
+        'ExpressionAttributeValues': {':seen': level}
+    }} for shard, level in levels.items()]
+    actions.append({'Update': {
+        'TableName': config.PRODUCTS_TABLE_NAME,
+        'Key': {'id': product_id},
+        'UpdateExpression': 'SET stock = :total REMOVE stock_shards',
+        'ConditionExpression': 'stock_shards = :shards',
+        'ExpressionAttributeValues': {':total': sum(levels.values()), ':shards': shards}
+    }})
+    return not transact_write_items(actions)
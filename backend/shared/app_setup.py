@@ -0,0 +1,51 @@
+"""
+Common FastAPI app setup for the services
+
+Product-service, cart-service and the combined deployment install the same
+middleware stack and error handlers; keeping it here stops them drifting apart.
+"""
+from typing import Optional, Callable, Hashable
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from .instrumentation import ServerTimingMiddleware
+from .resilience import DeadlineMiddleware
+from .response_cache import ResponseCacheMiddleware
+from .metrics import setup_metrics
+from .dynamodb_utils import setup_dynamodb_error_handlers
+
+# Catalog reads answered by the response cache
+CATALOG_PATH_PREFIXES = ("/api/products", "/api/categories")
+
+
+def setup_service_app(app: FastAPI, catalog_version: Optional[Callable[[], Hashable]] = None):
+    """Install the services' middleware and error handlers (plus the catalog response cache if ``catalog_version`` is given)"""
+    if catalog_version is not None:
+        # Repeated catalog GETs are answered from cached response bytes (innermost, so CORS still applies)
+        app.add_middleware(
+            ResponseCacheMiddleware,
+            path_prefixes=CATALOG_PATH_PREFIXES,
+            version=catalog_version
+        )
+
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, specify exact origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Callers' deadlines (X-Request-Deadline-Ms): expired requests get 504, the rest bound retries and calls
+    app.add_middleware(DeadlineMiddleware)
+
+    # Per-request backend call timings (Server-Timing header, slow-request log)
+    app.add_middleware(ServerTimingMiddleware)
+
+    # Opt-in Prometheus metrics on /metrics (METRICS_ENABLED)
+    setup_metrics(app)
+
+    # Exhausted DynamoDB retries become 503 with Retry-After
+    setup_dynamodb_error_handlers(app)
@@ -0,0 +1,117 @@
+"""
+In-process transport for requests: send HTTP requests to an ASGI app without a socket
+
+The combined deployment (combined-service) mounts this on cart-service's
+HTTP session, so its calls to product-service reach the product routes in
+the same process with the same status codes, headers and middleware as
+over the network. The app runs on a background event loop of its own, so
+callers may be worker threads or code blocking another event loop.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Optional, List, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+
+class ASGIAdapter(BaseAdapter):
+    """requests transport adapter that serves requests from an ASGI app"""
+
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if isinstance(timeout, tuple):
+            timeout = timeout[1]
+        future = asyncio.run_coroutine_threadsafe(self._call(request), self._get_loop())
+        try:
+            status, headers, body = future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise requests.exceptions.ReadTimeout(f"In-process request timed out after {timeout}s", request=request)
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(
+            (name.decode("latin-1"), value.decode("latin-1")) for name, value in headers
+        )
+        response._content = body
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.reason = "In-process"
+        return response
+
+    def close(self):
+        pass
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="asgi-transport", daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    async def _call(self, request) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+        url = urlsplit(request.url)
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        request_headers = CaseInsensitiveDict(request.headers)
+        # The body is handed over as is (no urllib3 to decode it), so ask for it uncompressed
+        request_headers["Accept-Encoding"] = "identity"
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": request.method,
+            "scheme": url.scheme,
+            "server": (url.hostname, url.port or 80),
+            "client": ("127.0.0.1", 0),
+            "root_path": "",
+            "path": url.path,
+            "raw_path": url.path.encode("latin-1"),
+            "query_string": url.query.encode("latin-1"),
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                        for name, value in request_headers.items()],
+        }
+        status = None
+        headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+        received = False
+
+        async def receive():
+            nonlocal received
+            if received:
+                return {"type": "http.disconnect"}
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await self.app(scope, receive, send)
+        except Exception:
+            # The app has already answered 500 if it got that far; otherwise answer it here
+            logger.exception(f"In-process {request.method} {url.path} failed")
+            if status is None:
+                return 500, [], b""
+        return status or 500, headers, b"".join(chunks)
@@ -1,14 +1,15 @@
 """
 AWS Cognito authentication utilities for microservices
+
+``requests`` and ``jose`` are imported on first use so that services running
+with local JWT auth don't pay for them at cold start.
 """
-import json
-import requests
 from typing import Optional, Dict, Any
-from jose import jwt, JWTError
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from .env_config import settings
 from .models import UserToken
+from .metrics import record_cache_lookup
 
 security = HTTPBearer()
 
@@ -23,7 +24,10 @@ def get_cognito_jwks() -> Dict[str, Any]:
     """
     global _jwks_cache
     
+    record_cache_lookup("jwks", _jwks_cache is not None)
     if _jwks_cache is None:
+        import requests
+
         if not settings.COGNITO_USER_POOL_ID or not settings.COGNITO_USER_POOL_REGION:
             raise ValueError("Cognito User Pool ID and Region must be configured")
         
@@ -65,6 +69,8 @@ def verify_cognito_token(token: str) -> UserToken:
     """
     Verify Cognito JWT token and return user information
     """
+    from jose import jwt, JWTError
+    
     try:
         # Get token header
         unverified_header = jwt.get_unverified_header(token)
@@ -1,43 +1,150 @@
 """
 Shared DynamoDB utilities for microservices
+
+Throttled (and transiently failing) calls are retried per operation with
+jittered exponential backoff. When the retries run out a DynamoDBError is
+raised instead of looking like a missing item or an empty table; services
+turn it into 503 with Retry-After via ``setup_dynamodb_error_handlers``.
+
+Calls (and their backoff sleeps) block the calling thread, so async routes
+must make them through ``run_in_threadpool``, never on the event loop.
 """
+import math
+import random
+import threading
+import time
 import boto3
-from typing import Optional, Dict, Any
-from botocore.exceptions import ClientError
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from typing import Optional, Dict, Any, Callable, Iterator, List
+from botocore.config import Config
+from botocore.exceptions import ClientError, EndpointConnectionError, ConnectTimeoutError, ReadTimeoutError
 import logging
 from .env_config import config
+from .instrumentation import track_call
+from .resilience import deadline_remaining
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
-def get_dynamodb_client():
-    """Get DynamoDB client for local or AWS"""
+# Adaptive mode adds client-side rate limiting that backs off once DynamoDB
+# starts throttling. Retries themselves are done per operation below, so
+# botocore makes a single attempt and the two retry loops don't multiply.
+_BOTO_CONFIG = Config(retries={'mode': 'adaptive', 'total_max_attempts': 1})
+
+THROTTLING_ERRORS = {'ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded'}
+UNAVAILABLE_ERRORS = {'InternalServerError', 'ServiceUnavailable'}
+
+
+class DynamoDBError(Exception):
+    """DynamoDB call that failed after all retries"""
+
+    def __init__(self, operation: str, code: str, retry_after: int):
+        super().__init__(f"DynamoDB {operation} failed: {code}")
+        self.operation = operation
+        self.code = code
+        self.retry_after = retry_after
+
+
+class DynamoDBThrottledError(DynamoDBError):
+    """DynamoDB kept throttling the call"""
+
+
+class DynamoDBUnavailableError(DynamoDBError):
+    """DynamoDB kept failing with server-side or connection errors"""
+
+
+class RetryPolicy:
+    """Retry budget and full-jitter backoff for one DynamoDB operation"""
+
+    __slots__ = ('max_attempts', 'base_delay', 'max_delay')
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait before retry number ``attempt`` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @property
+    def retry_after(self) -> int:
+        """Seconds clients are asked to wait once the retries are exhausted"""
+        return max(1, math.ceil(self.max_delay))
+
+
+# Reads retry longer than writes; paged reads retry each page on its own so a
+# throttled scan or query resumes from its last key instead of restarting.
+RETRY_POLICIES: Dict[str, RetryPolicy] = {
+    'GetItem': RetryPolicy(max_attempts=4, base_delay=0.05, max_delay=1.0),
+    'Query': RetryPolicy(max_attempts=5, base_delay=0.05, max_delay=2.0),
+    'Scan': RetryPolicy(max_attempts=5, base_delay=0.1, max_delay=2.0),
+    'PutItem': RetryPolicy(max_attempts=3, base_delay=0.05, max_delay=0.5),
+    'UpdateItem': RetryPolicy(max_attempts=3, base_delay=0.05, max_delay=0.5),
+    'DeleteItem': RetryPolicy(max_attempts=3, base_delay=0.05, max_delay=0.5),
+    'TransactWriteItems': RetryPolicy(max_attempts=3, base_delay=0.05, max_delay=0.5),
+    'BatchGetItem': RetryPolicy(max_attempts=4, base_delay=0.05, max_delay=1.0),
+    # Bulk writes back off patiently: unprocessed items mean the table is at capacity
+    'BatchWriteItem': RetryPolicy(max_attempts=8, base_delay=0.05, max_delay=2.0),
+}
+
+# DynamoDB's limits on actions in one TransactWriteItems call and items in one BatchGetItem/BatchWriteItem call
+TRANSACTION_MAX_ITEMS = 100
+BATCH_GET_MAX_KEYS = 100
+BATCH_WRITE_MAX_ITEMS = 25
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+DEFAULT_RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=0.05, max_delay=1.0)
+
+# boto3 clients are thread-safe and shared process-wide; resources are not,
+# so each thread gets its own. Both are created once and reused across requests.
+_client = None
+_client_lock = threading.Lock()
+_thread_local = threading.local()
+
+
+def _connection_kwargs() -> Dict[str, Any]:
+    """Connection arguments for local or AWS DynamoDB"""
     if config.DYNAMODB_ENDPOINT:
         # Local DynamoDB
-        return boto3.client(
-            'dynamodb',
-            endpoint_url=config.DYNAMODB_ENDPOINT,
-            region_name=config.AWS_REGION,
-            aws_access_key_id=config.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY
-        )
-    else:
-        # AWS DynamoDB
-        return boto3.client('dynamodb', region_name=config.AWS_REGION)
+        return {
+            'endpoint_url': config.DYNAMODB_ENDPOINT,
+            'region_name': config.AWS_REGION,
+            'aws_access_key_id': config.AWS_ACCESS_KEY_ID,
+            'aws_secret_access_key': config.AWS_SECRET_ACCESS_KEY,
+            'config': _BOTO_CONFIG
+        }
+    # AWS DynamoDB
+    return {'region_name': config.AWS_REGION, 'config': _BOTO_CONFIG}
+
+def _memory_engine():
+    """The in-process engine used with STORAGE_BACKEND=memory (imported only then)"""
+    from .memory_dynamodb import get_engine
+    return get_engine()
+
+def get_dynamodb_client():
+    """Get DynamoDB client for local or AWS (or the in-memory engine's)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if config.STORAGE_BACKEND == 'memory':
+                    _client = _memory_engine().client
+                else:
+                    _client = boto3.client('dynamodb', **_connection_kwargs())
+    return _client
 
 def get_dynamodb_resource():
-    """Get DynamoDB resource for local or AWS"""
-    if config.DYNAMODB_ENDPOINT:
-        # Local DynamoDB
-        return boto3.resource(
-            'dynamodb',
-            endpoint_url=config.DYNAMODB_ENDPOINT,
-            region_name=config.AWS_REGION,
-            aws_access_key_id=config.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY
-        )
-    else:
-        # AWS DynamoDB
-        return boto3.resource('dynamodb', region_name=config.AWS_REGION)
+    """Get DynamoDB resource for local or AWS (or the in-memory engine's)"""
+    resource = getattr(_thread_local, 'resource', None)
+    if resource is None:
+        if config.STORAGE_BACKEND == 'memory':
+            resource = _memory_engine().resource
+        else:
+            resource = boto3.resource('dynamodb', **_connection_kwargs())
+        _thread_local.resource = resource
+    return resource
 
 def create_table_if_not_exists(
     table_name: str,
@@ -96,10 +203,55 @@ def create_table_if_not_exists(
         logger.error(f"Error creating table {table_name}: {create_error}")
         return False
 
-def safe_get_item(table, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+def _retry_or_raise(policy: RetryPolicy, operation: str, attempt: int, code: str, error_class, error: Exception):
+    """Sleep before the next attempt, or raise once the policy's attempts are used up"""
+    if attempt >= policy.max_attempts:
+        logger.error(f"DynamoDB {operation} failed after {attempt} attempts: {code}")
+        raise error_class(operation, code, policy.retry_after) from error
+
+    delay = policy.backoff(attempt)
+    remaining = deadline_remaining()
+    if remaining is not None and remaining <= delay:
+        # The caller will have given up before the retry could answer
+        logger.error(f"DynamoDB {operation} failed with {code}, no time left before the request deadline")
+        raise error_class(operation, code, policy.retry_after) from error
+
+    metrics.record_dynamodb_retry(operation, code)
+    logger.warning(f"DynamoDB {operation} failed with {code}, retrying in {delay * 1000:.0f}ms (attempt {attempt}/{policy.max_attempts})")
+    time.sleep(delay)
+
+
+def call_with_retry(operation: str, method: Callable[..., Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+    """Call a DynamoDB operation, retrying throttled and transient failures.
+
+    Other ClientErrors (validation, failed conditions) are raised unchanged.
+    """
+    policy = RETRY_POLICIES.get(operation, DEFAULT_RETRY_POLICY)
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            with track_call('dynamodb', operation) as call:
+                response = method(**kwargs)
+                call.observe(response)
+            return response
+        except ClientError as e:
+            code = e.response.get('Error', {}).get('Code', '')
+            status_code = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+            if code in THROTTLING_ERRORS:
+                _retry_or_raise(policy, operation, attempt, code, DynamoDBThrottledError, e)
+            elif code in UNAVAILABLE_ERRORS or status_code >= 500:
+                _retry_or_raise(policy, operation, attempt, code, DynamoDBUnavailableError, e)
+            else:
+                raise
+        except (EndpointConnectionError, ConnectTimeoutError, ReadTimeoutError) as e:
+            _retry_or_raise(policy, operation, attempt, type(e).__name__, DynamoDBUnavailableError, e)
+
+def safe_get_item(table, key: Dict[str, Any], consistent_read: bool = False) -> Optional[Dict[str, Any]]:
     """Safely get item from DynamoDB table"""
     try:
-        response = table.get_item(Key=key)
+        response = call_with_retry('GetItem', table.get_item, Key=key, ConsistentRead=consistent_read,
+                                   ReturnConsumedCapacity='TOTAL')
         return response.get('Item')
     except ClientError as e:
         logger.error(f"Error getting item: {e}")
@@ -108,7 +260,7 @@ def safe_get_item(table, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
 def safe_put_item(table, item: Dict[str, Any]) -> bool:
     """Safely put item to DynamoDB table"""
     try:
-        table.put_item(Item=item)
+        call_with_retry('PutItem', table.put_item, Item=item, ReturnConsumedCapacity='TOTAL')
         return True
     except ClientError as e:
         logger.error(f"Error putting item: {e}")
@@ -122,22 +274,178 @@ def safe_update_item(table, key: Dict[str, Any], update_expression: str,
         update_params = {
             'Key': key,
             'UpdateExpression': update_expression,
-            'ExpressionAttributeValues': expression_attribute_values
+            'ExpressionAttributeValues': expression_attribute_values,
+            'ReturnConsumedCapacity': 'TOTAL'
         }
         
         if expression_attribute_names:
             update_params['ExpressionAttributeNames'] = expression_attribute_names
             
-        table.update_item(**update_params)
+        call_with_retry('UpdateItem', table.update_item, **update_params)
         return True
     except ClientError as e:
         logger.error(f"Error updating item: {e}")
         return False
 
+def conditional_update_item(table, key: Dict[str, Any], update_expression: str, condition_expression: str,
+                            expression_attribute_values: Dict[str, Any],
+                            expression_attribute_names: Optional[Dict[str, str]] = None,
+                            return_values: str = 'ALL_NEW') -> Optional[Dict[str, Any]]:
+    """Update an item only if the condition holds.
+
+    Returns the attributes selected by ``return_values``, or None when the
+    condition failed. The check and the write are a single atomic operation.
+    """
+    update_params = {
+        'Key': key,
+        'UpdateExpression': update_expression,
+        'ConditionExpression': condition_expression,
+        'ExpressionAttributeValues': expression_attribute_values,
+        'ReturnValues': return_values,
+        'ReturnConsumedCapacity': 'TOTAL'
+    }
+    if expression_attribute_names:
+        update_params['ExpressionAttributeNames'] = expression_attribute_names
+
+    try:
+        response = call_with_retry('UpdateItem', table.update_item, **update_params)
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return None
+        raise
+    return response.get('Attributes', {})
+
+def conditional_delete_item(table, key: Dict[str, Any], condition_expression: str,
+                            expression_attribute_values: Optional[Dict[str, Any]] = None,
+                            expression_attribute_names: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+    """Delete an item only if the condition holds; returns the deleted item, or None"""
+    delete_params = {
+        'Key': key,
+        'ConditionExpression': condition_expression,
+        'ReturnValues': 'ALL_OLD',
+        'ReturnConsumedCapacity': 'TOTAL'
+    }
+    if expression_attribute_values:
+        delete_params['ExpressionAttributeValues'] = expression_attribute_values
+    if expression_attribute_names:
+        delete_params['ExpressionAttributeNames'] = expression_attribute_names
+
+    try:
+        response = call_with_retry('DeleteItem', table.delete_item, **delete_params)
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return None
+        raise
+    return response.get('Attributes')
+
+def transact_write_items(transact_items: List[Dict[str, Dict[str, Any]]],
+                         client_request_token: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Run a write transaction; returns [] on success, or one cancellation reason per action.
+
+    Actions use plain Python values (as with the table resource), e.g.
+    ``{'Update': {'TableName': ..., 'Key': {...}, 'UpdateExpression': ...}}``.
+    Each reason has a ``Code`` ('None' for actions that did not fail) and,
+    when requested, the conflicting ``Item``.
+    """
+    serialized = []
+    for action in transact_items:
+        (kind, params), = action.items()
+        params = dict(params)
+        for field in ('Key', 'Item', 'ExpressionAttributeValues'):
+            if field in params:
+                params[field] = {k: _serializer.serialize(v) for k, v in params[field].items()}
+        serialized.append({kind: params})
+
+    request = {'TransactItems': serialized, 'ReturnConsumedCapacity': 'TOTAL'}
+    if client_request_token:
+        # Makes retries of the same call idempotent
+        request['ClientRequestToken'] = client_request_token
+
+    try:
+        call_with_retry('TransactWriteItems', get_dynamodb_client().transact_write_items, **request)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        reasons = e.response.get('CancellationReasons') or [{'Code': 'Unknown'}] * len(transact_items)
+        return [
+            {**reason, 'Item': {k: _deserializer.deserialize(v) for k, v in reason['Item'].items()}}
+            if 'Item' in reason else reason
+            for reason in reasons
+        ]
+    return []
+
+def batch_get_items(table_name: str, keys: List[Dict[str, Any]], **kwargs) -> List[Dict[str, Any]]:
+    """Get many items by key with BatchGetItem, following up on unprocessed keys.
+
+    Missing items are skipped; results are in no particular order.
+    """
+    dynamodb = get_dynamodb_resource()
+    items = []
+    for start in range(0, len(keys), BATCH_GET_MAX_KEYS):
+        request = {table_name: {'Keys': keys[start:start + BATCH_GET_MAX_KEYS], **kwargs}}
+        attempt = 0
+        while request:
+            response = call_with_retry(
+                'BatchGetItem', dynamodb.batch_get_item,
+                RequestItems=request, ReturnConsumedCapacity='TOTAL'
+            )
+            items.extend(response.get('Responses', {}).get(table_name, []))
+            request = response.get('UnprocessedKeys') or None
+            if request:
+                # Unprocessed keys are DynamoDB shedding load: back off like a throttled call
+                attempt += 1
+                _retry_or_raise(RETRY_POLICIES['BatchGetItem'], 'BatchGetItem', attempt,
+                                'UnprocessedKeys', DynamoDBThrottledError, None)
+    return items
+
+def batch_write_items(table_name: str, items: List[Dict[str, Any]]) -> int:
+    """Put items with BatchWriteItem, resending unprocessed items; returns how many were written.
+
+    Items use plain Python values (numbers as int or Decimal) and must not
+    repeat a key within one call of ``BATCH_WRITE_MAX_ITEMS`` items.
+    """
+    client = get_dynamodb_client()
+    for start in range(0, len(items), BATCH_WRITE_MAX_ITEMS):
+        request = {table_name: [
+            {'PutRequest': {'Item': {k: _serializer.serialize(v) for k, v in item.items()}}}
+            for item in items[start:start + BATCH_WRITE_MAX_ITEMS]
+        ]}
+        attempt = 0
+        while request:
+            response = call_with_retry(
+                'BatchWriteItem', client.batch_write_item,
+                RequestItems=request, ReturnConsumedCapacity='TOTAL'
+            )
+            request = response.get('UnprocessedItems') or None
+            if request:
+                attempt += 1
+                _retry_or_raise(RETRY_POLICIES['BatchWriteItem'], 'BatchWriteItem', attempt,
+                                'UnprocessedItems', DynamoDBThrottledError, None)
+    return len(items)
+
+def scan_segment(table_name: str, segment: int, total_segments: int, **kwargs) -> Iterator[List[Dict[str, Any]]]:
+    """Yield the pages of one segment of a parallel scan.
+
+    Items stay in DynamoDB's typed wire format (numbers as strings), so callers
+    can stream them out without building Decimals. Each page is retried on its
+    own, so a throttled segment resumes from its last key.
+    """
+    client = get_dynamodb_client()
+    request = {
+        'TableName': table_name, 'Segment': segment, 'TotalSegments': total_segments,
+        'ReturnConsumedCapacity': 'TOTAL', **kwargs
+    }
+    while True:
+        response = call_with_retry('Scan', client.scan, **request)
+        yield response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        request['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
 def safe_delete_item(table, key: Dict[str, Any]) -> bool:
     """Safely delete item from DynamoDB table"""
     try:
-        table.delete_item(Key=key)
+        call_with_retry('DeleteItem', table.delete_item, Key=key, ReturnConsumedCapacity='TOTAL')
         return True
     except ClientError as e:
         logger.error(f"Error deleting item: {e}")
@@ -147,9 +455,11 @@ def safe_scan(table, **kwargs) -> list:
     """Safely scan DynamoDB table with pagination"""
     try:
         items = []
+        kwargs.setdefault('ReturnConsumedCapacity', 'TOTAL')
         
         while True:
-            response = table.scan(**kwargs)
+            # Each page is retried on its own, keeping the items already read
+            response = call_with_retry('Scan', table.scan, **kwargs)
             items.extend(response.get('Items', []))
             
             # Check if there are more items
@@ -167,9 +477,11 @@ def safe_query(table, **kwargs) -> list:
     """Safely query DynamoDB table with pagination"""
     try:
         items = []
+        kwargs.setdefault('ReturnConsumedCapacity', 'TOTAL')
         
         while True:
-            response = table.query(**kwargs)
+            # Each page is retried on its own, keeping the items already read
+            response = call_with_retry('Query', table.query, **kwargs)
             items.extend(response.get('Items', []))
             
             # Check if there are more items
@@ -182,3 +494,18 @@ def safe_query(table, **kwargs) -> list:
     except ClientError as e:
         logger.error(f"Error querying table: {e}")
         return []
+
+
+async def dynamodb_error_handler(request, exc: DynamoDBError):
+    """Turn exhausted DynamoDB retries into 503 with Retry-After"""
+    from fastapi.responses import JSONResponse
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service temporarily unavailable, please retry"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+def setup_dynamodb_error_handlers(app):
+    """Register the DynamoDBError handler on a FastAPI app"""
+    app.add_exception_handler(DynamoDBError, dynamodb_error_handler)
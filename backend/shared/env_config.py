@@ -2,10 +2,13 @@
 Environment configuration using Pydantic models with dotenv integration
 """
 import os
+import logging
 from pathlib import Path
 from typing import Optional, Literal
 from pydantic import Field, field_validator
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+logger = logging.getLogger(__name__)
 
 
 class Settings(BaseSettings):
@@ -20,13 +23,19 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str = Field(default="dummy", description="AWS secret access key")
     
     # DynamoDB Configuration
+    STORAGE_BACKEND: Literal["dynamodb", "memory"] = Field(default="dynamodb", description="Where the services keep their tables: DynamoDB (AWS or DYNAMODB_ENDPOINT) or an in-process memory engine for tests and benchmarks")
     DYNAMODB_ENDPOINT: Optional[str] = Field(default=None, description="DynamoDB endpoint URL for local development")
     PRODUCTS_TABLE_NAME: str = Field(default="ecom-products", description="Products table name")
     CARTS_TABLE_NAME: str = Field(default="ecom-carts", description="Carts table name")
+    RESERVATIONS_TABLE_NAME: str = Field(default="ecom-reservations", description="Stock reservations table name")
+    STOCK_SHARDS_TABLE_NAME: str = Field(default="ecom-stock-shards", description="Sharded stock counters table name")
     
     # Service Configuration
     PORT: int = Field(default=8001, description="Service port")
     JWT_SECRET_KEY: str = Field(default="change-this-secret-key-in-production-min-32-chars", description="JWT secret key")
+    SERVER_WORKERS: Optional[int] = Field(default=None, description="Worker processes started by app.server (unset: one per available CPU)")
+    SERVER_MAX_REQUESTS: int = Field(default=10000, description="Requests after which app.server replaces a worker (0 never replaces them)")
+    SERVER_MAX_REQUESTS_JITTER: int = Field(default=1000, description="Random extra requests per worker, so workers are not replaced together")
     
     # Cognito Configuration
     COGNITO_USER_POOL_ID: Optional[str] = Field(default=None, description="Cognito User Pool ID")
@@ -36,11 +45,37 @@ class Settings(BaseSettings):
     COGNITO_API_CLIENT_SECRET: Optional[str] = Field(default=None, description="Cognito API Client Secret")
     USE_COGNITO_AUTH: bool = Field(default=False, description="Use Cognito for authentication instead of local JWT")
     
+    # Catalog Configuration
+    CATALOG_REFRESH_SECONDS: int = Field(default=60, description="Seconds before the in-memory catalog snapshot is refreshed")
+    RESERVATION_TTL_SECONDS: int = Field(default=900, description="Seconds before an unreleased stock reservation expires")
+    STOCK_REBALANCE_SECONDS: int = Field(default=60, description="Seconds between rebalances of a product's stock shards")
+    IMPORT_WORKERS: int = Field(default=8, description="Parallel BatchWriteItem workers used by bulk product imports")
+    ADMIN_API_KEY: Optional[str] = Field(default=None, description="Key expected in X-Admin-Key by admin endpoints (unset disables them)")
+    CATALOG_SNAPSHOT_PATH: Optional[str] = Field(default=None, description="Memory-mapped catalog snapshot that serves product reads (unset reads DynamoDB)")
+    CATALOG_SNAPSHOT_CHECK_SECONDS: int = Field(default=30, description="Seconds between checks for a newer catalog snapshot file")
+    RESPONSE_CACHE_MAX_BYTES: int = Field(default=32 * 1024 * 1024, description="Memory for cached GET catalog responses (0 disables the cache)")
+    RESPONSE_CACHE_TTL_SECONDS: float = Field(default=5.0, description="Seconds a cached GET catalog response is served (bounds how stale stock can be)")
+    SINGLEFLIGHT_TIMEOUT_SECONDS: float = Field(default=5.0, description="Seconds a read waits for an identical in-flight read before making its own call")
+    PRODUCT_READ_MODE: Literal["http", "direct"] = Field(default="http", description="How cart-service reads products: through product-service (http) or from the products table (direct)")
+    PRODUCT_CACHE_TTL_SECONDS: float = Field(default=2.0, description="Seconds a product read directly from the products table is cached (0 disables the cache)")
+    CART_CACHE_TTL_SECONDS: float = Field(default=2.0, description="Seconds cart-service keeps a cart in its per-process cache, served after a version check (0 disables)")
+    CART_CACHE_MAX_ITEMS: int = Field(default=10000, description="Carts kept in cart-service's per-process cache")
+    
     # Inter-service Communication
     PRODUCT_SERVICE_URL: str = Field(default="http://localhost:8001/api", description="Product service URL")
+    SERVICE_API_KEY: Optional[str] = Field(default=None, description="Key cart-service sends in X-Service-Key to product-service's reservation endpoints (unset disables them)")
+    PRODUCT_SERVICE_TIMEOUT_SECONDS: float = Field(default=3.0, description="Timeout of a call to product-service (shortened to the request's deadline)")
+    PRODUCT_SERVICE_HEDGING: bool = Field(default=False, description="Repeat a product read that is slower than the recent p95 and use the first answer")
+    CIRCUIT_BREAKER_FAILURE_RATIO: float = Field(default=0.5, description="Share of failed calls in the window that opens a circuit breaker")
+    CIRCUIT_BREAKER_MIN_CALLS: int = Field(default=20, description="Calls in the window before a circuit breaker may open")
+    CIRCUIT_BREAKER_WINDOW_SECONDS: int = Field(default=10, description="Seconds of calls a circuit breaker judges the failure ratio on")
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = Field(default=5.0, description="Seconds an open circuit breaker fails calls before letting a trial call through")
     
     # Logging
     LOG_LEVEL: str = Field(default="INFO", description="Logging level")
+    SLOW_REQUEST_MS: int = Field(default=500, description="Requests slower than this are logged with their backend calls")
+    SERVER_TIMING_ENABLED: bool = Field(default=True, description="Emit Server-Timing response headers")
+    METRICS_ENABLED: bool = Field(default=False, description="Collect metrics and expose them on /metrics")
     DEBUG: bool = Field(default=True, description="Debug mode")
     
     # Additional Configuration
@@ -80,7 +115,7 @@ class Settings(BaseSettings):
             required_fields = ["COGNITO_USER_POOL_ID", "COGNITO_WEB_CLIENT_ID"]
             for field in required_fields:
                 if not values.get(field):
-                    print(f"⚠️  Warning: {field} is required when USE_COGNITO_AUTH is True")
+                    logger.warning(f"{field} is required when USE_COGNITO_AUTH is True")
         return v
     
     def is_local(self) -> bool:
@@ -91,6 +126,10 @@ class Settings(BaseSettings):
         """Check if running in production environment"""
         return self.ENV == "prod"
     
+    def is_lambda(self) -> bool:
+        """Check if running inside the AWS Lambda runtime"""
+        return "AWS_LAMBDA_FUNCTION_NAME" in os.environ
+    
     def get_cors_origins_list(self) -> list[str]:
         """Get CORS origins as a list"""
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
@@ -99,59 +138,49 @@ class Settings(BaseSettings):
         """Get allowed hosts as a list"""
         return [host.strip() for host in self.ALLOWED_HOSTS.split(",")]
     
-    class Config:
-        # Environment file configuration
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = True
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=True,
+    )
+    
+    @classmethod
+    def settings_customise_sources(cls, settings_cls, init_settings, env_settings, dotenv_settings, file_secret_settings):
+        """Only probe the filesystem for .env files when running locally"""
+        if os.getenv("ENV", "local") != "local":
+            # Deployed environments are configured purely through OS environment variables
+            return init_settings, env_settings
         
-        # Look for .env files in multiple locations
-        @classmethod
-        def customise_sources(cls, init_settings, env_settings, file_secret_settings):
-            """Customize settings sources to look for .env files in multiple locations"""
-            
-            def env_file_loader():
-                """Load environment from .env files with priority order"""
-                env_mode = os.getenv("ENV", "local")
-                
-                if env_mode == "local":
-                    # Look for .env file in multiple locations (priority order)
-                    possible_env_paths = [
-                        Path.cwd() / ".env",  # Current working directory
-                        Path(__file__).parent.parent / ".env",  # backend/.env
-                        Path(__file__).parent.parent.parent / ".env",  # project root/.env
-                    ]
-                    
-                    for env_path in possible_env_paths:
-                        if env_path.exists():
-                            print(f"✅ Loading environment from: {env_path}")
-                            # Load the .env file
-                            from dotenv import load_dotenv
-                            load_dotenv(env_path)
-                            break
-                    else:
-                        print("⚠️  No .env file found, using OS environment variables")
-                
-                # Return empty dict as dotenv already loaded variables into os.environ
-                return {}
-            
-            return (
-                init_settings,
-                env_file_loader,
-                env_settings,
-                file_secret_settings,
-            )
+        load_local_env_file()
+        return init_settings, env_settings, dotenv_settings, file_secret_settings
+
+
+def load_local_env_file():
+    """Load environment from the first .env file found (priority order)"""
+    possible_env_paths = [
+        Path.cwd() / ".env",  # Current working directory
+        Path(__file__).parent.parent / ".env",  # backend/.env
+        Path(__file__).parent.parent.parent / ".env",  # project root/.env
+    ]
+    
+    for env_path in possible_env_paths:
+        if env_path.exists():
+            logger.info(f"Loading environment from: {env_path}")
+            from dotenv import load_dotenv
+            load_dotenv(env_path)
+            return
+    
+    logger.info("No .env file found, using OS environment variables")
 
 
 # Create global settings instance
 try:
     settings = Settings()
-    print(f"📋 Configuration loaded for environment: {settings.ENV}")
+    logger.info(f"Configuration loaded for environment: {settings.ENV}")
     if settings.is_local():
-        print(f"🗄️  DynamoDB endpoint: {settings.DYNAMODB_ENDPOINT}")
-    print(f"🔧 Service port: {settings.PORT}")
+        logger.info(f"DynamoDB endpoint: {settings.DYNAMODB_ENDPOINT}")
 except Exception as e:
-    print(f"❌ Error loading configuration: {e}")
+    logger.error(f"Error loading configuration: {e}")
     raise
 
 
@@ -176,6 +205,10 @@ def get_carts_table_name() -> str:
     return settings.CARTS_TABLE_NAME
 
 
+def get_reservations_table_name() -> str:
+    return settings.RESERVATIONS_TABLE_NAME
+
+
 def get_jwt_secret() -> str:
     return settings.JWT_SECRET_KEY
 
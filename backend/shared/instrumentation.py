@@ -0,0 +1,156 @@
+"""
+Per-request instrumentation of backend calls (DynamoDB, inter-service HTTP)
+
+Calls made while a request is being handled are grouped in a RequestTimings
+object held in a context variable. ServerTimingMiddleware creates it, emits
+the totals as a ``Server-Timing`` response header and logs requests slower
+than ``SLOW_REQUEST_MS``.
+"""
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List
+
+from .env_config import settings
+from . import metrics
+
+slow_request_logger = logging.getLogger("slow_requests")
+
+_current_timings: contextvars.ContextVar[Optional["RequestTimings"]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+class BackendCall:
+    """One backend call made while handling a request"""
+
+    __slots__ = ("kind", "operation", "duration_ms", "items", "consumed_capacity")
+
+    def __init__(self, kind: str, operation: str):
+        self.kind = kind
+        self.operation = operation
+        self.duration_ms = 0.0
+        self.items = 0
+        self.consumed_capacity = 0.0
+
+    def observe(self, response: Dict[str, Any]):
+        """Pick up item count and consumed capacity from a DynamoDB response"""
+        if 'Items' in response:
+            self.items += len(response['Items'])
+        elif 'Responses' in response:
+            self.items += sum(len(items) for items in response['Responses'].values())
+        elif response.get('Item') is not None:
+            self.items += 1
+
+        consumed = response.get('ConsumedCapacity')
+        if isinstance(consumed, dict):
+            consumed = [consumed]
+        for entry in consumed or []:
+            units = entry.get('CapacityUnits', 0.0)
+            self.consumed_capacity += units
+            metrics.record_consumed_capacity(entry.get('TableName', ''), self.operation, units)
+
+
+class RequestTimings:
+    """Backend calls made while handling one request"""
+
+    def __init__(self):
+        self.calls: List[BackendCall] = []
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Call count, latency, items and capacity per call kind"""
+        totals: Dict[str, Dict[str, float]] = {}
+        for call in self.calls:
+            kind = totals.setdefault(call.kind, {'count': 0, 'duration_ms': 0.0, 'items': 0, 'capacity': 0.0})
+            kind['count'] += 1
+            kind['duration_ms'] += call.duration_ms
+            kind['items'] += call.items
+            kind['capacity'] += call.consumed_capacity
+        return totals
+
+    def server_timing(self, total_ms: float) -> str:
+        """Format the totals as a Server-Timing header value"""
+        metrics = []
+        for kind, total in self.totals().items():
+            description = f"{total['count']} calls"
+            if total['items']:
+                description += f", {total['items']} items"
+            if total['capacity']:
+                description += f", {total['capacity']:g} CU"
+            metrics.append(f'{kind};dur={total["duration_ms"]:.1f};desc="{description}"')
+        metrics.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(metrics)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Timings of the request being handled, if any"""
+    return _current_timings.get()
+
+
+@contextmanager
+def track_call(kind: str, operation: str):
+    """Time a backend call and attach it to the current request.
+
+    Yields a BackendCall whose ``observe`` method can be fed the response.
+    Outside of a request the call is timed but not recorded.
+    """
+    call = BackendCall(kind, operation)
+    started = time.perf_counter()
+    try:
+        yield call
+    finally:
+        elapsed = time.perf_counter() - started
+        call.duration_ms = elapsed * 1000
+        metrics.record_backend_call(kind, operation, elapsed)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.calls.append(call)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware that groups backend calls per request and reports them"""
+
+    def __init__(self, app, slow_request_ms: Optional[int] = None, emit_header: Optional[bool] = None):
+        self.app = app
+        self.slow_request_ms = settings.SLOW_REQUEST_MS if slow_request_ms is None else slow_request_ms
+        self.emit_header = settings.SERVER_TIMING_ENABLED if emit_header is None else emit_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.emit_header:
+                    total_ms = (time.perf_counter() - started) * 1000
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.server_timing(total_ms).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timings.reset(token)
+            total_ms = (time.perf_counter() - started) * 1000
+            if total_ms >= self.slow_request_ms:
+                self._log_slow_request(scope, status_code, total_ms, timings)
+
+    def _log_slow_request(self, scope, status_code: int, total_ms: float, timings: RequestTimings):
+        calls = "; ".join(
+            f"{call.kind}:{call.operation} {call.duration_ms:.1f}ms items={call.items} cu={call.consumed_capacity:g}"
+            for call in timings.calls
+        )
+        slow_request_logger.warning(
+            f"Slow request {scope['method']} {scope['path']} -> {status_code} in {total_ms:.1f}ms "
+            f"({len(timings.calls)} backend calls: {calls or 'none'})"
+        )
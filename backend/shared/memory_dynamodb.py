@@ -0,0 +1,1213 @@
+"""
+In-memory DynamoDB engine (STORAGE_BACKEND=memory)
+
+With STORAGE_BACKEND=memory, ``dynamodb_utils.get_dynamodb_client`` and
+``get_dynamodb_resource`` return this engine's client and resource instead
+of boto3's. ProductDB, CartDB, checkout and the dynamodb_utils helpers then
+run unchanged against tables held in the process: no DynamoDB Local (and its
+JVM), no moto, no network. Tests and benchmarks start in milliseconds and
+measure the application without database latency.
+
+The storage interface is the part of the DynamoDB API the services use:
+
+- tables: create_table, delete_table, describe_table, list_tables, waiters
+- items: get_item, put_item, update_item and delete_item with condition,
+  update and projection expressions
+- reads: query on the table or a global secondary index, scan (also in
+  segments), batch_get_item
+- writes: batch_write_item, ``Table.batch_writer``, transact_write_items
+
+The resource and its tables take plain values (and boto3 condition
+objects), the client takes DynamoDB's typed wire format, as with boto3.
+
+Semantics follow DynamoDB where the services can observe them: numbers
+come back as Decimal and floats are rejected, failed conditions and
+cancelled transactions raise the same ClientErrors (with the old item when
+asked), transactions are atomic, indexes are sparse and projected, Limit
+counts the items read before the filter and unused expression names or
+values are rejected. Every read is strongly consistent, nothing is
+throttled, reserved words and size limits are not checked, and the data
+lives as long as the process.
+"""
+import bisect
+import re
+import threading
+import zlib
+from decimal import Decimal
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple
+
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer, Binary, DYNAMODB_CONTEXT
+from botocore.exceptions import ClientError, WaiterError
+
+# DynamoDB's limits per call
+TRANSACTION_MAX_ITEMS = 100
+BATCH_GET_MAX_KEYS = 100
+BATCH_WRITE_MAX_ITEMS = 25
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+_MISSING = object()
+
+_engine: Optional["MemoryDynamoDB"] = None
+_engine_lock = threading.Lock()
+
+
+def _error(operation: str, code: str, message: str, **response) -> ClientError:
+    return ClientError(
+        {'Error': {'Code': code, 'Message': message}, 'ResponseMetadata': {'HTTPStatusCode': 400}, **response},
+        operation
+    )
+
+
+def _validation(operation: str, message: str) -> ClientError:
+    return _error(operation, 'ValidationException', message)
+
+
+# --- Values -----------------------------------------------------------------
+
+def _canonical(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of plain values the way DynamoDB stores them (numbers as Decimal); floats raise TypeError like boto3"""
+    return {name: _deserializer.deserialize(_serializer.serialize(value)) for name, value in values.items()}
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def _from_wire(values: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    return None if values is None else {k: _deserializer.deserialize(v) for k, v in values.items()}
+
+
+def _to_wire(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: _serializer.serialize(v) for k, v in values.items()}
+
+
+def _type(value) -> str:
+    """DynamoDB type of a stored value"""
+    if isinstance(value, str):
+        return 'S'
+    if isinstance(value, bool):
+        return 'BOOL'
+    if isinstance(value, (Decimal, int)):
+        return 'N'
+    if isinstance(value, (Binary, bytes, bytearray)):
+        return 'B'
+    if value is None:
+        return 'NULL'
+    if isinstance(value, dict):
+        return 'M'
+    if isinstance(value, list):
+        return 'L'
+    if isinstance(value, set):
+        member = next(iter(value), '')
+        return {'S': 'SS', 'N': 'NS', 'B': 'BS'}.get(_type(member), 'SS')
+    return 'UNKNOWN'
+
+
+# --- Expressions --------------------------------------------------------------
+#
+# Expressions are parsed once into tuples and evaluated against an item with
+# the request's attribute names and values:
+#   ('path', (element, ...))   element: name, '#alias' or list index
+#   ('value', ':v')
+#   ('call', function, (operand, ...))
+#   ('+' | '-', left, right)
+#   ('cmp', operator, left, right), ('between', operand, low, high),
+#   ('in', operand, (operand, ...)), ('and' | 'or', left, right), ('not', condition)
+
+_TOKEN = re.compile(r"\s*(#[A-Za-z0-9_]+|:[A-Za-z0-9_]+|[A-Za-z_][A-Za-z0-9_]*|\d+|<>|<=|>=|[=<>(),.\[\]+\-])")
+_COMPARATORS = {'=', '<>', '<', '<=', '>', '>='}
+_CONDITION_FUNCTIONS = {'attribute_exists', 'attribute_not_exists', 'attribute_type', 'begins_with', 'contains'}
+_UPDATE_CLAUSES = {'SET', 'REMOVE', 'ADD', 'DELETE'}
+
+
+class _Parser:
+    def __init__(self, expression: str, operation: str):
+        self.operation = operation
+        self.tokens = []
+        self.names = set()
+        self.values = set()
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = _TOKEN.match(expression, position)
+            if match is None:
+                raise self.error(f"Syntax error; token: \"{expression[position:].strip()[:10]}\"")
+            self.tokens.append(match.group(1))
+            position = match.end()
+        self.position = 0
+
+    def error(self, message: str) -> ClientError:
+        return _validation(self.operation, f"Invalid expression: {message}")
+
+    def peek(self, offset: int = 0) -> Optional[str]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def keyword(self, *words: str) -> bool:
+        token = self.peek()
+        return token is not None and token.upper() in words
+
+    def take(self, expected: Optional[str] = None) -> str:
+        token = self.peek()
+        if token is None:
+            raise self.error("Syntax error; token: <EOF>")
+        if expected is not None and token.upper() != expected:
+            raise self.error(f"Syntax error; token: \"{token}\", expected \"{expected}\"")
+        self.position += 1
+        return token
+
+    def done(self):
+        if self.peek() is not None:
+            raise self.error(f"Syntax error; token: \"{self.peek()}\"")
+
+    # Operands
+
+    def path(self) -> tuple:
+        elements = [self.name()]
+        while self.peek() in ('.', '['):
+            if self.take() == '.':
+                elements.append(self.name())
+            else:
+                index = self.take()
+                if not index.isdigit():
+                    raise self.error(f"Syntax error; token: \"{index}\"")
+                elements.append(int(index))
+                self.take(']')
+        return ('path', tuple(elements))
+
+    def name(self) -> str:
+        token = self.take()
+        if token.startswith('#'):
+            self.names.add(token)
+        elif not re.match(r"[A-Za-z_]", token):
+            raise self.error(f"Syntax error; token: \"{token}\"")
+        return token
+
+    def operand(self) -> tuple:
+        token = self.peek()
+        if token is not None and token.startswith(':'):
+            self.values.add(self.take())
+            return ('value', token)
+        if token is not None and token.lower() in ('size', 'if_not_exists', 'list_append') and self.peek(1) == '(':
+            function = self.take().lower()
+            self.take('(')
+            args = [self.operand()]
+            while self.peek() == ',':
+                self.take()
+                args.append(self.operand())
+            self.take(')')
+            expected = {'size': 1, 'if_not_exists': 2, 'list_append': 2}[function]
+            if len(args) != expected:
+                raise self.error(f"Incorrect number of operands for function: {function}")
+            return ('call', function, tuple(args))
+        return self.path()
+
+    # Conditions
+
+    def condition(self) -> tuple:
+        node = self.conjunction()
+        while self.keyword('OR'):
+            self.take()
+            node = ('or', node, self.conjunction())
+        return node
+
+    def conjunction(self) -> tuple:
+        node = self.negation()
+        while self.keyword('AND'):
+            self.take()
+            node = ('and', node, self.negation())
+        return node
+
+    def negation(self) -> tuple:
+        if self.keyword('NOT'):
+            self.take()
+            return ('not', self.negation())
+        return self.predicate()
+
+    def predicate(self) -> tuple:
+        token = self.peek()
+        if token == '(':
+            self.take()
+            node = self.condition()
+            self.take(')')
+            return node
+        if token is not None and token.lower() in _CONDITION_FUNCTIONS and self.peek(1) == '(':
+            function = self.take().lower()
+            self.take('(')
+            args = [self.operand()]
+            while self.peek() == ',':
+                self.take()
+                args.append(self.operand())
+            self.take(')')
+            expected = 1 if function in ('attribute_exists', 'attribute_not_exists') else 2
+            if len(args) != expected or args[0][0] != 'path':
+                raise self.error(f"Incorrect operands for function: {function}")
+            return ('call', function, tuple(args))
+
+        left = self.operand()
+        if self.peek() in _COMPARATORS:
+            return ('cmp', self.take(), left, self.operand())
+        if self.keyword('BETWEEN'):
+            self.take()
+            low = self.operand()
+            self.take('AND')
+            return ('between', left, low, self.operand())
+        if self.keyword('IN'):
+            self.take()
+            self.take('(')
+            options = [self.operand()]
+            while self.peek() == ',':
+                self.take()
+                options.append(self.operand())
+            self.take(')')
+            return ('in', left, tuple(options))
+        raise self.error(f"Syntax error; token: \"{self.peek() or '<EOF>'}\"")
+
+    # Update expressions
+
+    def update(self) -> tuple:
+        actions, seen = [], set()
+        while self.peek() is not None:
+            clause = self.take().upper()
+            if clause not in _UPDATE_CLAUSES or clause in seen:
+                raise self.error(f"Syntax error; token: \"{clause}\"")
+            seen.add(clause)
+            while True:
+                path = self.path()
+                if clause == 'SET':
+                    self.take('=')
+                    value = self.operand()
+                    if self.peek() in ('+', '-'):
+                        value = (self.take(), value, self.operand())
+                    actions.append(('SET', path, value))
+                elif clause == 'REMOVE':
+                    actions.append(('REMOVE', path, None))
+                else:
+                    actions.append((clause, path, self.operand()))
+                if self.peek() != ',':
+                    break
+                self.take()
+        if not actions:
+            raise self.error("Syntax error; token: <EOF>")
+        return tuple(actions)
+
+    def projection(self) -> tuple:
+        paths = [self.path()]
+        while self.peek() == ',':
+            self.take()
+            paths.append(self.path())
+        return tuple(paths)
+
+
+@lru_cache(maxsize=1024)
+def _parse(kind: str, expression: str, operation: str) -> Tuple[tuple, frozenset, frozenset]:
+    """(tree, names used, values used) of a condition, update or projection expression"""
+    parser = _Parser(expression, operation)
+    tree = getattr(parser, kind)()
+    parser.done()
+    return tree, frozenset(parser.names), frozenset(parser.values)
+
+
+class _Expressions:
+    """The expressions of one request and the names and values they share"""
+
+    def __init__(self, operation: str, names: Optional[Dict[str, str]], values: Optional[Dict[str, Any]]):
+        self.operation = operation
+        self.names = dict(names or {})
+        self.values = _canonical(values or {})
+        self.used_names = set()
+        self.used_values = set()
+        self._builder: Optional[ConditionExpressionBuilder] = None
+
+    def parse(self, kind: str, expression, is_key_condition: bool = False) -> Optional[tuple]:
+        if expression is None:
+            return None
+        if isinstance(expression, ConditionBase):
+            # boto3 condition objects (Key(...).eq(...), Attr(...).lt(...)), as the resource accepts them
+            # One builder per request, so the placeholders of its expressions don't collide
+            self._builder = self._builder or ConditionExpressionBuilder()
+            built = self._builder.build_expression(expression, is_key_condition=is_key_condition)
+            expression = built.condition_expression
+            self.names.update(built.attribute_name_placeholders)
+            self.values.update(_canonical(built.attribute_value_placeholders))
+        tree, names, values = _parse(kind, expression, self.operation)
+        self.used_names |= names
+        self.used_values |= values
+        return tree
+
+    def check(self):
+        """Reject undefined and unused names and values, like DynamoDB"""
+        for placeholder in sorted(self.used_names - set(self.names)):
+            raise _validation(self.operation, "Invalid expression: An expression attribute name used in the "
+                                              f"document path is not defined; attribute name: {placeholder}")
+        for placeholder in sorted(self.used_values - set(self.values)):
+            raise _validation(self.operation, "Invalid expression: An expression attribute value used in "
+                                              f"expression is not defined; attribute value: {placeholder}")
+        unused = set(self.names) - self.used_names
+        if unused:
+            raise _validation(self.operation, "Value provided in ExpressionAttributeNames unused in expressions: "
+                                              f"keys: {{{', '.join(sorted(unused))}}}")
+        unused = set(self.values) - self.used_values
+        if unused:
+            raise _validation(self.operation, "Value provided in ExpressionAttributeValues unused in expressions: "
+                                              f"keys: {{{', '.join(sorted(unused))}}}")
+
+    def resolve(self, path: tuple) -> tuple:
+        return tuple(self.names[e] if isinstance(e, str) and e.startswith('#') else e for e in path)
+
+    # Evaluation
+
+    def operand(self, node: tuple, item: Dict[str, Any]):
+        kind = node[0]
+        if kind == 'value':
+            return self.values[node[1]]
+        if kind == 'path':
+            return _get_path(item, self.resolve(node[1]))
+        if kind == 'call':
+            function, args = node[1], node[2]
+            if function == 'size':
+                value = self.operand(args[0], item)
+                if isinstance(value, (str, list, dict, set, bytes, Binary)):
+                    return DYNAMODB_CONTEXT.create_decimal(len(value.value if isinstance(value, Binary) else value))
+                return _MISSING
+            if function == 'if_not_exists':
+                value = self.operand(args[0], item)
+                return self.operand(args[1], item) if value is _MISSING else value
+            if function == 'list_append':
+                first, second = self.operand(args[0], item), self.operand(args[1], item)
+                if not isinstance(first, list) or not isinstance(second, list):
+                    raise _validation(self.operation, "Invalid UpdateExpression: Incorrect operand type for "
+                                                      "operator or function; operator or function: list_append")
+                return first + second
+        # '+' / '-'
+        left, right = self.operand(node[1], item), self.operand(node[2], item)
+        if left is _MISSING or right is _MISSING:
+            raise _validation(self.operation, "The provided expression refers to an attribute that does not "
+                                              "exist in the item")
+        if _type(left) != 'N' or _type(right) != 'N':
+            raise _validation(self.operation, "An operand in the update expression has an incorrect data type")
+        return DYNAMODB_CONTEXT.add(left, right) if kind == '+' else DYNAMODB_CONTEXT.subtract(left, right)
+
+    def holds(self, node: tuple, item: Dict[str, Any]) -> bool:
+        kind = node[0]
+        if kind == 'and':
+            return self.holds(node[1], item) and self.holds(node[2], item)
+        if kind == 'or':
+            return self.holds(node[1], item) or self.holds(node[2], item)
+        if kind == 'not':
+            return not self.holds(node[1], item)
+        if kind == 'cmp':
+            return _compare(node[1], self.operand(node[2], item), self.operand(node[3], item))
+        if kind == 'between':
+            value = self.operand(node[1], item)
+            return (_compare('>=', value, self.operand(node[2], item))
+                    and _compare('<=', value, self.operand(node[3], item)))
+        if kind == 'in':
+            value = self.operand(node[1], item)
+            return any(_compare('=', value, self.operand(option, item)) for option in node[2])
+
+        function, args = node[1], node[2]
+        value = self.operand(args[0], item)
+        if function == 'attribute_exists':
+            return value is not _MISSING
+        if function == 'attribute_not_exists':
+            return value is _MISSING
+        if value is _MISSING:
+            return False
+        argument = self.operand(args[1], item)
+        if function == 'attribute_type':
+            return _type(value) == argument
+        if function == 'begins_with':
+            if isinstance(value, str) and isinstance(argument, str):
+                return value.startswith(argument)
+            if isinstance(value, Binary) and isinstance(argument, Binary):
+                return value.value.startswith(argument.value)
+            return False
+        # contains
+        if isinstance(value, str):
+            return isinstance(argument, str) and argument in value
+        if isinstance(value, (set, list)):
+            return argument in value
+        return False
+
+
+def _compare(operator: str, left, right) -> bool:
+    if left is _MISSING or right is _MISSING:
+        return operator == '<>'
+    if _type(left) != _type(right):
+        return operator == '<>'
+    if operator == '=':
+        return left == right
+    if operator == '<>':
+        return left != right
+    if _type(left) not in ('S', 'N', 'B'):
+        return False
+    if isinstance(left, Binary):
+        left, right = left.value, right.value
+    if operator == '<':
+        return left < right
+    if operator == '<=':
+        return left <= right
+    if operator == '>':
+        return left > right
+    return left >= right
+
+
+def _get_path(item, path: tuple):
+    value = item
+    for element in path:
+        if isinstance(element, int):
+            if not isinstance(value, list) or element >= len(value):
+                return _MISSING
+        elif not isinstance(value, dict) or element not in value:
+            return _MISSING
+        value = value[element]
+    return value
+
+
+def _set_path(item: Dict[str, Any], path: tuple, value, operation: str):
+    parent = _get_path(item, path[:-1])
+    last = path[-1]
+    if isinstance(last, int) and isinstance(parent, list):
+        if last < len(parent):
+            parent[last] = value
+        else:
+            parent.append(value)
+    elif isinstance(last, str) and isinstance(parent, dict):
+        parent[last] = value
+    else:
+        raise _validation(operation, "The document path provided in the update expression is invalid for update")
+
+
+def _remove_path(item: Dict[str, Any], path: tuple):
+    parent = _get_path(item, path[:-1])
+    last = path[-1]
+    if isinstance(last, int) and isinstance(parent, list) and last < len(parent):
+        del parent[last]
+    elif isinstance(last, str) and isinstance(parent, dict):
+        parent.pop(last, None)
+
+
+def _project(item: Dict[str, Any], paths: List[tuple]) -> Dict[str, Any]:
+    """The attributes of ``item`` at ``paths`` (resolved), nested as in the item"""
+    result: Dict[str, Any] = {}
+    for path in paths:
+        value = _get_path(item, path)
+        if value is _MISSING:
+            continue
+        target = result
+        for element, following in zip(path, path[1:]):
+            default = [] if isinstance(following, int) else {}
+            if isinstance(target, list):
+                target.append(default)
+                target = target[-1]
+            else:
+                target = target.setdefault(element, default)
+        if isinstance(target, list):
+            target.append(_copy(value))
+        else:
+            target[path[-1]] = _copy(value)
+    return result
+
+
+# --- Tables -------------------------------------------------------------------
+
+def _order_key(key: tuple) -> Tuple[int, str]:
+    """Position of an item in scans (and its scan segment): a stable hash of its key"""
+    text = repr(key)
+    return zlib.crc32(text.encode('utf-8')), text
+
+
+class _Index:
+    def __init__(self, definition: Dict[str, Any]):
+        self.name = definition['IndexName']
+        self.hash_key, self.range_key = _key_names(definition['KeySchema'])
+        projection = definition.get('Projection', {})
+        self.projection_type = projection.get('ProjectionType', 'ALL')
+        self.non_key_attributes = list(projection.get('NonKeyAttributes', []))
+
+    def describe(self, key_schema: List[Dict[str, Any]]) -> Dict[str, Any]:
+        projection = {'ProjectionType': self.projection_type}
+        if self.non_key_attributes:
+            projection['NonKeyAttributes'] = self.non_key_attributes
+        return {'IndexName': self.name, 'KeySchema': key_schema, 'Projection': projection, 'IndexStatus': 'ACTIVE'}
+
+
+def _key_names(key_schema: List[Dict[str, Any]]) -> Tuple[str, Optional[str]]:
+    hash_key = next(k['AttributeName'] for k in key_schema if k['KeyType'] == 'HASH')
+    range_key = next((k['AttributeName'] for k in key_schema if k['KeyType'] == 'RANGE'), None)
+    return hash_key, range_key
+
+
+class _Table:
+    def __init__(self, definition: Dict[str, Any]):
+        self.definition = definition
+        self.name = definition['TableName']
+        self.hash_key, self.range_key = _key_names(definition['KeySchema'])
+        self.key_names = (self.hash_key,) if self.range_key is None else (self.hash_key, self.range_key)
+        self.attribute_types = {a['AttributeName']: a['AttributeType'] for a in definition['AttributeDefinitions']}
+        self.indexes = {d['IndexName']: _Index(d) for d in definition.get('GlobalSecondaryIndexes') or []}
+        self.items: Dict[tuple, Dict[str, Any]] = {}
+        self._order: Optional[List[Tuple[Tuple[int, str], tuple]]] = None
+
+    def key(self, key: Dict[str, Any], operation: str) -> tuple:
+        """Key tuple of a request's Key, which must hold exactly the key attributes"""
+        if set(key) != set(self.key_names):
+            raise _validation(operation, "The provided key element does not match the schema")
+        for name in self.key_names:
+            self._check_type(name, key[name], operation, "The provided key element does not match the schema")
+        return tuple(key[name] for name in self.key_names)
+
+    def item_key(self, item: Dict[str, Any], operation: str) -> tuple:
+        """Key tuple of an item being written; also checks the types of its index keys"""
+        for name in self.key_names:
+            if name not in item:
+                raise _validation(operation, f"One or more parameter values were invalid: Missing the key {name} "
+                                             "in the item")
+        for name, expected in self.attribute_types.items():
+            if name in item:
+                self._check_type(name, item[name], operation,
+                                 f"One or more parameter values were invalid: Type mismatch for key {name} "
+                                 f"expected: {expected} actual: {_type(item[name])}")
+        return tuple(item[name] for name in self.key_names)
+
+    def _check_type(self, name: str, value, operation: str, message: str):
+        if _type(value) != self.attribute_types[name]:
+            raise _validation(operation, message)
+        if value == '':
+            raise _validation(operation, f"One or more parameter values are not valid. The AttributeValue for a "
+                                         f"key attribute cannot contain an empty string value. Key: {name}")
+
+    def key_of(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: item[name] for name in self.key_names}
+
+    def store(self, key: tuple, item: Dict[str, Any]):
+        if key not in self.items:
+            self._order = None
+        self.items[key] = item
+
+    def remove(self, key: tuple):
+        if self.items.pop(key, None) is not None:
+            self._order = None
+
+    def order(self) -> List[Tuple[Tuple[int, str], tuple]]:
+        """Keys in scan order, kept until an item is added or removed"""
+        if self._order is None:
+            self._order = sorted((_order_key(key), key) for key in self.items)
+        return self._order
+
+    def describe(self) -> Dict[str, Any]:
+        description = {
+            'TableName': self.name,
+            'TableStatus': 'ACTIVE',
+            'KeySchema': self.definition['KeySchema'],
+            'AttributeDefinitions': self.definition['AttributeDefinitions'],
+            'ItemCount': len(self.items),
+            'BillingModeSummary': {'BillingMode': self.definition.get('BillingMode', 'PROVISIONED')},
+        }
+        if self.indexes:
+            description['GlobalSecondaryIndexes'] = [
+                index.describe(definition['KeySchema'])
+                for index, definition in zip(self.indexes.values(), self.definition['GlobalSecondaryIndexes'])
+            ]
+        return description
+
+
+# --- Engine -------------------------------------------------------------------
+
+class MemoryDynamoDB:
+    """Tables and their items, with DynamoDB's operations on plain values (thread-safe)"""
+
+    def __init__(self):
+        self._tables: Dict[str, _Table] = {}
+        self._lock = threading.RLock()
+        self.client = MemoryClient(self)
+        self.resource = MemoryResource(self)
+
+    def reset(self):
+        """Drop every table"""
+        with self._lock:
+            self._tables.clear()
+
+    def _table(self, name: str, operation: str) -> _Table:
+        table = self._tables.get(name)
+        if table is None:
+            raise _error(operation, 'ResourceNotFoundException', 'Requested resource not found')
+        return table
+
+    # Tables
+
+    def create_table(self, **params) -> Dict[str, Any]:
+        operation = 'CreateTable'
+        with self._lock:
+            if params['TableName'] in self._tables:
+                raise _error(operation, 'ResourceInUseException', f"Table already exists: {params['TableName']}")
+            defined = {a['AttributeName'] for a in params['AttributeDefinitions']}
+            schemas = [params['KeySchema']] + [i['KeySchema'] for i in params.get('GlobalSecondaryIndexes') or []]
+            for schema in schemas:
+                for key in schema:
+                    if key['AttributeName'] not in defined:
+                        raise _validation(operation, "One or more parameter values were invalid: Some index key "
+                                                     "attributes are not defined in AttributeDefinitions")
+            table = _Table(dict(params))
+            self._tables[table.name] = table
+            return {'TableDescription': table.describe()}
+
+    def delete_table(self, TableName: str) -> Dict[str, Any]:
+        with self._lock:
+            table = self._table(TableName, 'DeleteTable')
+            del self._tables[TableName]
+            return {'TableDescription': table.describe()}
+
+    def describe_table(self, TableName: str) -> Dict[str, Any]:
+        with self._lock:
+            return {'Table': self._table(TableName, 'DescribeTable').describe()}
+
+    def list_tables(self, **params) -> Dict[str, Any]:
+        with self._lock:
+            return {'TableNames': sorted(self._tables)}
+
+    # Items
+
+    def get_item(self, TableName: str, Key: Dict[str, Any], ProjectionExpression: Optional[str] = None,
+                 ExpressionAttributeNames: Optional[Dict[str, str]] = None, **params) -> Dict[str, Any]:
+        operation = 'GetItem'
+        expressions = _Expressions(operation, ExpressionAttributeNames, None)
+        projection = expressions.parse('projection', ProjectionExpression)
+        expressions.check()
+        with self._lock:
+            table = self._table(TableName, operation)
+            item = table.items.get(table.key(_canonical(Key), operation))
+            if item is None:
+                return {}
+            return {'Item': self._read(item, projection, expressions)}
+
+    def put_item(self, TableName: str, Item: Dict[str, Any], ConditionExpression=None,
+                 ExpressionAttributeNames=None, ExpressionAttributeValues=None, ReturnValues: str = 'NONE',
+                 ReturnValuesOnConditionCheckFailure: str = 'NONE', **params) -> Dict[str, Any]:
+        operation = 'PutItem'
+        expressions = _Expressions(operation, ExpressionAttributeNames, ExpressionAttributeValues)
+        condition = expressions.parse('condition', ConditionExpression)
+        expressions.check()
+        item = _canonical(Item)
+        with self._lock:
+            table = self._table(TableName, operation)
+            key = table.item_key(item, operation)
+            old = table.items.get(key)
+            self._check_condition(operation, expressions, condition, old, ReturnValuesOnConditionCheckFailure)
+            table.store(key, item)
+            return {'Attributes': _copy(old)} if ReturnValues == 'ALL_OLD' and old is not None else {}
+
+    def update_item(self, TableName: str, Key: Dict[str, Any], UpdateExpression: Optional[str] = None,
+                    ConditionExpression=None, ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+                    ReturnValues: str = 'NONE', ReturnValuesOnConditionCheckFailure: str = 'NONE',
+                    **params) -> Dict[str, Any]:
+        operation = 'UpdateItem'
+        expressions = _Expressions(operation, ExpressionAttributeNames, ExpressionAttributeValues)
+        update = expressions.parse('update', UpdateExpression)
+        condition = expressions.parse('condition', ConditionExpression)
+        expressions.check()
+        key_values = _canonical(Key)
+        with self._lock:
+            table = self._table(TableName, operation)
+            key = table.key(key_values, operation)
+            old = table.items.get(key)
+            self._check_condition(operation, expressions, condition, old, ReturnValuesOnConditionCheckFailure)
+            new, updated = self._apply_update(table, old, key_values, update, expressions)
+            table.store(key, new)
+            return self._returned(ReturnValues, old, new, updated)
+
+    def delete_item(self, TableName: str, Key: Dict[str, Any], ConditionExpression=None,
+                    ExpressionAttributeNames=None, ExpressionAttributeValues=None, ReturnValues: str = 'NONE',
+                    ReturnValuesOnConditionCheckFailure: str = 'NONE', **params) -> Dict[str, Any]:
+        operation = 'DeleteItem'
+        expressions = _Expressions(operation, ExpressionAttributeNames, ExpressionAttributeValues)
+        condition = expressions.parse('condition', ConditionExpression)
+        expressions.check()
+        with self._lock:
+            table = self._table(TableName, operation)
+            key = table.key(_canonical(Key), operation)
+            old = table.items.get(key)
+            self._check_condition(operation, expressions, condition, old, ReturnValuesOnConditionCheckFailure)
+            table.remove(key)
+            return {'Attributes': _copy(old)} if ReturnValues == 'ALL_OLD' and old is not None else {}
+
+    def _check_condition(self, operation: str, expressions: _Expressions, condition: Optional[tuple],
+                         item: Optional[Dict[str, Any]], return_values: str):
+        if condition is not None and not expressions.holds(condition, item or {}):
+            # Error responses are not deserialized by boto3, so the item is in wire format even for Table calls
+            response = {'Item': _to_wire(item)} if return_values == 'ALL_OLD' and item is not None else {}
+            raise _error(operation, 'ConditionalCheckFailedException', 'The conditional request failed', **response)
+
+    def _apply_update(self, table: _Table, old: Optional[Dict[str, Any]], key: Dict[str, Any],
+                      update: Optional[tuple], expressions: _Expressions) -> Tuple[Dict[str, Any], set]:
+        """The item after ``update``, and the top-level attributes it touched"""
+        operation = expressions.operation
+        current = old if old is not None else dict(key)
+        if update is None:
+            return _copy(current), set()
+
+        # Every value is computed from the item as it was before the update
+        actions = []
+        for clause, path_node, value_node in update:
+            path = expressions.resolve(path_node[1])
+            if path[0] in table.key_names:
+                raise _validation(operation, f"One or more parameter values were invalid: Cannot update attribute "
+                                             f"{path[0]}. This attribute is part of the key")
+            value = None if value_node is None else expressions.operand(value_node, current)
+            if clause == 'SET' and value is _MISSING:
+                raise _validation(operation, "The provided expression refers to an attribute that does not exist "
+                                             "in the item")
+            actions.append((clause, path, value))
+        paths = sorted(path for _, path, _ in actions)
+        for first, second in zip(paths, paths[1:]):
+            if second[:len(first)] == first:
+                raise _validation(operation, "Invalid UpdateExpression: Two document paths overlap with each other; "
+                                             "must remove or rewrite one of these paths")
+
+        new = _copy(current)
+        for clause, path, value in actions:
+            if clause == 'SET':
+                _set_path(new, path, _copy(value), operation)
+            elif clause == 'REMOVE':
+                _remove_path(new, path)
+            else:
+                existing = _get_path(new, path)
+                value_type = _type(value)
+                if clause == 'ADD' and value_type == 'N' and (existing is _MISSING or _type(existing) == 'N'):
+                    _set_path(new, path, DYNAMODB_CONTEXT.add(0 if existing is _MISSING else existing, value), operation)
+                elif clause == 'ADD' and isinstance(value, set) and (existing is _MISSING or _type(existing) == value_type):
+                    _set_path(new, path, set(value) | (set() if existing is _MISSING else existing), operation)
+                elif clause == 'DELETE' and isinstance(value, set) and (existing is _MISSING or _type(existing) == value_type):
+                    if existing is not _MISSING:
+                        remaining = existing - value
+                        if remaining:
+                            _set_path(new, path, remaining, operation)
+                        else:
+                            _remove_path(new, path)
+                else:
+                    raise _validation(operation, "An operand in the update expression has an incorrect data type")
+        table.item_key(new, operation)
+        return new, {path[0] for _, path, _ in actions}
+
+    @staticmethod
+    def _returned(return_values: str, old: Optional[Dict[str, Any]], new: Dict[str, Any],
+                  updated: set) -> Dict[str, Any]:
+        if return_values == 'ALL_NEW':
+            return {'Attributes': _copy(new)}
+        if return_values == 'ALL_OLD':
+            return {'Attributes': _copy(old)} if old is not None else {}
+        if return_values == 'UPDATED_NEW':
+            return {'Attributes': {k: _copy(v) for k, v in new.items() if k in updated}}
+        if return_values == 'UPDATED_OLD':
+            return {'Attributes': {k: _copy(v) for k, v in (old or {}).items() if k in updated}} if old else {}
+        return {}
+
+    def _read(self, item: Dict[str, Any], projection: Optional[tuple], expressions: _Expressions) -> Dict[str, Any]:
+        if projection is None:
+            return _copy(item)
+        return _project(item, [expressions.resolve(node[1]) for node in projection])
+
+    # Reads
+
+    def query(self, TableName: str, KeyConditionExpression=None, IndexName: Optional[str] = None,
+              FilterExpression=None, ProjectionExpression: Optional[str] = None,
+              ExpressionAttributeNames=None, ExpressionAttributeValues=None, Limit: Optional[int] = None,
+              ExclusiveStartKey: Optional[Dict[str, Any]] = None, ScanIndexForward: bool = True,
+              Select: Optional[str] = None, **params) -> Dict[str, Any]:
+        operation = 'Query'
+        expressions = _Expressions(operation, ExpressionAttributeNames, ExpressionAttributeValues)
+        if KeyConditionExpression is None:
+            raise _validation(operation, "Either the KeyConditions or KeyConditionExpression parameter must be "
+                                         "specified in the request.")
+        key_condition = expressions.parse('condition', KeyConditionExpression, is_key_condition=True)
+        row_filter = expressions.parse('condition', FilterExpression)
+        projection = expressions.parse('projection', ProjectionExpression)
+        expressions.check()
+
+        with self._lock:
+            table = self._table(TableName, operation)
+            index = self._index(table, IndexName, operation)
+            hash_key, range_key = (index.hash_key, index.range_key) if index else (table.hash_key, table.range_key)
+            hash_value = self._hash_value(key_condition, hash_key, expressions)
+
+            matches = []
+            for key, item in table.items.items():
+                if item.get(hash_key, _MISSING) != hash_value or (range_key is not None and range_key not in item):
+                    continue
+                if expressions.holds(key_condition, item):
+                    sort_key = (item[range_key], _order_key(key)) if range_key else (_order_key(key),)
+                    matches.append((sort_key, key, item))
+            matches.sort(key=lambda match: match[0], reverse=not ScanIndexForward)
+
+            start = 0
+            if ExclusiveStartKey is not None:
+                start_item = _canonical(ExclusiveStartKey)
+                start_key = table.key({name: start_item.get(name) for name in table.key_names}, operation)
+                after = (start_item[range_key], _order_key(start_key)) if range_key else (_order_key(start_key),)
+                while start < len(matches) and (matches[start][0] <= after if ScanIndexForward
+                                                else matches[start][0] >= after):
+                    start += 1
+            return self._page(table, index, matches[start:], Limit, row_filter, projection, expressions, Select)
+
+    def scan(self, TableName: str, IndexName: Optional[str] = None, FilterExpression=None,
+             ProjectionExpression: Optional[str] = None, ExpressionAttributeNames=None,
+             ExpressionAttributeValues=None, Limit: Optional[int] = None,
+             ExclusiveStartKey: Optional[Dict[str, Any]] = None, Segment: Optional[int] = None,
+             TotalSegments: Optional[int] = None, Select: Optional[str] = None, **params) -> Dict[str, Any]:
+        operation = 'Scan'
+        expressions = _Expressions(operation, ExpressionAttributeNames, ExpressionAttributeValues)
+        row_filter = expressions.parse('condition', FilterExpression)
+        projection = expressions.parse('projection', ProjectionExpression)
+        expressions.check()
+        if (Segment is None) != (TotalSegments is None) or (TotalSegments is not None and
+                                                           not 0 <= Segment < TotalSegments):
+            raise _validation(operation, "The Segment parameter must be between 0 and TotalSegments - 1, and both "
+                                         "must be given together")
+
+        with self._lock:
+            table = self._table(TableName, operation)
+            index = self._index(table, IndexName, operation)
+            order = table.order()
+            start = 0
+            if ExclusiveStartKey is not None:
+                start_item = _canonical(ExclusiveStartKey)
+                start_key = table.key({name: start_item.get(name) for name in table.key_names}, operation)
+                start = bisect.bisect_right(order, (_order_key(start_key), start_key))
+
+            matches = []
+            for order_key, key in order[start:]:
+                if TotalSegments is not None and order_key[0] % TotalSegments != Segment:
+                    continue
+                item = table.items[key]
+                if index is not None and not all(name in item for name in (index.hash_key, index.range_key) if name):
+                    continue
+                matches.append((None, key, item))
+            return self._page(table, index, matches, Limit, row_filter, projection, expressions, Select)
+
+    def _index(self, table: _Table, name: Optional[str], operation: str) -> Optional[_Index]:
+        if name is None:
+            return None
+        if name not in table.indexes:
+            raise _validation(operation, f"The table does not have the specified index: {name}")
+        return table.indexes[name]
+
+    def _hash_value(self, condition: tuple, hash_key: str, expressions: _Expressions):
+        """The value the key condition requires of the partition key"""
+        pending = [condition]
+        while pending:
+            node = pending.pop()
+            if node[0] == 'and':
+                pending.extend(node[1:])
+            elif (node[0] == 'cmp' and node[1] == '=' and node[2][0] == 'path' and node[3][0] == 'value'
+                  and expressions.resolve(node[2][1]) == (hash_key,)):
+                return expressions.values[node[3][1]]
+        raise _validation(expressions.operation, f"Query condition missed key schema element: {hash_key}")
+
+    def _page(self, table: _Table, index: Optional[_Index], matches: List[tuple], limit: Optional[int],
+              row_filter: Optional[tuple], projection: Optional[tuple], expressions: _Expressions,
+              select: Optional[str]) -> Dict[str, Any]:
+        """One page of a query or scan: ``limit`` items read, then filtered and projected"""
+        read = matches[:limit] if limit else matches
+        items = []
+        for _, _, item in read:
+            if row_filter is not None and not expressions.holds(row_filter, item):
+                continue
+            if index is not None and index.projection_type != 'ALL':
+                names = set(table.key_names) | {index.hash_key, index.range_key} | set(index.non_key_attributes)
+                item = {name: value for name, value in item.items() if name in names}
+            items.append(item)
+
+        response: Dict[str, Any] = {'Count': len(items), 'ScannedCount': len(read)}
+        if select != 'COUNT':
+            response['Items'] = [self._read(item, projection, expressions) for item in items]
+        if limit and len(matches) > limit:
+            last = read[-1][2]
+            last_key = table.key_of(last)
+            if index is not None:
+                last_key.update({name: last[name] for name in (index.hash_key, index.range_key) if name})
+            response['LastEvaluatedKey'] = _copy(last_key)
+        return response
+
+    # Batches and transactions
+
+    def batch_get_item(self, RequestItems: Dict[str, Dict[str, Any]], **params) -> Dict[str, Any]:
+        operation = 'BatchGetItem'
+        if sum(len(request['Keys']) for request in RequestItems.values()) > BATCH_GET_MAX_KEYS:
+            raise _validation(operation, "Too many items requested for the BatchGetItem call")
+        responses = {}
+        with self._lock:
+            for table_name, request in RequestItems.items():
+                table = self._table(table_name, operation)
+                expressions = _Expressions(operation, request.get('ExpressionAttributeNames'), None)
+                projection = expressions.parse('projection', request.get('ProjectionExpression'))
+                expressions.check()
+                keys = [table.key(_canonical(key), operation) for key in request['Keys']]
+                if len(set(keys)) != len(keys):
+                    raise _validation(operation, "Provided list of item keys contains duplicates")
+                responses[table_name] = [
+                    self._read(table.items[key], projection, expressions) for key in keys if key in table.items
+                ]
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, RequestItems: Dict[str, List[Dict[str, Any]]], **params) -> Dict[str, Any]:
+        operation = 'BatchWriteItem'
+        if sum(len(requests) for requests in RequestItems.values()) > BATCH_WRITE_MAX_ITEMS:
+            raise _validation(operation, "Too many items requested for the BatchWriteItem call")
+        with self._lock:
+            writes = []
+            for table_name, requests in RequestItems.items():
+                table = self._table(table_name, operation)
+                keys = set()
+                for request in requests:
+                    if 'PutRequest' in request:
+                        item = _canonical(request['PutRequest']['Item'])
+                        key = table.item_key(item, operation)
+                    else:
+                        item = None
+                        key = table.key(_canonical(request['DeleteRequest']['Key']), operation)
+                    if key in keys:
+                        raise _validation(operation, "Provided list of item keys contains duplicates")
+                    keys.add(key)
+                    writes.append((table, key, item))
+            # Validated as a whole first, so a bad request writes nothing
+            for table, key, item in writes:
+                if item is None:
+                    table.remove(key)
+                else:
+                    table.store(key, item)
+        return {'UnprocessedItems': {}}
+
+    def transact_write_items(self, TransactItems: List[Dict[str, Dict[str, Any]]], **params) -> Dict[str, Any]:
+        operation = 'TransactWriteItems'
+        if len(TransactItems) > TRANSACTION_MAX_ITEMS:
+            raise _validation(operation, f"Member must have length less than or equal to {TRANSACTION_MAX_ITEMS}")
+        with self._lock:
+            writes, reasons, seen = [], [], set()
+            for action in TransactItems:
+                (kind, request), = action.items()
+                table = self._table(request['TableName'], operation)
+                expressions = _Expressions(operation, request.get('ExpressionAttributeNames'),
+                                           request.get('ExpressionAttributeValues'))
+                update = expressions.parse('update', request.get('UpdateExpression'))
+                condition = expressions.parse('condition', request.get('ConditionExpression'))
+                expressions.check()
+                if kind == 'Put':
+                    item = _canonical(request['Item'])
+                    key = table.item_key(item, operation)
+                else:
+                    key_values = _canonical(request['Key'])
+                    key = table.key(key_values, operation)
+                if (table.name, key) in seen:
+                    raise _validation(operation, "Transaction request cannot include multiple operations on one item")
+                seen.add((table.name, key))
+
+                old = table.items.get(key)
+                if condition is not None and not expressions.holds(condition, old or {}):
+                    reason = {'Code': 'ConditionalCheckFailed', 'Message': 'The conditional request failed'}
+                    if request.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD' and old is not None:
+                        reason['Item'] = _copy(old)
+                    reasons.append(reason)
+                    continue
+                reasons.append({'Code': 'None'})
+                if kind == 'Put':
+                    writes.append((table, key, item))
+                elif kind == 'Delete':
+                    writes.append((table, key, None))
+                elif kind == 'Update':
+                    writes.append((table, key, self._apply_update(table, old, key_values, update, expressions)[0]))
+
+            if any(reason['Code'] != 'None' for reason in reasons):
+                codes = ', '.join(reason['Code'] for reason in reasons)
+                raise _error(operation, 'TransactionCanceledException',
+                             f"Transaction cancelled, please refer cancellation reasons for specific reasons [{codes}]",
+                             CancellationReasons=reasons)
+            for table, key, item in writes:
+                if item is None:
+                    table.remove(key)
+                else:
+                    table.store(key, item)
+        return {}
+
+
+class MemoryTable:
+    """Stand-in for a boto3 ``dynamodb.Table`` resource"""
+
+    def __init__(self, engine: MemoryDynamoDB, name: str):
+        self._engine = engine
+        self.name = name
+
+    @property
+    def table_name(self) -> str:
+        return self.name
+
+    def get_item(self, **params):
+        return self._engine.get_item(TableName=self.name, **params)
+
+    def put_item(self, **params):
+        return self._engine.put_item(TableName=self.name, **params)
+
+    def update_item(self, **params):
+        return self._engine.update_item(TableName=self.name, **params)
+
+    def delete_item(self, **params):
+        return self._engine.delete_item(TableName=self.name, **params)
+
+    def query(self, **params):
+        return self._engine.query(TableName=self.name, **params)
+
+    def scan(self, **params):
+        return self._engine.scan(TableName=self.name, **params)
+
+    def batch_writer(self, overwrite_by_pkeys: Optional[List[str]] = None) -> "_BatchWriter":
+        return _BatchWriter(self)
+
+
+class _BatchWriter:
+    """``Table.batch_writer()``: the writes are applied one by one, right away"""
+
+    def __init__(self, table: MemoryTable):
+        self._table = table
+
+    def put_item(self, Item: Dict[str, Any]):
+        self._table.put_item(Item=Item)
+
+    def delete_item(self, Key: Dict[str, Any]):
+        self._table.delete_item(Key=Key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class MemoryResource:
+    """Stand-in for ``boto3.resource('dynamodb')``"""
+
+    def __init__(self, engine: MemoryDynamoDB):
+        self._engine = engine
+
+    def Table(self, name: str) -> MemoryTable:
+        return MemoryTable(self._engine, name)
+
+    def batch_get_item(self, **params):
+        return self._engine.batch_get_item(**params)
+
+
+class _Waiter:
+    def __init__(self, engine: MemoryDynamoDB, name: str):
+        self._engine = engine
+        self._name = name
+
+    def wait(self, TableName: str, **params):
+        exists = TableName in self._engine.list_tables()['TableNames']
+        if exists != (self._name == 'table_exists'):
+            raise WaiterError(self._name, 'Max attempts exceeded', {})
+
+
+class MemoryClient:
+    """Stand-in for ``boto3.client('dynamodb')``: the engine's operations on typed wire-format values"""
+
+    def __init__(self, engine: MemoryDynamoDB):
+        self._engine = engine
+
+    def create_table(self, **params):
+        return self._engine.create_table(**params)
+
+    def delete_table(self, **params):
+        return self._engine.delete_table(**params)
+
+    def describe_table(self, **params):
+        return self._engine.describe_table(**params)
+
+    def list_tables(self, **params):
+        return self._engine.list_tables(**params)
+
+    def get_waiter(self, name: str) -> _Waiter:
+        return _Waiter(self._engine, name)
+
+    def get_item(self, **params):
+        return self._wire_response(self._engine.get_item(**self._plain_request(params)))
+
+    def put_item(self, **params):
+        return self._wire_response(self._engine.put_item(**self._plain_request(params)))
+
+    def update_item(self, **params):
+        return self._wire_response(self._engine.update_item(**self._plain_request(params)))
+
+    def delete_item(self, **params):
+        return self._wire_response(self._engine.delete_item(**self._plain_request(params)))
+
+    def query(self, **params):
+        return self._wire_response(self._engine.query(**self._plain_request(params)))
+
+    def scan(self, **params):
+        return self._wire_response(self._engine.scan(**self._plain_request(params)))
+
+    def batch_get_item(self, RequestItems, **params):
+        requests = {name: self._plain_request(request) for name, request in RequestItems.items()}
+        for request in requests.values():
+            request['Keys'] = [_from_wire(key) for key in request['Keys']]
+        response = self._engine.batch_get_item(RequestItems=requests)
+        return {
+            'Responses': {name: [_to_wire(item) for item in items] for name, items in response['Responses'].items()},
+            'UnprocessedKeys': {}
+        }
+
+    def batch_write_item(self, RequestItems, **params):
+        requests = {}
+        for name, writes in RequestItems.items():
+            requests[name] = [
+                {'PutRequest': {'Item': _from_wire(w['PutRequest']['Item'])}} if 'PutRequest' in w
+                else {'DeleteRequest': {'Key': _from_wire(w['DeleteRequest']['Key'])}}
+                for w in writes
+            ]
+        return self._engine.batch_write_item(RequestItems=requests)
+
+    def transact_write_items(self, TransactItems, **params):
+        actions = [{kind: self._plain_request(request)} for action in TransactItems for kind, request in action.items()]
+        try:
+            return self._engine.transact_write_items(TransactItems=actions)
+        except ClientError as e:
+            for reason in e.response.get('CancellationReasons', []):
+                if 'Item' in reason:
+                    reason['Item'] = _to_wire(reason['Item'])
+            raise
+
+    @staticmethod
+    def _plain_request(params: Dict[str, Any]) -> Dict[str, Any]:
+        params = dict(params)
+        for field in ('Key', 'Item', 'ExpressionAttributeValues', 'ExclusiveStartKey'):
+            if field in params:
+                params[field] = _from_wire(params[field])
+        return params
+
+    @staticmethod
+    def _wire_response(response: Dict[str, Any]) -> Dict[str, Any]:
+        for field in ('Item', 'Attributes', 'LastEvaluatedKey'):
+            if field in response:
+                response[field] = _to_wire(response[field])
+        if 'Items' in response:
+            response['Items'] = [_to_wire(item) for item in response['Items']]
+        return response
+
+
+def get_engine() -> MemoryDynamoDB:
+    """The process's in-memory engine, created on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = MemoryDynamoDB()
+    return _engine
@@ -0,0 +1,313 @@
+"""
+Prometheus-style metrics for microservices (opt-in via METRICS_ENABLED)
+
+Recording is lock-free: every thread updates its own value map and only the
+scrape (``render_metrics``) reads across threads, so the request path never
+contends on a lock. Values are exposed in the Prometheus text format.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple, Optional
+
+from .env_config import settings
+
+ENABLED = settings.METRICS_ENABLED
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List["_Metric"] = []
+
+
+class _PerThreadValues:
+    """Value maps owned by individual threads; only the owner writes its map"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._maps: List[dict] = []
+        self._maps_lock = threading.Lock()  # taken once per thread, on first use
+
+    def local(self) -> dict:
+        values = getattr(self._local, 'values', None)
+        if values is None:
+            values = {}
+            with self._maps_lock:
+                self._maps.append(values)
+            self._local.values = values
+        return values
+
+    def snapshot(self) -> List[dict]:
+        # dict.copy() runs without releasing the GIL, so each copy is consistent
+        return [values.copy() for values in list(self._maps)]
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values = _PerThreadValues()
+        _registry.append(self)
+
+    def _format_labels(self, labels: Tuple[str, ...], extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(zip(self.label_names, labels)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        escaped = ('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs)
+        return "{" + ",".join(escaped) + "}"
+
+    def _merged(self) -> Dict[Tuple[str, ...], float]:
+        merged: Dict[Tuple[str, ...], float] = {}
+        for values in self._values.snapshot():
+            for labels, value in values.items():
+                merged[labels] = merged.get(labels, 0.0) + value
+        return merged
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for labels, value in sorted(self._merged().items()):
+            lines.append(f"{self.name}{self._format_labels(labels)} {value:g}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing value"""
+
+    type_name = "counter"
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1.0):
+        values = self._values.local()
+        values[labels] = values.get(labels, 0.0) + amount
+
+    def value(self, labels: Tuple[str, ...] = ()) -> float:
+        return self._merged().get(labels, 0.0)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down; per-thread deltas are summed on scrape"""
+
+    type_name = "gauge"
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1.0):
+        values = self._values.local()
+        values[labels] = values.get(labels, 0.0) + amount
+
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1.0):
+        self.inc(labels, -amount)
+
+
+class StateGauge(_Metric):
+    """Gauge holding the last value set (e.g. a state), shared across threads"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, label_names)
+        self._state: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, labels: Tuple[str, ...] = ()):
+        # A single dict assignment is atomic under the GIL
+        self._state[labels] = value
+
+    def _merged(self) -> Dict[Tuple[str, ...], float]:
+        return self._state.copy()
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = buckets
+
+    def observe(self, value: float, labels: Tuple[str, ...] = ()):
+        values = self._values.local()
+        entry = values.get(labels)
+        if entry is None:
+            # One slot per bucket plus +Inf, then sum and count
+            entry = values[labels] = [0.0] * (len(self.buckets) + 3)
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+    def render(self) -> List[str]:
+        merged: Dict[Tuple[str, ...], List[float]] = {}
+        for values in self._values.snapshot():
+            for labels, entry in values.items():
+                total = merged.setdefault(labels, [0.0] * len(entry))
+                for i, value in enumerate(entry):
+                    total[i] += value
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, entry in sorted(merged.items()):
+            cumulative = 0.0
+            for bound, count in zip(list(self.buckets) + ["+Inf"], entry):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._format_labels(labels, {'le': str(bound)})} {cumulative:g}")
+            lines.append(f"{self.name}_sum{self._format_labels(labels)} {entry[-2]:g}")
+            lines.append(f"{self.name}_count{self._format_labels(labels)} {entry[-1]:g}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route and status",
+    ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled")
+BACKEND_LATENCY = Histogram(
+    "backend_call_duration_seconds", "Latency of DynamoDB and inter-service calls",
+    ("kind", "operation")
+)
+DYNAMODB_CAPACITY = Counter(
+    "dynamodb_consumed_capacity_units_total", "DynamoDB consumed capacity units",
+    ("table", "operation", "capacity")
+)
+DYNAMODB_RETRIES = Counter(
+    "dynamodb_retries_total", "DynamoDB calls retried after throttling or transient errors",
+    ("operation", "code")
+)
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by result", ("cache", "result"))
+CIRCUIT_BREAKER_STATE = StateGauge(
+    "circuit_breaker_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ("name",)
+)
+CIRCUIT_BREAKER_REJECTIONS = Counter(
+    "circuit_breaker_rejected_total", "Calls failed fast by an open circuit breaker", ("name",)
+)
+HEDGED_REQUESTS = Counter(
+    "hedged_requests_total", "Hedged calls by which attempt answered first", ("operation", "winner")
+)
+
+# Operations that consume write capacity; everything else consumes read capacity
+_WRITE_OPERATIONS = {"PutItem", "UpdateItem", "DeleteItem", "BatchWriteItem", "TransactWriteItems"}
+
+
+def record_backend_call(kind: str, operation: str, duration_seconds: float):
+    """Record the latency of a DynamoDB or inter-service call"""
+    if ENABLED:
+        BACKEND_LATENCY.observe(duration_seconds, (kind, operation))
+
+
+def record_consumed_capacity(table: str, operation: str, units: float):
+    """Record DynamoDB capacity units consumed by an operation"""
+    if ENABLED:
+        capacity = "write" if operation in _WRITE_OPERATIONS else "read"
+        DYNAMODB_CAPACITY.inc((table, operation, capacity), units)
+
+
+def record_dynamodb_retry(operation: str, code: str):
+    """Record a retried DynamoDB call"""
+    if ENABLED:
+        DYNAMODB_RETRIES.inc((operation, code))
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Record a cache hit or miss"""
+    if ENABLED:
+        CACHE_REQUESTS.inc((cache, "hit" if hit else "miss"))
+
+
+def record_circuit_state(name: str, state: int):
+    """Record a circuit breaker's state (0 closed, 1 half-open, 2 open)"""
+    if ENABLED:
+        CIRCUIT_BREAKER_STATE.set(state, (name,))
+
+
+def record_circuit_rejection(name: str):
+    """Record a call failed fast by an open circuit breaker"""
+    if ENABLED:
+        CIRCUIT_BREAKER_REJECTIONS.inc((name,))
+
+
+def record_hedged_call(operation: str, hedge_won: bool):
+    """Record a call that was hedged and which attempt answered first"""
+    if ENABLED:
+        HEDGED_REQUESTS.inc((operation, "hedge" if hedge_won else "first"))
+
+
+def _render_cache_hit_ratios() -> List[str]:
+    lookups: Dict[str, Dict[str, float]] = {}
+    for (cache, result), count in CACHE_REQUESTS._merged().items():
+        lookups.setdefault(cache, {}).setdefault(result, 0.0)
+        lookups[cache][result] += count
+
+    lines = ["# HELP cache_hit_ratio Cache hits over lookups since start", "# TYPE cache_hit_ratio gauge"]
+    for cache, results in sorted(lookups.items()):
+        total = results.get("hit", 0.0) + results.get("miss", 0.0)
+        if total:
+            lines.append(f'cache_hit_ratio{{cache="{cache}"}} {results.get("hit", 0.0) / total:g}')
+    return lines
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    lines.extend(_render_cache_hit_ratios())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[object, str] = {}
+
+    def _route_label(self, scope) -> str:
+        # The router records the matched endpoint in the scope; label by its path template
+        endpoint = scope.get("endpoint")
+        router = scope.get("router")
+        if endpoint is None or router is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            path = next(
+                (route.path for route in router.routes if getattr(route, "endpoint", None) is endpoint),
+                "unmatched"
+            )
+            self._route_paths[endpoint] = path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - started,
+                (scope["method"], self._route_label(scope), str(status_code))
+            )
+
+
+async def metrics_endpoint(request):
+    """Expose metrics for Prometheus scraping"""
+    from starlette.responses import PlainTextResponse
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def setup_metrics(app):
+    """Add the metrics middleware and /metrics route when METRICS_ENABLED is set"""
+    if not ENABLED:
+        return
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
@@ -0,0 +1,152 @@
+"""
+Read-only access to the products table for services other than product-service
+
+Cart-service needs a product's price and stock to validate an add to cart,
+and its name, category and image to show cart lines. Reading them straight
+from the products table (with a projection, so descriptions are not read)
+saves the HTTP round trip to product-service and, on Lambda, a second
+invocation. Products with sharded stock get the sum of their shards, like
+product-service reports them.
+
+Reads are cached for a few seconds; identical concurrent reads share one
+GetItem and the misses of a multi-product read share one BatchGetItem. The
+cached stock is only for display and validation: reservations still check
+stock in DynamoDB.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, Iterable, List
+
+from .env_config import config
+from .dynamodb_utils import get_dynamodb_resource, call_with_retry, batch_get_items
+from .singleflight import SingleFlight
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Attributes read for a product (everything validation, pricing and cart lines need)
+PROJECTION = '#id, #name, #category, #image_url, #price, #stock, #stock_shards'
+PROJECTION_NAMES = {
+    '#id': 'id',
+    '#name': 'name',
+    '#category': 'category',
+    '#image_url': 'image_url',
+    '#price': 'price',
+    '#stock': 'stock',
+    '#stock_shards': 'stock_shards'
+}
+
+
+def _shard_id(product_id: str, n: int) -> str:
+    """Key of a stock shard item (same format as product-service's stock.shard_id)"""
+    return f"{product_id}#{n}"
+
+
+class ProductRepository:
+    """Cached product lookups (price, stock and display fields) on the products table (thread-safe)"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_items: int = 10000):
+        self.ttl_seconds = config.PRODUCT_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_items = max_items
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._reads = SingleFlight("product_repository")
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """``{'id', 'name', 'category', 'image_url', 'price', 'stock'}`` of a product, or None if it does not exist"""
+        product = self._cached(product_id)
+        if product is not None:
+            return product
+
+        product = self._reads.do(product_id, self._read, product_id, timeout=config.SINGLEFLIGHT_TIMEOUT_SECONDS)
+        if product is not None:
+            self._store([product])
+        return product
+
+    def get_many(self, product_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Products by id (missing ones left out); cache misses are read with one BatchGetItem"""
+        found: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for product_id in dict.fromkeys(product_ids):
+            product = self._cached(product_id)
+            if product is not None:
+                found[product_id] = product
+            else:
+                missing.append(product_id)
+
+        if missing:
+            items = batch_get_items(
+                config.PRODUCTS_TABLE_NAME,
+                [{'id': product_id} for product_id in missing],
+                ProjectionExpression=PROJECTION,
+                ExpressionAttributeNames=PROJECTION_NAMES
+            )
+            products = self._products(items)
+            self._store(products)
+            found.update((product['id'], product) for product in products)
+        return found
+
+    def invalidate(self, product_id: Optional[str] = None):
+        """Drop one cached product, or all of them"""
+        with self._lock:
+            if product_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(product_id, None)
+
+    def _cached(self, product_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[product_id]
+                entry = None
+        metrics.record_cache_lookup("product_repository", entry is not None)
+        return entry[1] if entry is not None else None
+
+    def _store(self, products: List[Dict[str, Any]]):
+        if self.ttl_seconds <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for product in products:
+                self._entries[product['id']] = (expires_at, product)
+                self._entries.move_to_end(product['id'])
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def _read(self, product_id: str) -> Optional[Dict[str, Any]]:
+        table = get_dynamodb_resource().Table(config.PRODUCTS_TABLE_NAME)
+        response = call_with_retry(
+            'GetItem', table.get_item,
+            Key={'id': product_id},
+            ProjectionExpression=PROJECTION,
+            ExpressionAttributeNames=PROJECTION_NAMES,
+            ReturnConsumedCapacity='TOTAL'
+        )
+        item = response.get('Item')
+        return self._products([item])[0] if item is not None else None
+
+    def _products(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Product dicts from table items, with sharded stock summed (one batch read for all of them)"""
+        sharded = {item['id']: int(item['stock_shards']) for item in items if item.get('stock_shards')}
+        totals: Dict[str, int] = {}
+        if sharded:
+            keys = [{'shard_id': _shard_id(product_id, n)} for product_id, shards in sharded.items() for n in range(shards)]
+            for shard in batch_get_items(config.STOCK_SHARDS_TABLE_NAME, keys):
+                totals[shard['product_id']] = totals.get(shard['product_id'], 0) + int(shard['stock'])
+        return [
+            {
+                'id': item['id'],
+                'name': item.get('name', ''),
+                'category': item.get('category', ''),
+                'image_url': item.get('image_url', ''),
+                'price': float(item.get('price', 0)),
+                'stock': totals.get(item['id'], 0) if item['id'] in sharded else int(item.get('stock', 0)),
+            }
+            for item in items
+        ]
+
+
+product_repository = ProductRepository()
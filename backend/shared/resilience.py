@@ -0,0 +1,241 @@
+"""
+Resilience for inter-service calls: circuit breaker, deadlines and hedging
+
+- ``CircuitBreaker`` fails calls fast once the share of failures in a short
+  window crosses a threshold, then lets a single trial call through after a
+  pause to find out whether the service has recovered.
+- Deadlines travel in the ``X-Request-Deadline-Ms`` header as the
+  milliseconds the caller is still willing to wait (relative, so clocks
+  need not agree). ``DeadlineMiddleware`` answers 504 to requests whose
+  deadline has already passed and makes the rest available through
+  ``deadline_remaining`` for outgoing calls and retries.
+- ``hedged`` starts a second attempt of an idempotent call that is slower
+  than usual (the delay comes from a ``LatencyTracker``'s p95) and returns
+  whichever answers first.
+"""
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, Callable, Any
+
+from .env_config import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+# Calls observed before a LatencyTracker reports percentiles
+MIN_LATENCY_SAMPLES = 20
+
+# Threads running hedged calls (the first attempt and the hedge)
+HEDGE_WORKERS = 32
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_executor_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Call refused because the circuit breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit breaker {name} is open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Failure-ratio circuit breaker over a sliding window of per-second buckets (thread-safe)"""
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, name: str, failure_ratio: Optional[float] = None, min_calls: Optional[int] = None,
+                 window_seconds: Optional[int] = None, open_seconds: Optional[float] = None):
+        self.name = name
+        self.failure_ratio = settings.CIRCUIT_BREAKER_FAILURE_RATIO if failure_ratio is None else failure_ratio
+        self.min_calls = settings.CIRCUIT_BREAKER_MIN_CALLS if min_calls is None else min_calls
+        self.window_seconds = settings.CIRCUIT_BREAKER_WINDOW_SECONDS if window_seconds is None else window_seconds
+        self.open_seconds = settings.CIRCUIT_BREAKER_OPEN_SECONDS if open_seconds is None else open_seconds
+        self.state = self.CLOSED
+        self._buckets: deque = deque()  # [second, calls, failures]
+        self._calls = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        metrics.record_circuit_state(name, self.state)
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may be made now; every allowed call must be recorded"""
+        with self._lock:
+            if self.state == self.OPEN:
+                retry_after = self._opened_at + self.open_seconds - time.monotonic()
+                if retry_after > 0:
+                    self._reject(retry_after)
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    self._reject(self.open_seconds)
+                self._trial_in_flight = True
+
+    def record(self, success: bool):
+        """Record the outcome of an allowed call"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                if success:
+                    self._reset()
+                    self._set_state(self.CLOSED)
+                else:
+                    self._open()
+                return
+            if self.state == self.OPEN:
+                # A call that started before the breaker opened
+                return
+
+            now = int(time.monotonic())
+            if self._buckets and self._buckets[-1][0] == now:
+                bucket = self._buckets[-1]
+            else:
+                bucket = [now, 0, 0]
+                self._buckets.append(bucket)
+            bucket[1] += 1
+            self._calls += 1
+            if not success:
+                bucket[2] += 1
+                self._failures += 1
+            while self._buckets[0][0] <= now - self.window_seconds:
+                _, calls, failures = self._buckets.popleft()
+                self._calls -= calls
+                self._failures -= failures
+
+            if not success and self._calls >= self.min_calls and self._failures >= self.failure_ratio * self._calls:
+                logger.warning(f"Circuit breaker {self.name} opened: {self._failures}/{self._calls} calls failed "
+                               f"in {self.window_seconds}s")
+                self._open()
+
+    def _open(self):
+        self._reset()
+        self._opened_at = time.monotonic()
+        self._set_state(self.OPEN)
+
+    def _reset(self):
+        self._buckets.clear()
+        self._calls = 0
+        self._failures = 0
+
+    def _reject(self, retry_after: float):
+        metrics.record_circuit_rejection(self.name)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def _set_state(self, state: int):
+        if state != self.state:
+            logger.info(f"Circuit breaker {self.name}: state {self.state} -> {state}")
+        self.state = state
+        metrics.record_circuit_state(self.name, state)
+
+
+class LatencyTracker:
+    """Latencies of the last ``size`` calls, for percentile-based hedging delays"""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque = deque(maxlen=size)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """The pct-th percentile in seconds, or None until enough calls were observed"""
+        samples = sorted(self._samples)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, math.ceil(pct / 100 * len(samples)) - 1)]
+
+
+def deadline_remaining() -> Optional[float]:
+    """Seconds left until the current request's deadline, or None without a deadline"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_timeout(timeout: float) -> float:
+    """``timeout`` shortened to the current request's deadline (zero or less once it has passed)"""
+    remaining = deadline_remaining()
+    return timeout if remaining is None else min(timeout, remaining)
+
+
+def deadline_headers(timeout: float) -> dict:
+    """Header telling the callee how long the caller will wait for it"""
+    return {DEADLINE_HEADER: str(max(0, int(timeout * 1000)))}
+
+
+class DeadlineMiddleware:
+    """ASGI middleware applying the caller's deadline from the X-Request-Deadline-Ms header"""
+
+    def __init__(self, app):
+        self.app = app
+        self._header = DEADLINE_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        value = dict(scope.get("headers", [])).get(self._header)
+        try:
+            budget_ms = int(value) if value is not None else None
+        except ValueError:
+            budget_ms = None
+        if budget_ms is None:
+            await self.app(scope, receive, send)
+            return
+
+        if budget_ms <= 0:
+            from starlette.responses import JSONResponse
+            response = JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+            await response(scope, receive, send)
+            return
+
+        token = _deadline.set(time.monotonic() + budget_ms / 1000)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _deadline.reset(token)
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+    return _hedge_executor
+
+
+def hedged(operation: str, fn: Callable[[], Any], delay: float) -> Any:
+    """fn(), started a second time if the first attempt has not finished after ``delay`` seconds.
+
+    Returns the first successful result; raises the first attempt's error if both fail.
+    Only for idempotent calls: the slower attempt is not cancelled.
+    """
+    executor = _get_hedge_executor()
+    # Each attempt runs in the caller's context so deadlines and request timings apply to it
+    first = executor.submit(contextvars.copy_context().run, fn)
+    if wait([first], timeout=delay).done:
+        return first.result()
+
+    second = executor.submit(contextvars.copy_context().run, fn)
+    pending = {first, second}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for attempt in done:
+            if attempt.exception() is None:
+                metrics.record_hedged_call(operation, attempt is second)
+                return attempt.result()
+    return first.result()
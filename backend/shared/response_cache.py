@@ -0,0 +1,175 @@
+"""
+ASGI cache of final response bytes for read-only GET endpoints
+
+A cached response is served straight from memory: no routing, no DynamoDB
+call and no model validation or JSON encoding. Entries are keyed by path
+and sorted query string and hold the body, its gzip variant (for bodies
+worth compressing) and a weak ETag, so conditional requests get 304 and
+gzip-capable clients get the pre-compressed bytes. The cache is an LRU
+bounded in bytes.
+
+Entries expire after ``ttl_seconds``, and all of them are dropped when the
+``version`` callable returns something new (e.g. after a catalog import).
+Only 200 responses are stored.
+"""
+import gzip
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Callable, Hashable, Iterable, List, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from .env_config import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are not worth a gzip variant
+GZIP_MIN_BYTES = 512
+
+# Response headers regenerated for each reply instead of being stored
+_REGENERATED_HEADERS = {b"content-length", b"content-encoding", b"etag", b"vary"}
+
+
+class CachedResponse:
+    """Final bytes of one response and its precomputed variants"""
+
+    __slots__ = ('status', 'headers', 'body', 'gzip_body', 'etag', 'version', 'expires_at', 'size')
+
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes, version: Hashable,
+                 expires_at: float):
+        self.status = status
+        self.headers = [(name, value) for name, value in headers if name.lower() not in _REGENERATED_HEADERS]
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+        self.etag = b'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+        self.version = version
+        self.expires_at = expires_at
+        self.size = len(body) + len(self.gzip_body or b'') + sum(len(n) + len(v) for n, v in self.headers)
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware serving repeated GETs under ``path_prefixes`` from memory"""
+
+    def __init__(self, app, path_prefixes: Iterable[str], version: Optional[Callable[[], Hashable]] = None,
+                 max_bytes: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.app = app
+        self.path_prefixes = tuple(path_prefixes)
+        self.version = version or (lambda: None)
+        self.max_bytes = settings.RESPONSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.ttl_seconds = settings.RESPONSE_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._size = 0
+        self._version: Hashable = None
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] != "GET" or self.max_bytes <= 0
+                or not scope["path"].startswith(self.path_prefixes)):
+            await self.app(scope, receive, send)
+            return
+
+        version = self.version()
+        if version != self._version:
+            if self._entries:
+                logger.info(f"Response cache cleared: {len(self._entries)} entries, version changed")
+            self.clear()
+            self._version = version
+
+        key = self._key(scope)
+        entry = self._entries.get(key)
+        # A request that started before the version changed may have stored an outdated entry
+        if entry is not None and (entry.expires_at <= time.monotonic() or entry.version != version):
+            self._remove(key)
+            entry = None
+        metrics.record_cache_lookup("response", entry is not None)
+
+        if entry is None:
+            entry = await self._fill(scope, receive, send, key, version)
+            if entry is None:
+                return
+            cache_status = b"MISS"
+        else:
+            self._entries.move_to_end(key)
+            cache_status = b"HIT"
+        await self._reply(scope, send, entry, cache_status)
+
+    def clear(self):
+        """Drop every entry"""
+        self._entries.clear()
+        self._size = 0
+
+    def _key(self, scope) -> str:
+        query = scope.get("query_string", b"").decode("latin-1")
+        if not query:
+            return scope["path"]
+        return scope["path"] + "?" + urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+
+    async def _fill(self, scope, receive, send, key: str, version: Hashable) -> Optional[CachedResponse]:
+        """Run the app and cache its response; returns None once an uncacheable response was passed through"""
+        start = None
+        chunks = []
+        passed_through = False
+
+        async def capture(message):
+            nonlocal start, passed_through
+            if passed_through:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                if message["status"] == 200:
+                    start = message
+                else:
+                    passed_through = True
+                    await send(message)
+            else:
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        if passed_through or start is None:
+            return None
+
+        entry = CachedResponse(start["status"], list(start.get("headers", [])), b"".join(chunks), version,
+                               time.monotonic() + self.ttl_seconds)
+        # One response may not take more than an eighth of the cache
+        if entry.size <= self.max_bytes // 8:
+            self._store(key, entry)
+        return entry
+
+    def _store(self, key: str, entry: CachedResponse):
+        self._remove(key)
+        self._entries[key] = entry
+        self._size += entry.size
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+    async def _reply(self, scope, send, entry: CachedResponse, cache_status: bytes):
+        request_headers = dict(scope.get("headers", []))
+        headers = entry.headers + [(b"etag", entry.etag), (b"vary", b"Accept-Encoding"), (b"x-cache", cache_status)]
+
+        if_none_match = request_headers.get(b"if-none-match")
+        if if_none_match is not None and _etag_matches(if_none_match, entry.etag):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = entry.body
+        if entry.gzip_body is not None and b"gzip" in request_headers.get(b"accept-encoding", b""):
+            body = entry.gzip_body
+            headers.append((b"content-encoding", b"gzip"))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": entry.status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+def _etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    """Weak comparison against an If-None-Match list"""
+    if if_none_match.strip() == b"*":
+        return True
+    opaque = etag[2:]
+    return any(candidate.strip().removeprefix(b"W/") == opaque for candidate in if_none_match.split(b","))
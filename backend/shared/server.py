@@ -0,0 +1,84 @@
+"""
+Production server for the services: gunicorn managing uvicorn workers
+
+The app is imported once in the master before the workers are forked
+(``preload_app``), so the imported code is shared copy-on-write. Each
+worker runs the service's ``warm_up`` (DynamoDB clients, JWKS, caches)
+before it accepts connections, and is replaced after SERVER_MAX_REQUESTS
+requests. Nothing holding sockets or threads may be created at import
+time: boto3 clients and connection pools do not survive a fork.
+
+Metrics (METRICS_ENABLED) are kept per worker, so with several workers
+/metrics reports whichever worker answers the scrape.
+
+Gunicorn is only needed here, so it is imported when a server starts.
+"""
+import logging
+import math
+import os
+import time
+from typing import Optional, Callable
+
+from .env_config import settings
+
+logger = logging.getLogger(__name__)
+
+# A worker that has not reported back for this long is restarted (also bounds warm-up)
+WORKER_TIMEOUT_SECONDS = 120
+
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring CPU affinity and a cgroup v2 quota (docker --cpus)"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def serve(app, port: int, warm_up: Optional[Callable[[], None]] = None, workers: Optional[int] = None):
+    """Run ``app`` on ``port`` with one worker per available CPU until the server is stopped"""
+    from gunicorn.app.base import BaseApplication
+
+    def post_worker_init(worker):
+        if warm_up is None:
+            return
+        started = time.perf_counter()
+        try:
+            warm_up()
+            logger.info(f"Worker {worker.pid} warmed up in {(time.perf_counter() - started) * 1000:.0f}ms")
+        except Exception as e:
+            # A cold worker still serves; the first requests pay for what failed here
+            logger.warning(f"Worker {worker.pid} warm-up failed: {e}")
+
+    options = {
+        "bind": f"0.0.0.0:{port}",
+        "workers": workers or settings.SERVER_WORKERS or available_cpus(),
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+        "timeout": WORKER_TIMEOUT_SECONDS,
+        "post_worker_init": post_worker_init,
+    }
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    if settings.METRICS_ENABLED and options["workers"] > 1:
+        # Metrics live in each worker's memory; a scrape reaches whichever worker accepts it
+        logger.warning(
+            f"METRICS_ENABLED with {options['workers']} workers: /metrics reports one worker per scrape "
+            f"and its counters restart when it is recycled; set SERVER_WORKERS=1 for exact metrics"
+        )
+    logger.info(f"Starting {options['workers']} workers on port {port}")
+    Server().run()
@@ -0,0 +1,40 @@
+"""
+Load service packages side by side in one process
+
+Each service ships its code as a top-level ``app`` package, so only one of
+them can be imported as ``app``. This loads a service's package under a
+unique name (e.g. ``product_service_app``) instead; the services only use
+relative imports internally, so they work unchanged under the new name.
+"""
+import importlib
+import importlib.util
+import sys
+from pathlib import Path
+from types import ModuleType
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def service_package_name(service: str) -> str:
+    """Package name a service is loaded under (product-service -> product_service_app)"""
+    return f"{service.replace('-', '_')}_app"
+
+
+def load_service_module(service: str, module: str = "main") -> ModuleType:
+    """Import ``<service>/app/<module>.py`` under the service's unique package name"""
+    package_name = service_package_name(service)
+
+    if package_name not in sys.modules:
+        package_dir = BACKEND_DIR / service / "app"
+        spec = importlib.util.spec_from_file_location(
+            package_name,
+            package_dir / "__init__.py",
+            submodule_search_locations=[str(package_dir)]
+        )
+        if spec is None or spec.loader is None:
+            raise ImportError(f"Cannot load service package from {package_dir}")
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[package_name] = package
+        spec.loader.exec_module(package)
+
+    return importlib.import_module(f"{package_name}.{module}")
@@ -0,0 +1,67 @@
+"""
+Single-flight coalescing of identical concurrent reads
+
+When many threads ask for the same key at once (a hot product at cold start
+or right after its cached response expired) only the first one makes the
+backend call; the others wait for its result, or get its exception re-raised.
+A waiter gives up after its timeout and makes its own call, so a stuck
+leader can delay requests but never fail them. Results are shared between
+callers and must not be mutated.
+"""
+import logging
+import threading
+from typing import Optional, Callable, Dict, Hashable, Any
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one call (thread-safe)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, timeout: Optional[float] = None) -> Any:
+        """Return fn(*args), sharing the call with any identical one in flight.
+
+        ``timeout`` is how long to wait for an in-flight call before calling fn
+        directly (None waits as long as the leader takes).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        metrics.record_cache_lookup(f"singleflight_{self.name}", not leader)
+
+        if leader:
+            try:
+                call.result = fn(*args)
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if not call.done.wait(timeout):
+            logger.warning(f"{self.name}: in-flight call for {key!r} exceeded {timeout}s, calling directly")
+            return fn(*args)
+        if call.error is not None:
+            raise call.error
+        return call.result
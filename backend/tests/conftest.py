@@ -0,0 +1,55 @@
+"""
+Shared fixtures for the backend tests
+
+The services run on the in-memory storage engine (STORAGE_BACKEND=memory),
+so the suite needs no DynamoDB Local and starts in milliseconds. Engine
+tests run the same operations against moto as well, which keeps the engine
+honest about DynamoDB's semantics.
+"""
+import os
+import sys
+from pathlib import Path
+
+# Settings are read once, on the first import of shared.env_config
+os.environ.update({
+    "ENV": "dev",  # configured from the environment only: no .env files
+    "STORAGE_BACKEND": "memory",
+    "AWS_REGION": "us-west-2",
+    "AWS_DEFAULT_REGION": "us-west-2",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "USE_COGNITO_AUTH": "false",
+    "SERVICE_API_KEY": "test-service-key",
+})
+os.environ.pop("DYNAMODB_ENDPOINT", None)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import boto3
+import pytest
+
+from shared.memory_dynamodb import MemoryDynamoDB, get_engine
+from shared.service_loader import load_service_module
+
+
+@pytest.fixture(params=["moto", "memory"])
+def dynamodb(request):
+    """``(resource, client)`` of moto's DynamoDB or of a fresh in-memory engine"""
+    if request.param == "memory":
+        engine = MemoryDynamoDB()
+        yield engine.resource, engine.client
+        return
+
+    moto = pytest.importorskip("moto")
+    with moto.mock_aws():
+        yield boto3.resource("dynamodb"), boto3.client("dynamodb")
+
+
+@pytest.fixture
+def tables():
+    """The services' tables, empty, on the process's in-memory engine"""
+    get_engine().reset()
+    load_service_module("product-service", "database").create_tables()
+    load_service_module("cart-service", "database").create_tables()
+    load_service_module("cart-service", "cart_cache").cart_cache.invalidate()
+    yield get_engine().resource
+    get_engine().reset()
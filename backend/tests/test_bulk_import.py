@@ -0,0 +1,55 @@
+"""
+Bulk product import (product-service) on the in-memory engine
+"""
+import json
+
+import pytest
+
+from shared.env_config import config
+from shared.service_loader import load_service_module
+
+bulk_import = load_service_module("product-service", "bulk_import")
+database = load_service_module("product-service", "database")
+stock = load_service_module("product-service", "stock")
+
+
+def _row(product_id: str, stock_level: int) -> str:
+    return json.dumps({
+        'id': product_id, 'name': product_id, 'description': '', 'price': 2.5, 'category': 'c',
+        'image_url': 'https://example.com/p.png', 'stock': stock_level
+    }) + '\n'
+
+
+@pytest.fixture
+def product_db(tables):
+    database._stock_shards.clear()
+    yield database.ProductDB()
+    database._stock_shards.clear()
+
+
+def test_import(product_db):
+    lines = [_row(f'p{n}', n) for n in range(60)] + ['{"id": "bad"}\n', 'not json\n']
+
+    summary = bulk_import.ProductImporter(workers=2).run(lines)
+
+    assert (summary['rows'], summary['imported'], summary['invalid']) == (62, 60, 2)
+    assert [error['row'] for error in summary['errors']] == [61, 62]
+    assert product_db.get_stock('p7') == 7
+
+
+def test_import_replaces_sharded_stock(tables, product_db):
+    bulk_import.ProductImporter(workers=1).run([_row('p1', 12)])
+    assert stock.enable_sharding('p1', 4)
+    assert product_db.decrement_stock('p1', 2)
+
+    summary = bulk_import.ProductImporter(workers=1).run([_row('p1', 50), _row('p2', 5)])
+
+    assert summary['imported'] == 2
+    assert 'stock_shards' not in tables.Table(config.PRODUCTS_TABLE_NAME).get_item(Key={'id': 'p1'})['Item']
+    assert tables.Table(config.STOCK_SHARDS_TABLE_NAME).scan()['Items'] == []
+    assert product_db.get_stock('p1') == 50
+
+    # A process still caching the shard count takes the units from the imported stock
+    database._stock_shards['p1'] = 4
+    assert product_db.decrement_stock('p1', 3)
+    assert product_db.get_stock('p1') == 47
@@ -0,0 +1,77 @@
+"""
+Cart cache (cart-service): version checks on read, on the in-memory engine
+"""
+import pytest
+
+from shared.env_config import config
+from shared.service_loader import load_service_module
+
+cart_cache_module = load_service_module("cart-service", "cart_cache")
+database = load_service_module("cart-service", "database")
+
+USER_ID = 'user-1'
+
+
+@pytest.fixture
+def cart_db(tables):
+    cart_db = database.CartDB()
+    cart_db.create_cart(USER_ID)
+    cart_db.add_item_to_cart(USER_ID, 'p1', 1, 2.0)
+    return cart_db
+
+
+def _write_elsewhere(tables, items):
+    """A write by another worker: the stored cart changes, this process's cache does not"""
+    tables.Table(config.CARTS_TABLE_NAME).update_item(
+        Key={'user_id': USER_ID},
+        UpdateExpression='SET #items = :items ADD #version :one',
+        ExpressionAttributeNames={'#items': 'items', '#version': 'version'},
+        ExpressionAttributeValues={':items': items, ':one': 1}
+    )
+
+
+def test_write_by_another_worker_is_seen(tables, cart_db):
+    cached = cart_db.get_cart(USER_ID)
+    _write_elsewhere(tables, [])
+
+    cart = cart_db.get_cart(USER_ID)
+
+    assert cart['items'] == []
+    assert cart['version'] == cached['version'] + 1
+
+
+def test_cached_cart_is_served_when_not_older(tables, cart_db):
+    cart = cart_db.get_cart(USER_ID)
+    # A cached version ahead of the stored one (a lagging read) keeps the cached cart
+    cart_cache_module.cart_cache.put(dict(cart, version=cart['version'] + 5, items=[]), written=True)
+
+    assert cart_db.get_cart(USER_ID)['items'] == []
+
+
+def test_get_without_version_check():
+    cache = cart_cache_module.CartCache(ttl_seconds=60, max_items=2)
+    cache.put({'user_id': 'a', 'version': 2})
+    # A read of an older version does not replace a newer cached one
+    cache.put({'user_id': 'a', 'version': 1})
+
+    assert cache.get('a') == {'user_id': 'a', 'version': 2}
+    assert cache.get('a', stored_version=lambda: 2)['version'] == 2
+    assert cache.get('a', stored_version=lambda: None)['version'] == 2
+    assert cache.get('a', stored_version=lambda: 3) is None
+    assert cache.get('a') is None
+
+
+def test_cache_is_bounded():
+    cache = cart_cache_module.CartCache(ttl_seconds=60, max_items=2)
+    for user_id in ('a', 'b', 'c'):
+        cache.put({'user_id': user_id})
+
+    assert cache.get('a') is None
+    assert cache.get('c') == {'user_id': 'c'}
+
+
+def test_zero_ttl_disables_the_cache():
+    cache = cart_cache_module.CartCache(ttl_seconds=0, max_items=2)
+    cache.put({'user_id': 'a'}, written=True)
+
+    assert cache.get('a') is None
@@ -0,0 +1,160 @@
+"""
+Transactional checkout (cart-service) on the in-memory engine
+"""
+import time
+import uuid
+
+import pytest
+from botocore.exceptions import ClientError
+
+from shared.env_config import config
+from shared.service_loader import load_service_module
+
+checkout = load_service_module("cart-service", "checkout")
+
+USER_ID = 'user-1'
+
+
+@pytest.fixture
+def store(tables):
+    """Seeds products, reservations and the user's cart; reads back what checkout left"""
+    return Store(tables)
+
+
+class Store:
+    def __init__(self, resource):
+        self.products = resource.Table(config.PRODUCTS_TABLE_NAME)
+        self.reservations = resource.Table(config.RESERVATIONS_TABLE_NAME)
+        self.carts = resource.Table(config.CARTS_TABLE_NAME)
+
+    def product(self, product_id: str, stock: int):
+        self.products.put_item(Item={'id': product_id, 'name': product_id, 'category': 'c', 'price': 2, 'stock': stock})
+
+    def reserve(self, product_id: str, count: int, expired: int = 0):
+        """``count`` one-unit reservations, the first ``expired`` of them already gone (returned to stock)"""
+        now = int(time.time())
+        reservation_ids = [str(uuid.uuid4()) for _ in range(count)]
+        for reservation_id in reservation_ids[expired:]:
+            self.reservations.put_item(Item={
+                'reservation_id': reservation_id, 'product_id': product_id, 'quantity': 1,
+                'owner': USER_ID, 'created_at': now, 'expires_at': now + 900
+            })
+        return reservation_ids
+
+    def cart(self, *items):
+        cart = {
+            'user_id': USER_ID, 'id': 'cart-1', 'items': list(items),
+            'created_at': '2024-01-01T00:00:00', 'updated_at': '2024-01-01T00:00:01', 'version': 1
+        }
+        self.carts.put_item(Item=cart)
+        return cart
+
+    def stock(self, product_id: str) -> int:
+        return int(self.products.get_item(Key={'id': product_id})['Item']['stock'])
+
+    def reserved(self) -> int:
+        return sum(int(reservation['quantity']) for reservation in self.reservations.scan()['Items'])
+
+    def cart_items(self):
+        return self.carts.get_item(Key={'user_id': USER_ID})['Item']['items']
+
+
+def _line(product_id: str, quantity: int, reservation_ids=()):
+    return {'product_id': product_id, 'quantity': quantity, 'price': 2, 'reservation_ids': list(reservation_ids)}
+
+
+def _statuses(result):
+    return [(line['product_id'], line['status'], line['reason']) for line in result['lines']]
+
+
+def test_checkout_consumes_reservations_and_stock(store):
+    store.product('p1', 8)
+    store.product('p2', 5)
+    cart = store.cart(_line('p1', 2, store.reserve('p1', 2)), _line('p2', 3))
+
+    result = checkout.Checkout(USER_ID, cart).run()
+
+    assert result['status'] == 'completed'
+    assert result['total'] == 10
+    assert (store.stock('p1'), store.stock('p2'), store.reserved()) == (8, 2, 0)
+    assert store.cart_items() == []
+
+
+def test_checkout_fails_on_insufficient_stock(store):
+    store.product('p1', 8)
+    store.product('p2', 1)
+    cart = store.cart(_line('p1', 2, store.reserve('p1', 2)), _line('p2', 3))
+
+    result = checkout.Checkout(USER_ID, cart).run()
+
+    assert result['status'] == 'failed'
+    assert _statuses(result) == [('p1', 'failed', 'not_applied'), ('p2', 'failed', 'insufficient_stock')]
+    assert result['lines'][1]['available'] == 1
+    # Atomic: the reservations and the cart are untouched
+    assert (store.stock('p2'), store.reserved(), len(store.cart_items())) == (1, 2, 2)
+
+
+def test_expired_reservation_falls_back_to_stock(store):
+    store.product('p1', 5)
+    cart = store.cart(_line('p1', 3, store.reserve('p1', 3, expired=1)))
+
+    result = checkout.Checkout(USER_ID, cart).run()
+
+    assert result['status'] == 'completed'
+    assert (store.stock('p1'), store.reserved()) == (4, 0)
+
+
+@pytest.mark.parametrize('count', [150, 250])
+def test_line_with_more_reservations_than_a_transaction(store, count):
+    store.product('p1', 10)
+    cart = store.cart(_line('p1', count, store.reserve('p1', count)))
+
+    result = checkout.Checkout(USER_ID, cart).run()
+
+    assert result['status'] == 'completed'
+    assert (store.stock('p1'), store.reserved()) == (10, 0)
+    assert store.cart_items() == []
+
+
+def test_merge_failure_keeps_merged_reservations_in_cart(store):
+    # Two of 150 reservations expired and there is no stock to replace them
+    store.product('p1', 0)
+    cart = store.cart(_line('p1', 150, store.reserve('p1', 150, expired=2)))
+
+    result = checkout.Checkout(USER_ID, cart).run()
+
+    assert _statuses(result) == [('p1', 'failed', 'insufficient_stock')]
+    # The cart references live reservations still holding every reserved unit
+    reservation_ids = store.cart_items()[0]['reservation_ids']
+    assert store.reserved() == 148
+    assert all('Item' in store.reservations.get_item(Key={'reservation_id': r}) for r in reservation_ids)
+
+
+def test_lines_are_rechunked_after_fallback(store):
+    # 50 + 49 reservations and the cart update fill a transaction; the fallback adds an action
+    store.product('p0', 5)
+    store.product('p1', 5)
+    cart = store.cart(
+        _line('p0', 50, store.reserve('p0', 50, expired=1)),
+        _line('p1', 49, store.reserve('p1', 49))
+    )
+
+    result = checkout.Checkout(USER_ID, cart).run()
+
+    assert result['status'] == 'completed'
+    assert (store.stock('p0'), store.stock('p1'), store.reserved()) == (4, 5, 0)
+
+
+def test_rejected_transaction_fails_the_chunk(store, monkeypatch):
+    def reject(*args, **kwargs):
+        raise ClientError({'Error': {'Code': 'ValidationException', 'Message': 'rejected'}}, 'TransactWriteItems')
+
+    monkeypatch.setattr(checkout, 'transact_write_items', reject)
+    store.product('p1', 5)
+    store.product('p2', 5)
+    cart = store.cart(_line('p1', 1), _line('p2', 1))
+
+    result = checkout.Checkout(USER_ID, cart).run()
+
+    assert _statuses(result) == [('p1', 'failed', 'invalid_request'), ('p2', 'failed', 'invalid_request')]
+    assert (store.stock('p1'), len(store.cart_items())) == (5, 2)
@@ -0,0 +1,55 @@
+"""
+Combined service: cart-service calling product-service in-process
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from shared.env_config import config
+from shared.models import UserToken
+from shared.service_loader import load_service_module
+
+combined = load_service_module("combined-service")
+cart_routes = load_service_module("cart-service", "routes")
+
+USER_ID = 'user-1'
+
+
+@pytest.fixture
+def client(tables):
+    combined.app.dependency_overrides[cart_routes.verify_user_token] = (
+        lambda: UserToken(user_id=USER_ID, username='user')
+    )
+    yield TestClient(combined.app)
+    combined.app.dependency_overrides.clear()
+
+
+def _product(tables, product_id: str, description: str):
+    tables.Table(config.PRODUCTS_TABLE_NAME).put_item(Item={
+        'id': product_id, 'name': product_id, 'description': description, 'price': 2,
+        'category': 'c', 'image_url': 'https://example.com/p.png', 'stock': 5
+    })
+
+
+@pytest.mark.parametrize('description', ['short', 'x' * 800], ids=['short', 'long'])
+def test_add_to_cart(tables, client, description):
+    # Product responses of 512 bytes and more are gzip-compressed for clients that accept it
+    product_id = f'p-{len(description)}'
+    _product(tables, product_id, description)
+
+    response = client.post('/api/cart/add', json={'product_id': product_id, 'quantity': 2})
+
+    assert response.status_code == 200, response.text
+    items = client.get('/api/cart').json()['items']
+    assert [(item['product_id'], item['quantity']) for item in items] == [(product_id, 2)]
+    assert tables.Table(config.PRODUCTS_TABLE_NAME).get_item(Key={'id': product_id})['Item']['stock'] == 3
+
+
+def test_rejected_service_key_is_not_an_outage(tables, client, monkeypatch):
+    # Product-service with SERVICE_API_KEY unset refuses every reservation
+    monkeypatch.setattr(config, 'SERVICE_API_KEY', None)
+    _product(tables, 'p1', 'short')
+
+    response = client.post('/api/cart/add', json={'product_id': 'p1', 'quantity': 1})
+
+    assert response.status_code == 500
+    assert response.json()['detail'] == "Product service rejected the service key"
@@ -0,0 +1,242 @@
+"""
+The in-memory storage engine against moto
+
+Every test runs twice, once per backend (the ``dynamodb`` fixture), and
+asserts the same results, so a divergence shows up as one of the pair
+failing.
+"""
+from decimal import Decimal
+
+import pytest
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+
+@pytest.fixture
+def table(dynamodb):
+    """Products-like table: hash key ``id``, GSI on category and price"""
+    resource, client = dynamodb
+    client.create_table(
+        TableName='items',
+        KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[
+            {'AttributeName': 'id', 'AttributeType': 'S'},
+            {'AttributeName': 'category', 'AttributeType': 'S'},
+            {'AttributeName': 'price', 'AttributeType': 'N'}
+        ],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'category-price-index',
+            'KeySchema': [
+                {'AttributeName': 'category', 'KeyType': 'HASH'},
+                {'AttributeName': 'price', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'ALL'}
+        }],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    return resource.Table('items')
+
+
+@pytest.fixture
+def catalog(table):
+    """Ten items in category ``c``, priced 1..10, every other one in stock"""
+    with table.batch_writer() as batch:
+        for n in range(1, 11):
+            batch.put_item(Item={'id': f'p{n}', 'category': 'c', 'price': n, 'stock': n % 2})
+    return table
+
+
+def _code(error: ClientError) -> str:
+    return error.response['Error']['Code']
+
+
+def test_condition_on_put_and_update(table):
+    table.put_item(Item={'id': 'p1', 'stock': 5}, ConditionExpression=Attr('id').not_exists())
+
+    with pytest.raises(ClientError) as raised:
+        table.put_item(Item={'id': 'p1', 'stock': 0}, ConditionExpression=Attr('id').not_exists())
+    assert _code(raised.value) == 'ConditionalCheckFailedException'
+
+    table.update_item(
+        Key={'id': 'p1'},
+        UpdateExpression='SET stock = stock - :q',
+        ConditionExpression='stock >= :q',
+        ExpressionAttributeValues={':q': 3}
+    )
+    with pytest.raises(ClientError) as raised:
+        table.update_item(
+            Key={'id': 'p1'},
+            UpdateExpression='SET stock = stock - :q',
+            ConditionExpression='stock >= :q',
+            ExpressionAttributeValues={':q': 3},
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+    assert _code(raised.value) == 'ConditionalCheckFailedException'
+    # The old item comes back in wire format, as boto3 does not deserialize error responses
+    assert raised.value.response['Item'] == {'id': {'S': 'p1'}, 'stock': {'N': '2'}}
+    assert table.get_item(Key={'id': 'p1'})['Item']['stock'] == 2
+
+
+def test_condition_on_missing_item(table):
+    with pytest.raises(ClientError) as raised:
+        table.update_item(
+            Key={'id': 'nope'},
+            UpdateExpression='SET stock = :s',
+            ConditionExpression=Attr('id').exists(),
+            ExpressionAttributeValues={':s': 1}
+        )
+    assert _code(raised.value) == 'ConditionalCheckFailedException'
+    assert 'Item' not in table.get_item(Key={'id': 'nope'})
+
+    table.delete_item(Key={'id': 'nope'})
+    with pytest.raises(ClientError) as raised:
+        table.delete_item(Key={'id': 'nope'}, ConditionExpression=Attr('id').exists())
+    assert _code(raised.value) == 'ConditionalCheckFailedException'
+
+
+def test_add_number_and_set(table):
+    response = table.update_item(
+        Key={'id': 'p1'},
+        UpdateExpression='ADD version :one, tags :t',
+        ExpressionAttributeValues={':one': 1, ':t': {'a', 'b'}},
+        ReturnValues='ALL_NEW'
+    )
+    assert response['Attributes'] == {'id': 'p1', 'version': 1, 'tags': {'a', 'b'}}
+
+    response = table.update_item(
+        Key={'id': 'p1'},
+        UpdateExpression='ADD version :one, tags :t',
+        ExpressionAttributeValues={':one': 1, ':t': {'b', 'c'}},
+        ReturnValues='UPDATED_NEW'
+    )
+    assert response['Attributes'] == {'version': 2, 'tags': {'a', 'b', 'c'}}
+
+
+def test_if_not_exists_and_list_append(table):
+    update = {
+        'Key': {'id': 'cart'},
+        'UpdateExpression': 'SET #items = list_append(if_not_exists(#items, :empty), :new), '
+                            'created_at = if_not_exists(created_at, :now)',
+        'ExpressionAttributeNames': {'#items': 'items'},
+        'ReturnValues': 'ALL_NEW'
+    }
+    first = table.update_item(ExpressionAttributeValues={':empty': [], ':new': [{'q': 1}], ':now': 't1'}, **update)
+    second = table.update_item(ExpressionAttributeValues={':empty': [], ':new': [{'q': 2}], ':now': 't2'}, **update)
+
+    assert first['Attributes'] == {'id': 'cart', 'items': [{'q': 1}], 'created_at': 't1'}
+    assert second['Attributes'] == {'id': 'cart', 'items': [{'q': 1}, {'q': 2}], 'created_at': 't1'}
+
+
+def test_gsi_query_with_limit_and_filter(catalog):
+    params = {
+        'IndexName': 'category-price-index',
+        'KeyConditionExpression': Key('category').eq('c') & Key('price').gte(3),
+        'FilterExpression': Attr('stock').gt(0),
+        'Limit': 3
+    }
+    # Limit counts items read, before the filter
+    page = catalog.query(**params)
+    assert page['ScannedCount'] == 3
+    assert [item['price'] for item in page['Items']] == [3, 5]
+    assert page['LastEvaluatedKey'] == {'id': 'p5', 'category': 'c', 'price': 5}
+
+    prices = [item['price'] for item in page['Items']]
+    while 'LastEvaluatedKey' in page:
+        page = catalog.query(ExclusiveStartKey=page['LastEvaluatedKey'], **params)
+        prices += [item['price'] for item in page['Items']]
+    assert prices == [3, 5, 7, 9]
+
+    page = catalog.query(ScanIndexForward=False, **params)
+    assert [item['price'] for item in page['Items']] == [9]
+    assert page['LastEvaluatedKey'] == {'id': 'p8', 'category': 'c', 'price': 8}
+
+    page = catalog.query(Select='COUNT', **dict(params, Limit=100))
+    assert (page['Count'], page['ScannedCount']) == (4, 8)
+
+
+def test_segmented_scan(catalog):
+    segments = []
+    for segment in range(3):
+        ids = []
+        params = {'Segment': segment, 'TotalSegments': 3, 'Limit': 2}
+        page = catalog.scan(**params)
+        ids += [item['id'] for item in page['Items']]
+        while 'LastEvaluatedKey' in page:
+            page = catalog.scan(ExclusiveStartKey=page['LastEvaluatedKey'], **params)
+            ids += [item['id'] for item in page['Items']]
+        segments.append(ids)
+
+    scanned = [item_id for ids in segments for item_id in ids]
+    assert len(scanned) == len(set(scanned))
+    assert set(scanned) == {f'p{n}' for n in range(1, 11)}
+
+
+def test_transaction_cancellation_reasons(dynamodb, catalog):
+    _, client = dynamodb
+    with pytest.raises(ClientError) as raised:
+        client.transact_write_items(
+            TransactItems=[
+                {'Update': {
+                    'TableName': 'items',
+                    'Key': {'id': {'S': 'p1'}},
+                    'UpdateExpression': 'SET stock = stock - :q',
+                    'ConditionExpression': 'stock >= :q',
+                    'ExpressionAttributeValues': {':q': {'N': '1'}}
+                }},
+                {'Update': {
+                    'TableName': 'items',
+                    'Key': {'id': {'S': 'p2'}},
+                    'UpdateExpression': 'SET stock = stock - :q',
+                    'ConditionExpression': 'stock >= :q',
+                    'ExpressionAttributeValues': {':q': {'N': '1'}},
+                    'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+                }},
+                {'ConditionCheck': {
+                    'TableName': 'items',
+                    'Key': {'id': {'S': 'p3'}},
+                    'ConditionExpression': 'attribute_exists(id)'
+                }}
+            ]
+        )
+    assert _code(raised.value) == 'TransactionCanceledException'
+
+    reasons = raised.value.response['CancellationReasons']
+    assert [reason['Code'] for reason in reasons] == ['None', 'ConditionalCheckFailed', 'None']
+    assert reasons[1]['Item'] == {
+        'id': {'S': 'p2'}, 'category': {'S': 'c'}, 'price': {'N': '2'}, 'stock': {'N': '0'}
+    }
+    # Nothing was applied, including the action whose condition held
+    assert catalog.get_item(Key={'id': 'p1'})['Item']['stock'] == 1
+
+
+def test_transaction_applies_all_actions(dynamodb, catalog):
+    _, client = dynamodb
+    client.transact_write_items(
+        TransactItems=[
+            {'Put': {'TableName': 'items', 'Item': {'id': {'S': 'new'}, 'stock': {'N': '1'}},
+                     'ConditionExpression': 'attribute_not_exists(id)'}},
+            {'Delete': {'TableName': 'items', 'Key': {'id': {'S': 'p1'}}}},
+            {'Update': {'TableName': 'items', 'Key': {'id': {'S': 'p3'}},
+                        'UpdateExpression': 'ADD stock :q', 'ExpressionAttributeValues': {':q': {'N': '2'}}}}
+        ]
+    )
+    assert catalog.get_item(Key={'id': 'new'})['Item'] == {'id': 'new', 'stock': 1}
+    assert 'Item' not in catalog.get_item(Key={'id': 'p1'})
+    assert catalog.get_item(Key={'id': 'p3'})['Item']['stock'] == 3
+
+
+def test_batch_get(dynamodb, catalog):
+    resource, _ = dynamodb
+    response = resource.batch_get_item(RequestItems={
+        'items': {'Keys': [{'id': 'p1'}, {'id': 'p4'}, {'id': 'nope'}], 'ProjectionExpression': 'id, price'}
+    })
+    items = sorted(response['Responses']['items'], key=lambda item: item['id'])
+    assert items == [{'id': 'p1', 'price': 1}, {'id': 'p4', 'price': 4}]
+    assert not response['UnprocessedKeys']
+
+
+def test_floats_are_rejected(table):
+    with pytest.raises(TypeError):
+        table.put_item(Item={'id': 'p1', 'price': 1.5})
+    table.put_item(Item={'id': 'p1', 'price': Decimal('1.5')})
+    assert table.get_item(Key={'id': 'p1'})['Item']['price'] == Decimal('1.5')
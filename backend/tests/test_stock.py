@@ -0,0 +1,64 @@
+"""
+Stock of sharded and unsharded products (product-service) on the in-memory engine
+"""
+import pytest
+
+from shared.env_config import config
+from shared.service_loader import load_service_module
+
+database = load_service_module("product-service", "database")
+stock = load_service_module("product-service", "stock")
+
+
+@pytest.fixture
+def product_db(tables, monkeypatch):
+    monkeypatch.setattr(database, '_stock_shards', {})
+    tables.Table(config.PRODUCTS_TABLE_NAME).put_item(Item={
+        'id': 'p1', 'name': 'p1', 'category': 'c', 'price': 2, 'stock': 12
+    })
+    return database.ProductDB()
+
+
+def _stock(product_db) -> int:
+    return product_db.get_stock('p1')
+
+
+def test_decrement_and_restore(product_db):
+    assert product_db.decrement_stock('p1', 5)
+    assert not product_db.decrement_stock('p1', 8)
+    assert product_db.restore_stock('p1', 3)
+    assert _stock(product_db) == 10
+    assert not product_db.restore_stock('nope', 1)
+
+
+def test_sharded_decrement_and_restore(product_db):
+    assert stock.enable_sharding('p1', 4)
+
+    assert product_db.decrement_stock('p1', 5)
+    assert product_db.restore_stock('p1', 2)
+    assert _stock(product_db) == 9
+
+
+def test_restore_after_sharding_was_turned_off(product_db):
+    assert stock.enable_sharding('p1', 4)
+    assert product_db.decrement_stock('p1', 5)
+    # Another process folds the shards back; this one still caches the shard count
+    assert stock.disable_sharding('p1')
+
+    assert product_db.restore_stock('p1', 2)
+    assert _stock(product_db) == 9
+    assert database._stock_shards == {}
+
+
+def test_restore_after_shard_count_changed(product_db):
+    assert stock.enable_sharding('p1', 8)
+    assert product_db.decrement_stock('p1', 4)
+    assert stock.disable_sharding('p1')
+    assert stock.enable_sharding('p1', 2)
+
+    # Every restore lands in one of the two shards left, whichever of the eight cached it picks
+    for _ in range(8):
+        database._stock_shards['p1'] = 8
+        assert product_db.restore_stock('p1', 1)
+    assert _stock(product_db) == 16
+    assert stock.ShardedStock('p1', 2).total() == 16
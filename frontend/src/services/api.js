@@ -144,8 +144,9 @@ export const api = {
 
   // Cart API
   cart: {
-    get: async () => {
-      const response = await cartService.get('/cart');
+    // params.expand = 'products' adds each line's current name, image, price and stock
+    get: async (params = {}) => {
+      const response = await cartService.get('/cart', { params });
       return response.data;
     },
     
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+End-to-end API benchmark suite for the backend services
+Runs both FastAPI apps in-process against moto (default), the services'
+in-memory storage engine or DynamoDB Local, seeds tables through
+scripts/setup-dynamodb.py and reports throughput and p50/p95/p99 latency for
+every endpoint at several catalog and cart sizes. The in-memory engine has
+no database latency, so its numbers are the application's own overhead.
+
+Each catalog size runs in a fresh worker process so caches and table state
+never leak between sizes. No network access is needed: moto intercepts AWS
+calls and the cart -> product call goes to product-service on loopback.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import random
+import argparse
+import threading
+import subprocess
+import importlib.util
+from decimal import Decimal
+from datetime import datetime
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPTS_DIR.parent / "backend"
+
+CATEGORIES = ["Electronics", "Books", "Home", "Sports", "Clothing", "Toys", "Beauty", "Garden"]
+CATEGORY_WEIGHTS = [30, 20, 15, 10, 10, 7, 5, 3]
+
+BENCH_USER = {"username": "user@example.com", "password": "user123"}
+RESULT_MARKER = "BENCHMARK_RESULT "
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def generate_products(count, rng):
+    """Deterministic products with skewed categories and prices"""
+    products = []
+    for i in range(count):
+        products.append({
+            "id": "bench-{:07d}".format(i),
+            "name": "Benchmark Product {}".format(i),
+            "description": "Synthetic product used for API benchmarks. " * rng.randint(1, 6),
+            "price": Decimal(str(round(min(rng.lognormvariate(3.5, 1.0), 5000.0), 2))),
+            "category": rng.choices(CATEGORIES, weights=CATEGORY_WEIGHTS)[0],
+            "image_url": "https://example.com/images/{}.jpg".format(i),
+            "stock": 1000000,
+        })
+    return products
+
+
+def load_setup_module(args):
+    """Import scripts/setup-dynamodb.py and point it at the benchmark tables"""
+    spec = importlib.util.spec_from_file_location("setup_dynamodb", SCRIPTS_DIR / "setup-dynamodb.py")
+    setup = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(setup)
+    setup.DYNAMODB_ENDPOINT = args.dynamodb_endpoint
+    setup.PRODUCTS_TABLE = args.products_table
+    setup.CARTS_TABLE = args.carts_table
+    setup.RESERVATIONS_TABLE = args.reservations_table
+    setup.STOCK_SHARDS_TABLE = args.stock_shards_table
+    if args.storage_backend == "memory" and not args.dynamodb_endpoint:
+        # Create and seed the tables in the services' engine rather than through boto3
+        from shared import dynamodb_utils
+        setup.get_dynamodb_client = dynamodb_utils.get_dynamodb_client
+        setup.get_dynamodb_resource = dynamodb_utils.get_dynamodb_resource
+    return setup
+
+
+def seed_tables(setup, products):
+    """(Re)create the benchmark tables and load the catalog"""
+    client = setup.get_dynamodb_client()
+    existing = client.list_tables().get("TableNames", [])
+    for table_name in (setup.PRODUCTS_TABLE, setup.CARTS_TABLE, setup.RESERVATIONS_TABLE, setup.STOCK_SHARDS_TABLE):
+        if table_name in existing:
+            client.delete_table(TableName=table_name)
+            client.get_waiter("table_not_exists").wait(TableName=table_name)
+
+    if not (setup.create_products_table() and setup.create_carts_table() and setup.create_reservations_table()
+            and setup.create_stock_shards_table()):
+        raise RuntimeError("Failed to create benchmark tables")
+
+    table = setup.get_dynamodb_resource().Table(setup.PRODUCTS_TABLE)
+    with table.batch_writer() as batch:
+        for product in products:
+            batch.put_item(Item=product)
+
+
+def seed_cart(setup, user_id, products, size):
+    """Write a cart with `size` lines directly to the carts table"""
+    now = datetime.utcnow().isoformat()
+    table = setup.get_dynamodb_resource().Table(setup.CARTS_TABLE)
+    table.put_item(Item={
+        "user_id": user_id,
+        "id": "bench-cart",
+        "items": [
+            {"id": "line-{}".format(i), "product_id": product["id"], "quantity": 1, "price": product["price"]}
+            for i, product in enumerate(products[:size])
+        ],
+        "created_at": now,
+        "updated_at": now,
+    })
+
+
+def start_server(app):
+    """Serve an ASGI app on a free loopback port in a background thread"""
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="product-service", daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("product-service did not start")
+        time.sleep(0.01)
+    return "http://127.0.0.1:{}/api".format(port)
+
+
+def measure(name, call, args, setup_each=None):
+    """Run one scenario and return its latency statistics"""
+    for _ in range(args.warmup):
+        if setup_each:
+            setup_each()
+        call()
+
+    latencies = []
+    errors = 0
+    busy = 0.0
+    deadline = time.monotonic() + args.max_seconds
+    for _ in range(args.requests):
+        if setup_each:
+            setup_each()
+        started = time.perf_counter()
+        response = call()
+        elapsed = time.perf_counter() - started
+        busy += elapsed
+        latencies.append(elapsed * 1000)
+        if response.status_code >= 400:
+            errors += 1
+        if time.monotonic() > deadline:
+            break
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / busy if busy else 0.0,
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def benchmarked_routes(scenarios):
+    """Route templates covered by a scenario list"""
+    return {scenario[1] for scenario in scenarios}
+
+
+def check_coverage(app, covered, service):
+    """Warn about API routes that have no benchmark scenario"""
+    routes = {
+        "{} {}".format(method, route.path)
+        for route in app.routes
+        if getattr(route, "path", "").startswith("/api")
+        for method in getattr(route, "methods", None) or []
+    }
+    for missing in sorted(routes - covered):
+        print("[WARNING] {}: no benchmark scenario for {}".format(service, missing), file=sys.stderr)
+
+
+def run_worker(args):
+    """Benchmark every endpoint for a single catalog size (runs in its own process)"""
+    os.environ.update({
+        "ENV": "local" if args.dynamodb_endpoint else "dev",
+        "AWS_REGION": "us-west-2",
+        "AWS_DEFAULT_REGION": "us-west-2",
+        "AWS_ACCESS_KEY_ID": "dummy",
+        "AWS_SECRET_ACCESS_KEY": "dummy",
+        "PRODUCTS_TABLE_NAME": args.products_table,
+        "CARTS_TABLE_NAME": args.carts_table,
+        "RESERVATIONS_TABLE_NAME": args.reservations_table,
+        "STOCK_SHARDS_TABLE_NAME": args.stock_shards_table,
+        "USE_COGNITO_AUTH": "false",
+        "ADMIN_API_KEY": "bench-admin-key",
+        "SERVICE_API_KEY": "bench-service-key",
+        "PRODUCT_READ_MODE": args.product_read_mode,
+    })
+    if args.dynamodb_endpoint:
+        os.environ["DYNAMODB_ENDPOINT"] = args.dynamodb_endpoint
+    elif args.storage_backend == "memory":
+        os.environ["STORAGE_BACKEND"] = "memory"
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    if not args.dynamodb_endpoint and args.storage_backend == "moto":
+        from moto import mock_aws
+        mock_aws().start()
+
+    rng = random.Random(args.seed)
+    products = generate_products(args.catalog_size, rng)
+    setup = load_setup_module(args)
+    seed_tables(setup, products)
+
+    from fastapi.testclient import TestClient
+    from shared.service_loader import load_service_module
+
+    product_main = load_service_module("product-service")
+    os.environ["PRODUCT_SERVICE_URL"] = start_server(product_main.app)
+    cart_main = load_service_module("cart-service")
+    cart_cache = load_service_module("cart-service", "cart_cache").cart_cache
+    # The services configure INFO logging; keep per-request logs out of the benchmark output
+    logging.getLogger().setLevel(logging.WARNING)
+
+    product_client = TestClient(product_main.app)
+    cart_client = TestClient(cart_main.app)
+
+    login = cart_client.post("/api/auth/login", json=BENCH_USER).json()
+    headers = {"Authorization": "Bearer {}".format(login["access_token"])}
+    user_id = login["user_id"]
+
+    def random_product():
+        return products[rng.randrange(len(products))]["id"]
+
+    service_headers = {"X-Service-Key": "bench-service-key"}
+    reserved = {}
+
+    def reserve_one():
+        product_id = random_product()
+        response = product_client.post("/api/products/{}/reservations".format(product_id), json={"quantity": 1},
+                                       headers=service_headers)
+        reserved.update(product_id=product_id, reservation_id=response.json()["reservation_id"])
+
+    # Re-importing existing products keeps the catalog the same size
+    import_body = "".join(
+        json.dumps(dict(product, price=float(product["price"]))) + "\n" for product in products[:100]
+    ).encode()
+
+    product_scenarios = [
+        ("health", "GET /api/health", lambda: product_client.get("/api/health"), None),
+        ("list", "GET /api/products", lambda: product_client.get("/api/products"), None),
+        ("list_category", "GET /api/products",
+         lambda: product_client.get("/api/products", params={"category": rng.choice(CATEGORIES)}), None),
+        ("list_page", "GET /api/products",
+         lambda: product_client.get("/api/products", params={"limit": 20, "offset": rng.randrange(0, 80, 20)}), None),
+        ("facets", "GET /api/products/facets",
+         lambda: product_client.get("/api/products/facets", params={"category": rng.choice(CATEGORIES)}), None),
+        ("detail", "GET /api/products/{product_id}",
+         lambda: product_client.get("/api/products/{}".format(random_product())), None),
+        ("categories", "GET /api/categories", lambda: product_client.get("/api/categories"), None),
+        ("reserve", "POST /api/products/{product_id}/reservations",
+         lambda: product_client.post("/api/products/{}/reservations".format(random_product()), json={"quantity": 1},
+                                     headers=service_headers), None),
+        ("release", "DELETE /api/products/{product_id}/reservations/{reservation_id}",
+         lambda: product_client.delete("/api/products/{product_id}/reservations/{reservation_id}".format(**reserved),
+                                       headers=service_headers), reserve_one),
+        ("release_expired", "POST /api/products/reservations/release-expired",
+         lambda: product_client.post("/api/products/reservations/release-expired", headers=service_headers), None),
+        ("import_100", "POST /api/products/import",
+         lambda: product_client.post("/api/products/import", content=import_body,
+                                     headers={"X-Admin-Key": "bench-admin-key"}), None),
+    ]
+    check_coverage(product_main.app, benchmarked_routes(product_scenarios), "product-service")
+
+    results = []
+    for name, _, call, setup_each in product_scenarios:
+        result = measure(name, call, args, setup_each=setup_each)
+        result.update(service="product-service", catalog_size=args.catalog_size, cart_size=None)
+        results.append(result)
+
+    cart_scenarios_covered = {
+        "GET /api/health", "POST /api/auth/login", "GET /api/cart", "POST /api/cart/add",
+        "DELETE /api/cart/remove/{product_id}", "DELETE /api/cart/clear", "POST /api/cart/checkout",
+    }
+    check_coverage(cart_main.app, cart_scenarios_covered, "cart-service")
+
+    for cart_size in args.cart_sizes:
+        cart_size = min(cart_size, len(products))
+
+        def refill():
+            seed_cart(setup, user_id, products, cart_size)
+            # Written behind cart-service: don't time a write retried because it started from the cached cart
+            cart_cache.invalidate(user_id)
+
+        refill()
+        in_cart = [product["id"] for product in products[:cart_size]]
+        cart_scenarios = [
+            ("health", lambda: cart_client.get("/api/health"), None),
+            ("login", lambda: cart_client.post("/api/auth/login", json=BENCH_USER), None),
+            ("get_cart", lambda: cart_client.get("/api/cart", headers=headers), None),
+            ("add_existing", lambda: cart_client.post(
+                "/api/cart/add", json={"product_id": rng.choice(in_cart), "quantity": 1}, headers=headers), None),
+            ("remove", lambda: cart_client.delete(
+                "/api/cart/remove/{}".format(rng.choice(in_cart)), headers=headers), refill),
+            ("clear", lambda: cart_client.delete("/api/cart/clear", headers=headers), refill),
+            ("checkout", lambda: cart_client.post("/api/cart/checkout", headers=headers), refill),
+        ]
+        for name, call, setup_each in cart_scenarios:
+            result = measure(name, call, args, setup_each=setup_each)
+            result.update(service="cart-service", catalog_size=args.catalog_size, cart_size=cart_size)
+            results.append(result)
+
+    print(RESULT_MARKER + json.dumps(results))
+
+
+def print_table(results):
+    """Print results as a fixed-width table"""
+    header = "{:<16} {:<14} {:>8} {:>6} {:>6} {:>10} {:>9} {:>9} {:>9}".format(
+        "service", "scenario", "catalog", "cart", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print("{:<16} {:<14} {:>8} {:>6} {:>6} {:>10.1f} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+            r["service"], r["scenario"], r["catalog_size"], r["cart_size"] if r["cart_size"] is not None else "-",
+            r["errors"], r["throughput_rps"], r["p50_ms"], r["p95_ms"], r["p99_ms"]))
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="End-to-end API benchmark suite")
+    parser.add_argument("--catalog-sizes", type=int, nargs="+", default=[100, 1000, 5000],
+                        help="Number of products to seed (one worker process per size)")
+    parser.add_argument("--cart-sizes", type=int, nargs="+", default=[1, 10, 50],
+                        help="Cart line counts for the cart endpoints")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per scenario")
+    parser.add_argument("--max-seconds", type=float, default=30.0, help="Time cap per scenario")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for data and request mix")
+    parser.add_argument("--dynamodb-endpoint", default=None,
+                        help="Use DynamoDB Local at this URL instead of moto")
+    parser.add_argument("--storage-backend", choices=["moto", "memory"], default="moto",
+                        help="Without --dynamodb-endpoint: moto, or the in-memory engine (STORAGE_BACKEND=memory)")
+    parser.add_argument("--products-table", default="bench-products", help="Products table name")
+    parser.add_argument("--carts-table", default="bench-carts", help="Carts table name")
+    parser.add_argument("--reservations-table", default="bench-reservations", help="Stock reservations table name")
+    parser.add_argument("--stock-shards-table", default="bench-stock-shards", help="Sharded stock counters table name")
+    parser.add_argument("--product-read-mode", choices=["http", "direct"], default="http",
+                        help="How cart-service reads products (PRODUCT_READ_MODE)")
+    parser.add_argument("--output", default="api-benchmark.json", help="JSON report path")
+    parser.add_argument("--catalog-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.catalog_size is not None:
+        run_worker(args)
+        return
+
+    results = []
+    for catalog_size in args.catalog_sizes:
+        print("[INFO] Benchmarking with {} products...".format(catalog_size))
+        command = [sys.executable, __file__, "--catalog-size", str(catalog_size)] + sys.argv[1:]
+        worker = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+        if worker.returncode != 0:
+            print("[ERROR] Worker for catalog size {} failed".format(catalog_size))
+            sys.exit(1)
+        for line in worker.stdout.splitlines():
+            if line.startswith(RESULT_MARKER):
+                results.extend(json.loads(line[len(RESULT_MARKER):]))
+
+    print()
+    print_table(results)
+    report = {
+        "generated_at": datetime.utcnow().isoformat(),
+        "backend": args.dynamodb_endpoint or args.storage_backend,
+        "seed": args.seed,
+        "product_read_mode": args.product_read_mode,
+        "requests_per_scenario": args.requests,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print("\n[SUCCESS] Report written to {}".format(args.output))
+
+
+if __name__ == "__main__":
+    main()
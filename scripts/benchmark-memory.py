@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory benchmark for product-service's in-memory product representations
+Builds the same synthetic products (from generate-catalog.py, with numbers
+as Decimal like DynamoDB returns them) as a list of dicts converted by
+ProductDB._convert_decimals and as a ProductStore, and reports the memory
+each one keeps (tracemalloc), build time and the cost of turning a page of
+100 products back into response dicts. Both representations reference the
+same str objects, so their string payload is reported once and added to
+each total.
+
+Examples:
+  python scripts/benchmark-memory.py
+  python scripts/benchmark-memory.py --products 10000 --products 100000 --products 500000
+"""
+
+import gc
+import sys
+import json
+import time
+import argparse
+import importlib.util
+import tracemalloc
+from decimal import Decimal
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+GENERATOR = Path(__file__).resolve().parent / "generate-catalog.py"
+
+PAGE_SIZE = 100
+
+
+def load_generator():
+    """generate-catalog.py as a module (its file name is not importable)"""
+    spec = importlib.util.spec_from_file_location("generate_catalog", GENERATOR)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def dynamodb_items(generator, count, seed):
+    """Products as the boto3 resource returns them: every number is a Decimal"""
+    for product in generator.generate_products(seed, 0, count):
+        product["price"] = Decimal(str(product["price"]))
+        product["stock"] = Decimal(product["stock"])
+        yield product
+
+
+def string_bytes(items):
+    """Size of the distinct str objects referenced by the items"""
+    strings = {id(value): value for item in items for value in item.values() if isinstance(value, str)}
+    return sum(sys.getsizeof(value) for value in strings.values())
+
+
+def measure(build, items):
+    """Bytes kept by build(items) and the seconds it took; returns (result, bytes, seconds)"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build(items)
+    seconds = time.perf_counter() - started
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, seconds
+
+
+def page_ms(rows, count, repeat=200):
+    """Milliseconds to produce one page of response dicts"""
+    started = time.perf_counter()
+    for n in range(repeat):
+        start = (n * PAGE_SIZE) % max(1, count - PAGE_SIZE)
+        rows(start, min(count, start + PAGE_SIZE))
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Compare memory use of dict-based and columnar product lists")
+    parser.add_argument("--products", type=int, action="append",
+                        help="Catalog size (repeatable, default: 100000)")
+    parser.add_argument("--seed", type=int, default=42, help="Synthetic catalog seed")
+    parser.add_argument("--output", default=None, help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from shared.service_loader import load_service_module
+
+    database = load_service_module("product-service", "database")
+    product_store = load_service_module("product-service", "product_store")
+    generator = load_generator()
+    convert = database.ProductDB._convert_decimals
+
+    results = []
+    for count in args.products or [100000]:
+        print("[INFO] {} products...".format(count))
+        items = list(dynamodb_items(generator, count, args.seed))
+        strings = string_bytes(items)
+
+        dicts, dict_bytes, dict_seconds = measure(lambda items: [convert(None, item) for item in items], items)
+        dict_bytes += strings
+        dict_page_ms = page_ms(lambda start, stop: [dict(product) for product in dicts[start:stop]], count)
+        del dicts
+
+        store, store_bytes, store_seconds = measure(product_store.ProductStore, items)
+        store_bytes += strings
+        store_page_ms = page_ms(lambda start, stop: [store.row(index) for index in range(start, stop)], count)
+        del store, items
+
+        result = {
+            "products": count,
+            "string_mb": round(strings / 1e6, 1),
+            "dicts": {"mb": round(dict_bytes / 1e6, 1), "bytes_per_product": round(dict_bytes / count),
+                      "build_seconds": round(dict_seconds, 2), "page_ms": round(dict_page_ms, 3)},
+            "store": {"mb": round(store_bytes / 1e6, 1), "bytes_per_product": round(store_bytes / count),
+                      "build_seconds": round(store_seconds, 2), "page_ms": round(store_page_ms, 3)},
+            "saving": round(1 - store_bytes / dict_bytes, 3),
+        }
+        results.append(result)
+        print("[SUCCESS] dicts {:.1f} MB ({} B/product), store {:.1f} MB ({} B/product): {:.0%} smaller".format(
+            result["dicts"]["mb"], result["dicts"]["bytes_per_product"],
+            result["store"]["mb"], result["store"]["bytes_per_product"], result["saving"]))
+        print("[INFO] both include {:.1f} MB of strings; build {:.2f}s vs {:.2f}s, page of {} {:.3f}ms vs {:.3f}ms".format(
+            result["string_mb"], dict_seconds, store_seconds, PAGE_SIZE, dict_page_ms, store_page_ms))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print("[SUCCESS] Results written to {}".format(args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Startup benchmark harness for the backend services
+Starts fresh interpreters repeatedly and records import-time breakdowns,
+time to first response through the Mangum handler and peak RSS, then
+writes a JSON report that can be compared against a previous run
+"""
+
+import os
+import sys
+import json
+import argparse
+import platform
+import statistics
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+SERVICES = ["product-service", "cart-service"]
+
+# Metrics compared by --compare (lower is better)
+COMPARED_METRICS = ["import_ms", "first_response_ms", "cold_start_ms", "peak_rss_mb"]
+
+# Runs inside the fresh interpreter: import the app, then invoke the Lambda handler once
+CHILD_CODE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+class LambdaContext:
+    function_name = "startup-benchmark"
+    aws_request_id = "startup-benchmark"
+    memory_limit_in_mb = 1024
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+response = app.main.handler(json.loads(sys.argv[1]), LambdaContext())
+finished = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (finished - imported) * 1000,
+    "status_code": response["statusCode"],
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def api_gateway_event(path, method="GET"):
+    """Build a synthetic API Gateway (REST, proxy integration) event"""
+    headers = {"Host": "localhost", "Accept": "application/json", "User-Agent": "startup-benchmark"}
+    return {
+        "resource": "/{proxy+}",
+        "path": path,
+        "httpMethod": method,
+        "headers": headers,
+        "multiValueHeaders": {key: [value] for key, value in headers.items()},
+        "queryStringParameters": None,
+        "multiValueQueryStringParameters": None,
+        "pathParameters": {"proxy": path.lstrip("/")},
+        "stageVariables": None,
+        "requestContext": {
+            "resourcePath": "/{proxy+}",
+            "httpMethod": method,
+            "path": path,
+            "stage": "benchmark",
+            "requestId": "startup-benchmark",
+            "identity": {"sourceIp": "127.0.0.1", "userAgent": "startup-benchmark"},
+        },
+        "body": None,
+        "isBase64Encoded": False,
+    }
+
+
+def parse_importtime(stderr):
+    """Sum -X importtime self times (ms) per top-level package"""
+    totals = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            totals[name.strip().split(".")[0]] += int(self_us) / 1000.0
+    return totals
+
+
+def run_once(service, event, env):
+    """Start one fresh interpreter and return its measurements"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_CODE, json.dumps(event)],
+        cwd=BACKEND_DIR / service,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    process_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError("{} failed to start:\n{}".format(service, result.stderr[-2000:]))
+
+    sample = json.loads(result.stdout.strip().splitlines()[-1])
+    sample["cold_start_ms"] = sample["import_ms"] + sample["first_response_ms"]
+    sample["process_ms"] = process_ms
+    return sample, parse_importtime(result.stderr)
+
+
+def summarize(values):
+    """Summary statistics for a list of samples"""
+    ordered = sorted(values)
+    return {
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "min": ordered[0],
+        "max": ordered[-1],
+    }
+
+
+def benchmark_service(service, args):
+    """Benchmark one service over args.runs fresh interpreters"""
+    env = dict(os.environ)
+    env.setdefault("ENV", "dev")
+    env["PYTHONPATH"] = os.pathsep.join([str(BACKEND_DIR), str(BACKEND_DIR / service)])
+    if not args.no_lambda_env:
+        # Exercise the Lambda init-phase code path
+        env["AWS_LAMBDA_FUNCTION_NAME"] = "startup-benchmark-{}".format(service)
+
+    event = api_gateway_event(args.path)
+    samples = []
+    breakdowns = defaultdict(list)
+    for _ in range(args.runs):
+        sample, breakdown = run_once(service, event, env)
+        samples.append(sample)
+        for package, elapsed in breakdown.items():
+            breakdowns[package].append(elapsed)
+
+    report = {
+        metric: summarize([sample[metric] for sample in samples])
+        for metric in COMPARED_METRICS + ["process_ms"]
+    }
+    report["status_codes"] = sorted({sample["status_code"] for sample in samples})
+    slowest = sorted(
+        ((package, statistics.median(values + [0.0] * (args.runs - len(values))))
+         for package, values in breakdowns.items()),
+        key=lambda entry: entry[1],
+        reverse=True,
+    )
+    report["import_breakdown_ms"] = {package: round(elapsed, 2) for package, elapsed in slowest[:args.top]}
+    return report
+
+
+def compare_reports(current, baseline, tolerance):
+    """Print median deltas against a baseline report; return True on regression"""
+    regressed = False
+    print("\n[INFO] Comparison against baseline (tolerance {}%):".format(tolerance))
+    for service, metrics in current["services"].items():
+        base_metrics = baseline.get("services", {}).get(service)
+        if not base_metrics:
+            print("  {}: no baseline".format(service))
+            continue
+        for metric in COMPARED_METRICS:
+            now = metrics[metric]["median"]
+            before = base_metrics[metric]["median"]
+            change = (now - before) / before * 100 if before else 0.0
+            flag = "REGRESSION" if change > tolerance else "ok"
+            regressed = regressed or change > tolerance
+            print("  {:<16} {:<18} {:>9.1f} -> {:>9.1f} ({:+.1f}%) {}".format(
+                service, metric, before, now, change, flag))
+    return regressed
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark service import time and cold start")
+    parser.add_argument("--services", nargs="+", default=SERVICES, help="Services to benchmark")
+    parser.add_argument("--runs", type=int, default=20, help="Fresh interpreters per service")
+    parser.add_argument("--path", default="/api/health", help="Path requested through the handler")
+    parser.add_argument("--top", type=int, default=15, help="Packages kept in the import breakdown")
+    parser.add_argument("--output", default="startup-report.json", help="JSON report path")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0,
+                        help="Allowed median regression in percent when comparing")
+    parser.add_argument("--no-lambda-env", action="store_true",
+                        help="Don't set AWS_LAMBDA_FUNCTION_NAME in the child interpreters")
+    args = parser.parse_args()
+
+    report = {
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": args.runs,
+        "path": args.path,
+        "services": {},
+    }
+
+    for service in args.services:
+        print("[INFO] Benchmarking {} ({} runs)...".format(service, args.runs))
+        metrics = benchmark_service(service, args)
+        report["services"][service] = metrics
+        print("  import {:.1f}ms, first response {:.1f}ms, cold start {:.1f}ms, peak RSS {:.1f}MB (medians)".format(
+            metrics["import_ms"]["median"],
+            metrics["first_response_ms"]["median"],
+            metrics["cold_start_ms"]["median"],
+            metrics["peak_rss_mb"]["median"],
+        ))
+        for package, elapsed in list(metrics["import_breakdown_ms"].items())[:5]:
+            print("    {:<24} {:>8.1f}ms".format(package, elapsed))
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print("\n[SUCCESS] Report written to {}".format(args.output))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare_reports(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Build a memory-mapped catalog snapshot from the products table
+product-service serves GET /products, GET /products/{id} and /categories
+from the snapshot at CATALOG_SNAPSHOT_PATH and maps a newer one when it
+appears there (the file is replaced with a rename, so running services are
+never shown a partial file). Stock in the snapshot is as of the build;
+reservations still check stock in DynamoDB. Uses the product-service
+configuration (DYNAMODB_ENDPOINT, PRODUCTS_TABLE_NAME, ...) from the
+environment.
+
+Examples:
+  python scripts/build-catalog-snapshot.py --output /srv/catalog/catalog.snap
+  CATALOG_SNAPSHOT_PATH=catalog.snap python scripts/build-catalog-snapshot.py
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Build a catalog snapshot file from the products table")
+    parser.add_argument("--output", default=None,
+                        help="Snapshot file to write (default: CATALOG_SNAPSHOT_PATH, else catalog.snap)")
+    parser.add_argument("--version", type=int, default=None,
+                        help="Snapshot version; services only switch to a higher one (default: current Unix time)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from shared.service_loader import load_service_module
+    from shared.env_config import config
+
+    database = load_service_module("product-service", "database")
+    snapshot = load_service_module("product-service", "snapshot")
+
+    output = args.output or config.CATALOG_SNAPSHOT_PATH or "catalog.snap"
+    version = args.version if args.version is not None else int(time.time())
+
+    print("[INFO] Reading products from {}...".format(config.PRODUCTS_TABLE_NAME))
+    started = time.perf_counter()
+    products = database.ProductDB().get_all_products()
+    read_seconds = time.perf_counter() - started
+
+    size = snapshot.write_snapshot(products, output, version)
+    mapped = snapshot.MappedCatalog(output)
+    if len(mapped) != len(products):
+        print("[ERROR] Snapshot {} holds {} products, expected {}".format(output, len(mapped), len(products)))
+        sys.exit(1)
+    print("[SUCCESS] Snapshot v{} with {} products ({:.1f} MB) written to {} (read {:.1f}s, total {:.1f}s)".format(
+        version, len(products), size / 1e6, output, read_seconds, time.perf_counter() - started))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Import-time budget check for the backend services
+Imports each service's app.main in fresh interpreters and fails when the
+median import time exceeds its budget or a lazily loaded module is imported
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Median cumulative import time of app.main, in milliseconds
+IMPORT_BUDGETS_MS = {
+    "product-service": 1000,
+    "cart-service": 1000,
+}
+
+# Modules that must only be imported on first use, never at startup
+LAZY_MODULES = ["requests", "jose", "numpy"]
+
+
+def measure_import(service, env):
+    """Import app.main once in a fresh interpreter and return (ms, imported modules)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR / service,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError("Importing {} failed:\n{}".format(service, result.stderr[-2000:]))
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    return modules["app.main"] / 1000.0, set(modules)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Check service import times against their budgets")
+    parser.add_argument("--runs", type=int, default=7, help="Fresh interpreters per service")
+    parser.add_argument("--services", nargs="+", default=list(IMPORT_BUDGETS_MS), help="Services to check")
+    args = parser.parse_args()
+
+    failed = False
+    for service in args.services:
+        env = dict(os.environ)
+        env.setdefault("ENV", "dev")
+        env["PYTHONPATH"] = os.pathsep.join([str(BACKEND_DIR), str(BACKEND_DIR / service)])
+
+        timings = []
+        imported = set()
+        for _ in range(args.runs):
+            elapsed_ms, modules = measure_import(service, env)
+            timings.append(elapsed_ms)
+            imported |= modules
+
+        median_ms = statistics.median(timings)
+        budget_ms = IMPORT_BUDGETS_MS[service]
+        eager = [module for module in LAZY_MODULES if module in imported]
+
+        status = "OK" if median_ms <= budget_ms and not eager else "FAIL"
+        print("[{}] {}: median {:.0f}ms (min {:.0f}ms, max {:.0f}ms), budget {}ms".format(
+            status, service, median_ms, min(timings), max(timings), budget_ms))
+        if eager:
+            print("       eagerly imported: {}".format(", ".join(eager)))
+        failed = failed or status == "FAIL"
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic catalog and cart generator for scale testing
+Generates products with skewed category and price distributions and
+realistic description lengths, plus carts of varying sizes that favour
+popular products. Output goes to NDJSON part files (importable with
+scripts/import-products.py) or straight into DynamoDB Local.
+
+Output is deterministic for a given --seed: rows are generated in fixed
+chunks, each with its own random generator, so the worker count only
+changes how fast they are produced. A product's price and category depend
+on (seed, index) alone, so carts agree with the catalog without sharing it.
+
+Examples:
+  python scripts/generate-catalog.py --products 10000000 --carts 1000000 --output-dir data/
+  python scripts/generate-catalog.py --products 100000 --carts 10000 --dynamodb-endpoint http://localhost:8000
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import importlib.util
+import multiprocessing
+from bisect import bisect
+from functools import lru_cache
+from decimal import Decimal
+from itertools import accumulate
+from statistics import NormalDist
+from datetime import datetime, timedelta
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPTS_DIR.parent / "backend"
+
+# Rows per chunk; each chunk is one unit of work and one output part file
+CHUNK_ROWS = 100000
+
+CATEGORIES = ["Electronics", "Books", "Home", "Sports", "Clothing", "Toys", "Beauty", "Garden"]
+CATEGORY_WEIGHTS = [30, 20, 15, 10, 10, 7, 5, 3]
+CUMULATIVE_WEIGHTS = list(accumulate(CATEGORY_WEIGHTS))
+
+NOUNS = {
+    "Electronics": ["Headphones", "Speaker", "Charger", "Monitor", "Keyboard", "Camera", "Router", "Tablet"],
+    "Books": ["Novel", "Cookbook", "Guide", "Anthology", "Biography", "Atlas", "Workbook", "Memoir"],
+    "Home": ["Lamp", "Blanket", "Vase", "Kettle", "Rug", "Shelf", "Pillow", "Clock"],
+    "Sports": ["Shoes", "Yoga Mat", "Dumbbell", "Racket", "Helmet", "Bottle", "Jersey", "Backpack"],
+    "Clothing": ["Jacket", "T-Shirt", "Jeans", "Sweater", "Scarf", "Dress", "Hoodie", "Socks"],
+    "Toys": ["Puzzle", "Robot", "Doll", "Board Game", "Kite", "Blocks", "Plush", "Train Set"],
+    "Beauty": ["Serum", "Lotion", "Palette", "Perfume", "Cleanser", "Brush Set", "Balm", "Mask"],
+    "Garden": ["Planter", "Hose", "Shears", "Seeds", "Lantern", "Trowel", "Bench", "Birdhouse"],
+}
+ADJECTIVES = ["Classic", "Premium", "Compact", "Wireless", "Organic", "Deluxe", "Smart", "Vintage",
+              "Ultra", "Eco", "Portable", "Essential", "Pro", "Handmade", "Modern", "Lightweight"]
+WORDS = ("quality durable design comfortable everyday use perfect gift made from premium materials "
+         "easy to clean lightweight and compact features an ergonomic shape long lasting built for "
+         "performance includes warranty available in several colours great value for home travel "
+         "office outdoor fits most sizes tested by experts crafted with care sustainable sourced "
+         "versatile stylish reliable practical soft strong water resistant fast simple setup").split()
+
+# Prices are log-normal (median ~33, long tail); descriptions are log-normal in word count (median ~40)
+PRICE_MU, PRICE_SIGMA, MAX_PRICE = 3.5, 1.0, 5000.0
+DESCRIPTION_MU, DESCRIPTION_SIGMA, MAX_DESCRIPTION_WORDS = 3.7, 0.6, 400
+OUT_OF_STOCK_RATE = 0.08
+
+# Descriptions are windows into one shuffled text of this many words (picking words one by one is the bottleneck)
+CORPUS_WORDS = 100000
+
+# Cart timestamps are spread over the 30 days before this date
+CART_EPOCH = datetime(2024, 1, 1)
+
+_normal = NormalDist()
+
+
+def product_id(index):
+    return "gen-{:08d}".format(index)
+
+
+def user_id(index):
+    return "gen-user-{:08d}".format(index)
+
+
+@lru_cache(maxsize=4)
+def description_corpus(seed):
+    """(text, word start offsets) that descriptions are sliced from"""
+    rng = random.Random("{}:corpus".format(seed))
+    words = rng.choices(WORDS, k=CORPUS_WORDS)
+    starts = list(accumulate((len(word) + 1 for word in words), initial=0))
+    return " ".join(words), starts
+
+
+def random_uuid(rng):
+    """Version 4 UUID string from a seeded generator"""
+    value = "{:032x}".format(rng.getrandbits(128))
+    return "{}-{}-4{}-{}{}-{}".format(value[:8], value[8:12], value[13:16], "89ab"[int(value[16], 16) % 4],
+                                     value[17:20], value[20:])
+
+
+def _unit(seed, index, salt):
+    """Uniform value in (0, 1) that depends only on (seed, index, salt)"""
+    digest = hashlib.blake2b("{}:{}:{}".format(seed, salt, index).encode(), digest_size=8).digest()
+    return (int.from_bytes(digest, "big") + 0.5) / 2.0 ** 64
+
+
+@lru_cache(maxsize=65536)
+def product_price(seed, index):
+    """Log-normal price of product `index`"""
+    price = math.exp(PRICE_MU + PRICE_SIGMA * _normal.inv_cdf(_unit(seed, index, "price")))
+    return round(min(price, MAX_PRICE), 2)
+
+
+def product_category(seed, index):
+    """Category of product `index`, weighted by CATEGORY_WEIGHTS"""
+    return CATEGORIES[bisect(CUMULATIVE_WEIGHTS, _unit(seed, index, "category") * CUMULATIVE_WEIGHTS[-1])]
+
+
+def generate_products(seed, start, stop):
+    """Products start..stop-1 as plain dicts (price as float)"""
+    rng = random.Random("{}:products:{}".format(seed, start))
+    text, starts = description_corpus(seed)
+    for index in range(start, stop):
+        category = product_category(seed, index)
+        words = min(MAX_DESCRIPTION_WORDS, max(5, int(rng.lognormvariate(DESCRIPTION_MU, DESCRIPTION_SIGMA))))
+        first = rng.randrange(CORPUS_WORDS - words)
+        description = text[starts[first]:starts[first + words] - 1].capitalize() + "."
+        if rng.random() < OUT_OF_STOCK_RATE:
+            stock = 0
+        else:
+            stock = min(10000, int(rng.lognormvariate(3.0, 1.2)) + 1)
+        yield {
+            "id": product_id(index),
+            "name": "{} {} {}".format(rng.choice(ADJECTIVES), rng.choice(NOUNS[category]), index),
+            "description": description,
+            "price": product_price(seed, index),
+            "category": category,
+            "image_url": "https://example.com/images/{}.jpg".format(product_id(index)),
+            "stock": stock,
+        }
+
+
+def generate_carts(seed, start, stop, product_count, mean_size, max_size):
+    """Carts of users start..stop-1; sizes are geometric and popular products come up more often"""
+    rng = random.Random("{}:carts:{}".format(seed, start))
+    for index in range(start, stop):
+        size = min(max_size, 1 + int(rng.expovariate(1.0 / max(mean_size - 0.5, 0.1))))
+        products = {}
+        while len(products) < min(size, product_count):
+            # Power-law popularity: low indexes are the best sellers
+            products.setdefault(int(product_count * rng.random() ** 3), None)
+        created_at = CART_EPOCH - timedelta(seconds=rng.randrange(30 * 24 * 3600))
+        updated_at = created_at + timedelta(seconds=rng.randrange(3600))
+        yield {
+            "user_id": user_id(index),
+            "id": random_uuid(rng),
+            "items": [
+                {
+                    "id": random_uuid(rng),
+                    "product_id": product_id(product),
+                    "quantity": 1 if rng.random() < 0.8 else rng.randint(2, 5),
+                    "price": product_price(seed, product),
+                }
+                for product in products
+            ],
+            "created_at": created_at.isoformat(),
+            "updated_at": updated_at.isoformat(),
+        }
+
+
+def to_dynamodb(value):
+    """Floats become Decimals, as DynamoDB requires"""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {key: to_dynamodb(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_dynamodb(item) for item in value]
+    return value
+
+
+def write_to_dynamodb(table_name, rows, threads):
+    """Write rows with parallel BatchWriteItem calls (shared retry/backoff helper)"""
+    from shared.dynamodb_utils import BATCH_WRITE_MAX_ITEMS, batch_write_items
+
+    written = 0
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = set()
+        batch = []
+        for row in rows:
+            batch.append(to_dynamodb(row))
+            if len(batch) == BATCH_WRITE_MAX_ITEMS:
+                if len(pending) >= 2 * threads:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    written += sum(future.result() for future in done)
+                pending.add(executor.submit(batch_write_items, table_name, batch))
+                batch = []
+        if batch:
+            pending.add(executor.submit(batch_write_items, table_name, batch))
+        written += sum(future.result() for future in wait(pending).done)
+    return written
+
+
+def run_chunk(task):
+    """Generate one chunk and write it out (runs in a worker process); returns (kind, rows)"""
+    kind, start, stop, options = task
+    if kind == "products":
+        rows = generate_products(options["seed"], start, stop)
+    else:
+        rows = generate_carts(options["seed"], start, stop, options["products"],
+                              options["cart_size_mean"], options["cart_size_max"])
+
+    if options["output_dir"]:
+        path = Path(options["output_dir"]) / "{}-{:05d}.ndjson".format(kind, start // CHUNK_ROWS)
+        with open(path, "w") as output:
+            output.write("".join(json.dumps(row) + "\n" for row in rows))
+        return kind, stop - start
+
+    table_name = options["products_table"] if kind == "products" else options["carts_table"]
+    return kind, write_to_dynamodb(table_name, rows, options["threads"])
+
+
+def init_worker(options):
+    """Point each worker process at the DynamoDB endpoint and tables"""
+    if options["dynamodb_endpoint"]:
+        os.environ.update({
+            # Outside ENV=local the settings drop DYNAMODB_ENDPOINT and would write to AWS
+            "ENV": "local",
+            "STORAGE_BACKEND": "dynamodb",
+            "DYNAMODB_ENDPOINT": options["dynamodb_endpoint"],
+            "PRODUCTS_TABLE_NAME": options["products_table"],
+            "CARTS_TABLE_NAME": options["carts_table"],
+        })
+        sys.path.insert(0, str(BACKEND_DIR))
+
+
+def create_tables(options):
+    """Create the products and carts tables through scripts/setup-dynamodb.py"""
+    spec = importlib.util.spec_from_file_location("setup_dynamodb", SCRIPTS_DIR / "setup-dynamodb.py")
+    setup = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(setup)
+    setup.DYNAMODB_ENDPOINT = options["dynamodb_endpoint"]
+    setup.PRODUCTS_TABLE = options["products_table"]
+    setup.CARTS_TABLE = options["carts_table"]
+    if not (setup.create_products_table() and setup.create_carts_table()):
+        raise RuntimeError("Failed to create tables")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic catalog and carts for scale testing")
+    parser.add_argument("--products", type=int, default=100000, help="Number of products")
+    parser.add_argument("--carts", type=int, default=0, help="Number of carts (one per synthetic user)")
+    parser.add_argument("--cart-size-mean", type=float, default=3.0, help="Mean number of lines per cart")
+    parser.add_argument("--cart-size-max", type=int, default=50, help="Maximum number of lines per cart")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (same seed, same data)")
+    parser.add_argument("--output-dir", help="Write NDJSON part files to this directory")
+    parser.add_argument("--dynamodb-endpoint", help="Write straight to DynamoDB Local at this URL")
+    parser.add_argument("--products-table", default="ecom-products", help="Products table name")
+    parser.add_argument("--carts-table", default="ecom-carts", help="Carts table name")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="Write threads per process (DynamoDB output)")
+    args = parser.parse_args()
+
+    if bool(args.output_dir) == bool(args.dynamodb_endpoint):
+        parser.error("exactly one of --output-dir or --dynamodb-endpoint is required")
+    if args.carts and not args.products:
+        parser.error("--carts needs --products to pick cart lines from")
+
+    options = {
+        "seed": args.seed,
+        "products": args.products,
+        "cart_size_mean": args.cart_size_mean,
+        "cart_size_max": args.cart_size_max,
+        "output_dir": args.output_dir,
+        "dynamodb_endpoint": args.dynamodb_endpoint,
+        "products_table": args.products_table,
+        "carts_table": args.carts_table,
+        "threads": args.threads,
+    }
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    else:
+        create_tables(options)
+
+    tasks = [("products", start, min(start + CHUNK_ROWS, args.products), options)
+             for start in range(0, args.products, CHUNK_ROWS)]
+    tasks += [("carts", start, min(start + CHUNK_ROWS, args.carts), options)
+              for start in range(0, args.carts, CHUNK_ROWS)]
+
+    print("[INFO] Generating {} products and {} carts with {} processes (seed {})".format(
+        args.products, args.carts, args.processes, args.seed))
+    started = time.perf_counter()
+    done = {"products": 0, "carts": 0}
+    with multiprocessing.Pool(args.processes, initializer=init_worker, initargs=(options,)) as pool:
+        for kind, rows in pool.imap_unordered(run_chunk, tasks):
+            done[kind] += rows
+            elapsed = time.perf_counter() - started
+            print("[INFO] {} products, {} carts ({:.0f} rows/s)".format(
+                done["products"], done["carts"], (done["products"] + done["carts"]) / elapsed))
+
+    elapsed = time.perf_counter() - started
+    target = args.output_dir or "{} / {} at {}".format(args.products_table, args.carts_table, args.dynamodb_endpoint)
+    print("[SUCCESS] Wrote {} products and {} carts to {} in {:.1f}s".format(
+        done["products"], done["carts"], target, elapsed))
+
+
+if __name__ == "__main__":
+    main()
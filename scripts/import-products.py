@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bulk import products from CSV or NDJSON files
+Rows are validated against the product-service ProductCreate model and
+written with parallel BatchWriteItem workers. Uses the product-service
+configuration (DYNAMODB_ENDPOINT, PRODUCTS_TABLE_NAME, ...) from the
+environment. Rows with an "id" replace that product; rows without one get
+a new id.
+
+Examples:
+  python scripts/import-products.py products.ndjson
+  python scripts/import-products.py catalog.csv --workers 32
+  cat products.ndjson | python scripts/import-products.py - --format ndjson
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def open_input(path, fmt):
+    """Open a file (or stdin for '-') as text lines; returns (lines, format)"""
+    if fmt is None:
+        fmt = "csv" if path.lower().endswith(".csv") else "ndjson"
+    if path == "-":
+        return sys.stdin, fmt
+    return open(path, "r", encoding="utf-8-sig", newline=""), fmt
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Bulk import products into DynamoDB")
+    parser.add_argument("files", nargs="+", help="CSV or NDJSON files ('-' for stdin)")
+    parser.add_argument("--format", choices=["ndjson", "csv"],
+                        help="Input format (default: from the file extension, else ndjson)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parallel BatchWriteItem workers (default: IMPORT_WORKERS)")
+    parser.add_argument("--table", default=None, help="Products table name (default: PRODUCTS_TABLE_NAME)")
+    parser.add_argument("--progress-every", type=int, default=10000, help="Print progress every N imported rows")
+    parser.add_argument("--report", default=None, help="Write the import summaries to this JSON file")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from shared.service_loader import load_service_module
+
+    bulk_import = load_service_module("product-service", "bulk_import")
+
+    def progress(summary):
+        print("[INFO] {} rows imported, {} invalid ({:.0f} rows/s)".format(
+            summary["imported"], summary["invalid"], summary["rows_per_second"]))
+
+    summaries = {}
+    failed = False
+    for path in args.files:
+        lines, fmt = open_input(path, args.format)
+        print("[INFO] Importing {} ({})...".format(path, fmt))
+        importer = bulk_import.ProductImporter(
+            workers=args.workers, table_name=args.table,
+            progress=progress, progress_every=args.progress_every
+        )
+        try:
+            summary = importer.run(lines, fmt)
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+        summaries[path] = summary
+
+        for error in summary["errors"]:
+            print("[WARNING] Row {}: {}".format(error["row"], error["error"]))
+        if summary["invalid"] > len(summary["errors"]):
+            print("[WARNING] ... and {} more invalid rows".format(summary["invalid"] - len(summary["errors"])))
+        if summary["error"]:
+            print("[ERROR] Import of {} aborted: {}".format(path, summary["error"]))
+            failed = True
+        else:
+            print("[SUCCESS] Imported {} of {} rows from {} in {:.1f}s ({:.0f} rows/s)".format(
+                summary["imported"], summary["rows"], path, summary["seconds"], summary["rows_per_second"]))
+
+    if args.report:
+        with open(args.report, "w") as report:
+            json.dump(summaries, report, indent=2)
+        print("[SUCCESS] Report written to {}".format(args.report))
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Async load generator that simulates shopper sessions
+Each simulated user browses /api/products by category and page, opens
+product details, logs in through /api/auth/login and adds/removes cart
+items. Users arrive as a Poisson process; the traffic mix and arrival rate
+are configurable. Reports latency histograms and error rates per endpoint.
+
+Targets either a running stack (e.g. docker-compose: --product-url
+http://localhost:8001 --cart-url http://localhost:8002) or both apps
+loaded in-process (--in-process), optionally backed by moto (--moto).
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import logging
+import argparse
+import threading
+import importlib.util
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPTS_DIR.parent / "backend"
+
+# Mock accounts accepted by cart-service in local auth mode
+USERS = [
+    {"username": "user@example.com", "password": "user123"},
+    {"username": "admin@example.com", "password": "admin123"},
+]
+
+DEFAULT_MIX = "browse=40,detail=30,add=12,remove=6,cart=12"
+
+# Upper bounds (ms) of the latency histogram buckets
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+class EndpointStats:
+    """Latencies and outcomes for one endpoint"""
+
+    def __init__(self):
+        self.latencies = []
+        self.server_errors = 0
+        self.client_errors = 0
+        self.failures = 0
+
+    def record(self, elapsed_ms, status_code):
+        self.latencies.append(elapsed_ms)
+        if status_code is None:
+            self.failures += 1
+        elif status_code >= 500:
+            self.server_errors += 1
+        elif status_code >= 400:
+            self.client_errors += 1
+
+    def histogram(self):
+        counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        for latency in self.latencies:
+            for index, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+                if latency <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return counts
+
+    def summary(self):
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+
+        def pct(p):
+            return ordered[min(count - 1, int(p / 100.0 * count))] if count else 0.0
+
+        return {
+            "requests": count,
+            "error_rate": (self.server_errors + self.failures) / count if count else 0.0,
+            "server_errors": self.server_errors,
+            "client_errors": self.client_errors,
+            "failures": self.failures,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "max_ms": ordered[-1] if count else 0.0,
+            "histogram": dict(zip(["<={}ms".format(b) for b in HISTOGRAM_BOUNDS_MS] + ["inf"], self.histogram())),
+        }
+
+
+class LoadTest:
+    """Runs simulated shopper sessions against product and cart clients"""
+
+    def __init__(self, product_client, cart_client, args):
+        self.product = product_client
+        self.cart = cart_client
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.stats = defaultdict(EndpointStats)
+        self.mix = parse_mix(args.mix)
+        self.catalog = []
+        self.categories = []
+        self.active_users = 0
+        self.completed_users = 0
+
+    async def call(self, endpoint, client, method, url, **kwargs):
+        """Issue one request and record it under its endpoint name"""
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status_code = response.status_code
+        except httpx.HTTPError:
+            response, status_code = None, None
+        self.stats[endpoint].record((time.perf_counter() - started) * 1000, status_code)
+        return response
+
+    async def load_catalog(self):
+        """Fetch product ids and categories used to drive the sessions"""
+        response = await self.product.get("/api/products", params={"limit": 100})
+        response.raise_for_status()
+        self.catalog = [product["id"] for product in response.json()["products"]]
+        response = await self.product.get("/api/categories")
+        response.raise_for_status()
+        self.categories = response.json()["categories"]
+        if not self.catalog:
+            raise RuntimeError("The catalog is empty; seed it first (make setup-dynamodb)")
+
+    async def session(self, user_number):
+        """One shopper: browse, open details, log in, add and remove items"""
+        rng = random.Random(self.args.seed * 1000003 + user_number)
+        token = None
+        in_cart = []
+        self.active_users += 1
+        try:
+            actions = max(1, int(rng.expovariate(1.0 / self.args.actions_per_user)))
+            for _ in range(actions):
+                action = rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+
+                if action == "browse":
+                    params = {"limit": rng.choice([10, 20, 50]), "offset": rng.choice([0, 0, 20, 40])}
+                    if self.categories and rng.random() < 0.7:
+                        params["category"] = rng.choice(self.categories)
+                    await self.call("GET /api/products", self.product, "GET", "/api/products", params=params)
+
+                elif action == "detail":
+                    product_id = rng.choice(self.catalog)
+                    await self.call("GET /api/products/{id}", self.product, "GET", "/api/products/{}".format(product_id))
+
+                else:
+                    if token is None:
+                        user = USERS[user_number % len(USERS)]
+                        response = await self.call("POST /api/auth/login", self.cart, "POST", "/api/auth/login", json=user)
+                        if response is None or response.status_code != 200:
+                            continue
+                        token = response.json()["access_token"]
+                    headers = {"Authorization": "Bearer {}".format(token)}
+
+                    if action == "add":
+                        product_id = rng.choice(self.catalog)
+                        response = await self.call("POST /api/cart/add", self.cart, "POST", "/api/cart/add",
+                                                   json={"product_id": product_id, "quantity": 1}, headers=headers)
+                        if response is not None and response.status_code == 200:
+                            in_cart.append(product_id)
+                    elif action == "remove" and in_cart:
+                        product_id = in_cart.pop(rng.randrange(len(in_cart)))
+                        await self.call("DELETE /api/cart/remove/{id}", self.cart, "DELETE",
+                                        "/api/cart/remove/{}".format(product_id), headers=headers)
+                    else:
+                        await self.call("GET /api/cart", self.cart, "GET", "/api/cart", headers=headers)
+
+                await asyncio.sleep(rng.expovariate(1.0 / self.args.think_time) if self.args.think_time > 0 else 0)
+        finally:
+            self.active_users -= 1
+            self.completed_users += 1
+
+    async def run(self):
+        """Start users as a Poisson arrival process and wait for all sessions"""
+        await self.load_catalog()
+        started = time.monotonic()
+        tasks = []
+        reporter = asyncio.create_task(self.report_progress(started))
+
+        for user_number in range(self.args.users):
+            tasks.append(asyncio.create_task(self.session(user_number)))
+            await asyncio.sleep(self.rng.expovariate(self.args.arrival_rate))
+            if self.args.duration and time.monotonic() - started > self.args.duration:
+                break
+
+        await asyncio.gather(*tasks)
+        reporter.cancel()
+        return time.monotonic() - started
+
+    async def report_progress(self, started):
+        while True:
+            await asyncio.sleep(5)
+            total = sum(len(s.latencies) for s in self.stats.values())
+            print("[INFO] {:>6.0f}s  active users {:>5}  completed {:>6}  requests {:>8}".format(
+                time.monotonic() - started, self.active_users, self.completed_users, total))
+
+
+def parse_mix(text):
+    """Parse 'browse=40,detail=30,...' into a weights dict"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("browse", "detail", "add", "remove", "cart"):
+            raise ValueError("Unknown action in traffic mix: {}".format(name))
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def start_server(app):
+    """Serve an ASGI app on a free loopback port in a background thread"""
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="product-service", daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("product-service did not start")
+        time.sleep(0.01)
+    return "http://127.0.0.1:{}".format(port)
+
+
+def load_in_process_apps(args):
+    """Load both services in this process; returns (product_app, cart_app)"""
+    if args.moto:
+        os.environ.update({
+            "ENV": "dev",
+            "AWS_DEFAULT_REGION": "us-west-2",
+            "AWS_ACCESS_KEY_ID": "dummy",
+            "AWS_SECRET_ACCESS_KEY": "dummy",
+        })
+        from moto import mock_aws
+        mock_aws().start()
+
+        spec = importlib.util.spec_from_file_location("setup_dynamodb", SCRIPTS_DIR / "setup-dynamodb.py")
+        setup = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(setup)
+        setup.DYNAMODB_ENDPOINT = None
+        if not (setup.create_products_table() and setup.create_carts_table()
+                and setup.create_reservations_table() and setup.create_stock_shards_table()
+                and setup.init_sample_products()):
+            raise RuntimeError("Failed to seed moto tables")
+
+    # cart-service authenticates its reservation calls to product-service with this key
+    os.environ["SERVICE_API_KEY"] = "load-test-service-key"
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from shared.service_loader import load_service_module
+
+    product_app = load_service_module("product-service").app
+    # cart-service validates products over HTTP, so product-service also listens on loopback
+    os.environ["PRODUCT_SERVICE_URL"] = start_server(product_app) + "/api"
+    cart_app = load_service_module("cart-service").app
+    logging.getLogger().setLevel(logging.WARNING)
+    return product_app, cart_app
+
+
+def print_report(stats, elapsed):
+    """Print per-endpoint latency and error summaries"""
+    print()
+    header = "{:<30} {:>8} {:>8} {:>8} {:>9} {:>9} {:>9} {:>9}".format(
+        "endpoint", "requests", "req/s", "errors", "p50 ms", "p95 ms", "p99 ms", "max ms")
+    print(header)
+    print("-" * len(header))
+    for endpoint in sorted(stats):
+        s = stats[endpoint].summary()
+        print("{:<30} {:>8} {:>8.1f} {:>7.2f}% {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f}".format(
+            endpoint, s["requests"], s["requests"] / elapsed, s["error_rate"] * 100,
+            s["p50_ms"], s["p95_ms"], s["p99_ms"], s["max_ms"]))
+
+    print("\nLatency histograms (ms):")
+    labels = ["<={}".format(b) for b in HISTOGRAM_BOUNDS_MS] + [">{}".format(HISTOGRAM_BOUNDS_MS[-1])]
+    for endpoint in sorted(stats):
+        counts = stats[endpoint].histogram()
+        total = sum(counts) or 1
+        print("  {}".format(endpoint))
+        for label, count in zip(labels, counts):
+            if count:
+                print("    {:>8} {:>8} {}".format(label, count, "#" * max(1, int(40 * count / total))))
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    timeout = httpx.Timeout(args.timeout)
+
+    if args.in_process:
+        product_app, cart_app = load_in_process_apps(args)
+        product_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=product_app),
+                                           base_url="http://product-service", timeout=timeout)
+        cart_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=cart_app),
+                                        base_url="http://cart-service", timeout=timeout)
+    else:
+        product_client = httpx.AsyncClient(base_url=args.product_url, limits=limits, timeout=timeout)
+        cart_client = httpx.AsyncClient(base_url=args.cart_url, limits=limits, timeout=timeout)
+
+    async with product_client, cart_client:
+        load_test = LoadTest(product_client, cart_client, args)
+        print("[INFO] Starting {} users at {}/s (mix: {})".format(args.users, args.arrival_rate, args.mix))
+        elapsed = await load_test.run()
+
+    print_report(load_test.stats, elapsed)
+    if args.output:
+        report = {
+            "generated_at": datetime.utcnow().isoformat(),
+            "target": "in-process" if args.in_process else {"product": args.product_url, "cart": args.cart_url},
+            "users": args.users,
+            "arrival_rate": args.arrival_rate,
+            "mix": parse_mix(args.mix),
+            "elapsed_seconds": elapsed,
+            "endpoints": {endpoint: stats.summary() for endpoint, stats in load_test.stats.items()},
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print("\n[SUCCESS] Report written to {}".format(args.output))
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Simulated shopper load test")
+    parser.add_argument("--product-url", default=os.getenv("PRODUCT_URL", "http://localhost:8001"),
+                        help="Product service base URL")
+    parser.add_argument("--cart-url", default=os.getenv("CART_URL", "http://localhost:8002"),
+                        help="Cart service base URL")
+    parser.add_argument("--in-process", action="store_true", help="Load both apps in this process")
+    parser.add_argument("--moto", action="store_true", help="With --in-process, back the apps with moto")
+    parser.add_argument("--users", type=int, default=1000, help="Total simulated users")
+    parser.add_argument("--arrival-rate", type=float, default=50.0, help="New users per second")
+    parser.add_argument("--duration", type=float, default=0, help="Stop starting users after N seconds")
+    parser.add_argument("--actions-per-user", type=float, default=8.0, help="Mean actions per session")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean seconds between actions")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Action weights, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--max-connections", type=int, default=500, help="HTTP connection pool size")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--output", help="Optional JSON report path")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
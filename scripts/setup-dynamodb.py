@@ -21,6 +21,8 @@ AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY", "dummy")
 # Table names
 PRODUCTS_TABLE = "ecom-products"
 CARTS_TABLE = "ecom-carts"
+RESERVATIONS_TABLE = "ecom-reservations"
+STOCK_SHARDS_TABLE = "ecom-stock-shards"
 
 def get_dynamodb_client():
     """Get DynamoDB client"""
@@ -134,6 +136,106 @@ def create_carts_table():
             print("[ERROR] Error creating {} table: {}".format(CARTS_TABLE, e))
             return False
 
+def create_reservations_table():
+    """Create stock reservations table"""
+    dynamodb = get_dynamodb_client()
+    
+    try:
+        response = dynamodb.create_table(
+            TableName=RESERVATIONS_TABLE,
+            KeySchema=[
+                {
+                    'AttributeName': 'reservation_id',
+                    'KeyType': 'HASH'
+                }
+            ],
+            AttributeDefinitions=[
+                {
+                    'AttributeName': 'reservation_id',
+                    'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 'product_id',
+                    'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 'expires_at',
+                    'AttributeType': 'N'
+                }
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    'IndexName': 'product-expiry-index',
+                    'KeySchema': [
+                        {
+                            'AttributeName': 'product_id',
+                            'KeyType': 'HASH'
+                        },
+                        {
+                            'AttributeName': 'expires_at',
+                            'KeyType': 'RANGE'
+                        }
+                    ],
+                    'Projection': {
+                        'ProjectionType': 'KEYS_ONLY'
+                    }
+                }
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        
+        # Wait for table to be active
+        waiter = dynamodb.get_waiter('table_exists')
+        waiter.wait(TableName=RESERVATIONS_TABLE)
+        
+        print("[SUCCESS] Created {} table".format(RESERVATIONS_TABLE))
+        return True
+        
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ResourceInUseException':
+            print("[WARNING] {} table already exists".format(RESERVATIONS_TABLE))
+            return True
+        else:
+            print("[ERROR] Error creating {} table: {}".format(RESERVATIONS_TABLE, e))
+            return False
+
+def create_stock_shards_table():
+    """Create sharded stock counters table"""
+    dynamodb = get_dynamodb_client()
+    
+    try:
+        response = dynamodb.create_table(
+            TableName=STOCK_SHARDS_TABLE,
+            KeySchema=[
+                {
+                    'AttributeName': 'shard_id',
+                    'KeyType': 'HASH'
+                }
+            ],
+            AttributeDefinitions=[
+                {
+                    'AttributeName': 'shard_id',
+                    'AttributeType': 'S'
+                }
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        
+        # Wait for table to be active
+        waiter = dynamodb.get_waiter('table_exists')
+        waiter.wait(TableName=STOCK_SHARDS_TABLE)
+        
+        print("[SUCCESS] Created {} table".format(STOCK_SHARDS_TABLE))
+        return True
+        
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ResourceInUseException':
+            print("[WARNING] {} table already exists".format(STOCK_SHARDS_TABLE))
+            return True
+        else:
+            print("[ERROR] Error creating {} table: {}".format(STOCK_SHARDS_TABLE, e))
+            return False
+
 def init_sample_products():
     """Initialize sample product data"""
     dynamodb = get_dynamodb_resource()
@@ -256,8 +358,10 @@ def main():
     print("\n[INFO] Creating tables...")
     products_success = create_products_table()
     carts_success = create_carts_table()
+    reservations_success = create_reservations_table()
+    stock_shards_success = create_stock_shards_table()
     
-    if not (products_success and carts_success):
+    if not (products_success and carts_success and reservations_success and stock_shards_success):
         print("[ERROR] Failed to create some tables")
         sys.exit(1)
     
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Turn sharded stock counters on or off for hot products
+A sharded product keeps its stock in N shard items so concurrent
+reservations spread over N partitions instead of queuing on one item.
+Uses the product-service configuration (DYNAMODB_ENDPOINT,
+PRODUCTS_TABLE_NAME, STOCK_SHARDS_TABLE_NAME, ...) from the environment.
+
+Examples:
+  python scripts/shard-stock.py --product-id 1 --shards 8
+  python scripts/shard-stock.py --product-id 1 --rebalance
+  python scripts/shard-stock.py --product-id 1 --shards 0
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Each shard is one item in a transaction, so enabling sharding is bounded by its size
+MAX_SHARDS = 64
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Enable, disable or rebalance sharded stock counters")
+    parser.add_argument("--product-id", required=True, action="append",
+                        help="Product to change (repeatable)")
+    parser.add_argument("--shards", type=int,
+                        help="Number of stock shards (0 folds the shards back into the product)")
+    parser.add_argument("--rebalance", action="store_true",
+                        help="Even out the shards of already sharded products")
+    args = parser.parse_args()
+
+    if args.shards is None and not args.rebalance:
+        parser.error("one of --shards or --rebalance is required")
+    if args.shards is not None and not 0 <= args.shards <= MAX_SHARDS:
+        parser.error("--shards must be between 0 and {}".format(MAX_SHARDS))
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from shared.service_loader import load_service_module
+    from shared.dynamodb_utils import get_dynamodb_resource
+    from shared.env_config import config
+
+    stock = load_service_module("product-service", "stock")
+    products = get_dynamodb_resource().Table(config.PRODUCTS_TABLE_NAME)
+
+    failed = False
+    for product_id in args.product_id:
+        product = products.get_item(Key={"id": product_id}).get("Item")
+        if product is None:
+            print("[ERROR] Product {} not found".format(product_id))
+            failed = True
+            continue
+        current = int(product.get("stock_shards", 0))
+
+        if args.shards is not None and args.shards != current:
+            if current:
+                # Change the shard count by folding the shards back first
+                if not stock.disable_sharding(product_id):
+                    print("[ERROR] Stock of product {} changed while unsharding, try again".format(product_id))
+                    failed = True
+                    continue
+                print("[INFO] Folded {} shards back into product {}".format(current, product_id))
+            if args.shards and not stock.enable_sharding(product_id, args.shards):
+                print("[ERROR] Stock of product {} changed while sharding, try again".format(product_id))
+                failed = True
+                continue
+            current = args.shards
+
+        if args.rebalance and current:
+            if not stock.ShardedStock(product_id, current).rebalance():
+                print("[ERROR] Stock of product {} changed while rebalancing, try again".format(product_id))
+                failed = True
+                continue
+
+        if current:
+            levels = stock.ShardedStock(product_id, current).read()
+            print("[SUCCESS] Product {}: {} units in {} shards {}".format(
+                product_id, sum(levels.values()), current, [levels.get(n, 0) for n in range(current)]))
+        else:
+            product = products.get_item(Key={"id": product_id}).get("Item")
+            print("[SUCCESS] Product {}: {} units, not sharded".format(product_id, int(product.get("stock", 0))))
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Export DynamoDB tables to compressed NDJSON and restore them
+Export runs a parallel scan with one thread per segment; items go straight
+from DynamoDB's typed wire format to JSON text (numbers are copied verbatim,
+sets become lists, binary becomes base64) into gzip part files of at most
+--chunk-items items. manifest.json is written last and lists every part
+file, so an export without one is incomplete. Restore reads the parts back
+with parallel BatchWriteItem writers. Uses the service configuration
+(DYNAMODB_ENDPOINT, PRODUCTS_TABLE_NAME, CARTS_TABLE_NAME, ...) from the
+environment.
+
+A scan is not a point-in-time snapshot: items written during the export
+may or may not be in it.
+
+Examples:
+  python scripts/table-backup.py export --segments 16
+  python scripts/table-backup.py export ecom-products --output-dir exports
+  python scripts/table-backup.py restore exports/ecom-products-20250101T000000Z --create-table
+"""
+
+import sys
+import json
+import gzip
+import time
+import base64
+import argparse
+from json.encoder import encode_basestring_ascii as encode_string
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def encode_value(value):
+    """JSON text for one typed attribute value ({"S": ...}, {"N": ...}, ...)"""
+    (kind, data), = value.items()
+    if kind == "S":
+        return encode_string(data)
+    if kind == "N":
+        return data
+    if kind == "M":
+        return encode_item(data)
+    if kind == "L":
+        return "[" + ",".join(map(encode_value, data)) + "]"
+    if kind == "BOOL":
+        return "true" if data else "false"
+    if kind == "NULL":
+        return "null"
+    if kind == "SS":
+        return "[" + ",".join(map(encode_string, data)) + "]"
+    if kind == "NS":
+        return "[" + ",".join(data) + "]"
+    if kind == "B":
+        return encode_string(base64.b64encode(data).decode("ascii"))
+    if kind == "BS":
+        return "[" + ",".join(encode_string(base64.b64encode(b).decode("ascii")) for b in data) + "]"
+    raise ValueError("Unsupported attribute type {}".format(kind))
+
+
+def encode_item(item):
+    """JSON object text for one typed item"""
+    return "{" + ",".join(encode_string(name) + ":" + encode_value(value) for name, value in item.items()) + "}"
+
+
+def utc_stamp():
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def table_schema(table_name):
+    """Key schema, attribute definitions and GSIs, in create_table form"""
+    from shared.dynamodb_utils import get_dynamodb_client
+
+    table = get_dynamodb_client().describe_table(TableName=table_name)["Table"]
+    return {
+        "key_schema": table["KeySchema"],
+        "attribute_definitions": table["AttributeDefinitions"],
+        "global_secondary_indexes": [
+            {"IndexName": index["IndexName"], "KeySchema": index["KeySchema"], "Projection": index["Projection"]}
+            for index in table.get("GlobalSecondaryIndexes", [])
+        ],
+    }
+
+
+def export_segment(table_name, segment, segments, directory, chunk_items, compress_level):
+    """Scan one segment into gzip part files; returns their manifest entries"""
+    from shared.dynamodb_utils import scan_segment
+
+    files = []
+    part = None
+    for page in scan_segment(table_name, segment, segments):
+        start = 0
+        while start < len(page):
+            if part is None:
+                name = "{}-{:04d}-{:04d}.ndjson.gz".format(table_name, segment, len(files))
+                part = {"name": name, "segment": segment, "items": 0}
+                stream = gzip.open(directory / name, "wb", compresslevel=compress_level)
+            items = page[start:start + chunk_items - part["items"]]
+            stream.write("".join(encode_item(item) + "\n" for item in items).encode("utf-8"))
+            part["items"] += len(items)
+            start += len(items)
+            if part["items"] >= chunk_items:
+                stream.close()
+                part["bytes"] = (directory / part["name"]).stat().st_size
+                files.append(part)
+                part = None
+
+    if part is not None:
+        stream.close()
+        part["bytes"] = (directory / part["name"]).stat().st_size
+        files.append(part)
+    return files
+
+
+def export_table(table_name, output_dir, segments, chunk_items, compress_level):
+    """Export one table into a new directory under output_dir; returns the manifest"""
+    directory = Path(output_dir) / "{}-{}".format(table_name, utc_stamp())
+    directory.mkdir(parents=True)
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "table": table_name,
+        "format": "ndjson",
+        "compression": "gzip",
+        "segments": segments,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        **table_schema(table_name),
+    }
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=segments, thread_name_prefix="export") as executor:
+        futures = [
+            executor.submit(export_segment, table_name, segment, segments, directory, chunk_items, compress_level)
+            for segment in range(segments)
+        ]
+        files = [part for future in futures for part in future.result()]
+
+    manifest.update({
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "seconds": round(time.perf_counter() - started, 3),
+        "items": sum(part["items"] for part in files),
+        "bytes": sum(part["bytes"] for part in files),
+        "files": files,
+    })
+    with open(directory / MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return directory, manifest
+
+
+def read_items(path):
+    """Items of one part file, with numbers as int or Decimal"""
+    with gzip.open(path, "rt", encoding="utf-8") as stream:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line, parse_float=Decimal)
+
+
+def restore_table(directory, table_name, workers, create_table, progress_every):
+    """Write every item of an export into table_name; returns (items written, seconds)"""
+    from shared.dynamodb_utils import BATCH_WRITE_MAX_ITEMS, batch_write_items, create_table_if_not_exists
+
+    directory = Path(directory)
+    with open(directory / MANIFEST) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError("Unsupported manifest version {}".format(manifest.get("version")))
+    table_name = table_name or manifest["table"]
+
+    if create_table and not create_table_if_not_exists(
+        table_name, manifest["key_schema"], manifest["attribute_definitions"],
+        global_secondary_indexes=manifest["global_secondary_indexes"] or None
+    ):
+        raise RuntimeError("Could not create table {}".format(table_name))
+
+    started = time.perf_counter()
+    written = 0
+    next_progress = progress_every
+    writes = set()
+
+    def collect(done):
+        nonlocal written, next_progress
+        for write in done:
+            writes.discard(write)
+            written += write.result()
+        if written >= next_progress:
+            next_progress = (written // progress_every + 1) * progress_every
+            print("[INFO] {}: {} of {} items restored".format(table_name, written, manifest["items"]))
+
+    # Parts are decoded here in turn while up to 2 * workers batches are being written
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="restore") as executor:
+        try:
+            for part in manifest["files"]:
+                batch = []
+                for item in read_items(directory / part["name"]):
+                    batch.append(item)
+                    if len(batch) == BATCH_WRITE_MAX_ITEMS:
+                        while len(writes) >= 2 * workers:
+                            collect(wait(writes, return_when=FIRST_COMPLETED).done)
+                        writes.add(executor.submit(batch_write_items, table_name, batch))
+                        batch = []
+                if batch:
+                    writes.add(executor.submit(batch_write_items, table_name, batch))
+            collect(wait(writes).done)
+        finally:
+            for write in writes:
+                write.cancel()
+
+    if written != manifest["items"]:
+        print("[WARNING] {}: restored {} items, manifest lists {}".format(table_name, written, manifest["items"]))
+    return table_name, written, time.perf_counter() - started
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Export DynamoDB tables to compressed NDJSON, or restore an export")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Export tables with a parallel scan")
+    export.add_argument("tables", nargs="*", help="Tables to export (default: the products and carts tables)")
+    export.add_argument("--output-dir", default="exports", help="Directory for the exports (default: exports)")
+    export.add_argument("--segments", type=int, default=8, help="Parallel scan segments, one thread each (default: 8)")
+    export.add_argument("--chunk-items", type=int, default=100000, help="Items per part file (default: 100000)")
+    export.add_argument("--compress-level", type=int, default=6, choices=range(1, 10), metavar="1-9",
+                        help="gzip compression level (default: 6)")
+
+    restore = commands.add_parser("restore", help="Restore exports written by export")
+    restore.add_argument("exports", nargs="+", help="Export directories (each holds a manifest.json)")
+    restore.add_argument("--table", default=None, help="Restore into this table (default: the exported table)")
+    restore.add_argument("--workers", type=int, default=16, help="Parallel BatchWriteItem writers (default: 16)")
+    restore.add_argument("--create-table", action="store_true", help="Create the table from the exported schema if missing")
+    restore.add_argument("--progress-every", type=int, default=100000, help="Print progress every N restored items")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from shared.dynamodb_utils import DynamoDBError
+    from botocore.exceptions import ClientError
+
+    if args.command == "export":
+        if args.segments < 1 or args.chunk_items < 1:
+            parser.error("--segments and --chunk-items must be positive")
+        from shared.env_config import config
+
+        for table_name in args.tables or [config.PRODUCTS_TABLE_NAME, config.CARTS_TABLE_NAME]:
+            print("[INFO] Exporting {} with {} segments...".format(table_name, args.segments))
+            try:
+                directory, manifest = export_table(
+                    table_name, args.output_dir, args.segments, args.chunk_items, args.compress_level)
+            except (DynamoDBError, ClientError) as e:
+                print("[ERROR] Export of {} failed: {}".format(table_name, e))
+                sys.exit(1)
+            print("[SUCCESS] Exported {} items ({} files, {:.1f} MB) to {} in {:.1f}s ({:.0f} items/s)".format(
+                manifest["items"], len(manifest["files"]), manifest["bytes"] / 1e6, directory,
+                manifest["seconds"], manifest["items"] / manifest["seconds"] if manifest["seconds"] else 0))
+        return
+
+    if args.table and len(args.exports) > 1:
+        parser.error("--table needs exactly one export")
+    for directory in args.exports:
+        print("[INFO] Restoring {}...".format(directory))
+        try:
+            table_name, written, seconds = restore_table(
+                directory, args.table, args.workers, args.create_table, args.progress_every)
+        except (DynamoDBError, ClientError, OSError, ValueError, RuntimeError) as e:
+            print("[ERROR] Restore of {} failed: {}".format(directory, e))
+            sys.exit(1)
+        print("[SUCCESS] Restored {} items into {} in {:.1f}s ({:.0f} items/s)".format(
+            written, table_name, seconds, written / seconds if seconds else 0))
+
+
+if __name__ == "__main__":
+    main()
@@ -178,15 +178,19 @@ module "lambda" {
   # DynamoDB Configuration
   products_table_name        = module.dynamodb.products_table_name
   carts_table_name          = module.dynamodb.carts_table_name
+  reservations_table_name   = module.dynamodb.reservations_table_name
+  stock_shards_table_name   = module.dynamodb.stock_shards_table_name
   
   # Lambda Configuration
   lambda_memory_size       = var.lambda_memory_size
   lambda_timeout          = var.lambda_timeout
   lambda_architecture     = var.lambda_architecture
+  cart_product_read_mode  = var.cart_product_read_mode
   enable_provisioned_concurrency = var.enable_provisioned_concurrency
   
   # Application Configuration
   jwt_secret_key            = var.jwt_secret_key
+  service_api_key           = var.service_api_key
   aws_region               = var.aws_region
   
   # Cognito Configuration
@@ -328,6 +332,8 @@ resource "null_resource" "update_lambda_env" {
       IDENTITY_POOL_ID=${module.cognito.identity_pool_id}
       PRODUCTS_TABLE=${module.dynamodb.products_table_name}
       CARTS_TABLE=${module.dynamodb.carts_table_name}
+      RESERVATIONS_TABLE=${module.dynamodb.reservations_table_name}
+      STOCK_SHARDS_TABLE=${module.dynamodb.stock_shards_table_name}
 
       PRODUCT_FN_NAME=${var.project_name}-${var.environment}-product-service
       CART_FN_NAME=${var.project_name}-${var.environment}-cart-service
@@ -335,11 +341,11 @@ resource "null_resource" "update_lambda_env" {
 
       aws lambda update-function-configuration --region $REGION \
         --function-name "$PRODUCT_FN_NAME" \
-        --environment "Variables={ENV=${var.environment},PRODUCTS_TABLE_NAME=$PRODUCTS_TABLE,USE_COGNITO_AUTH=true,COGNITO_USER_POOL_ID=$USER_POOL_ID,COGNITO_WEB_CLIENT_ID=$WEB_CLIENT_ID,JWT_SECRET_KEY=${var.jwt_secret_key}}"
+        --environment "Variables={ENV=${var.environment},PRODUCTS_TABLE_NAME=$PRODUCTS_TABLE,RESERVATIONS_TABLE_NAME=$RESERVATIONS_TABLE,STOCK_SHARDS_TABLE_NAME=$STOCK_SHARDS_TABLE,USE_COGNITO_AUTH=true,COGNITO_USER_POOL_ID=$USER_POOL_ID,COGNITO_WEB_CLIENT_ID=$WEB_CLIENT_ID,JWT_SECRET_KEY=${var.jwt_secret_key},SERVICE_API_KEY=${var.service_api_key}}"
 
       aws lambda update-function-configuration --region $REGION \
         --function-name "$CART_FN_NAME" \
-        --environment "Variables={ENV=${var.environment},CARTS_TABLE_NAME=$CARTS_TABLE,PRODUCTS_TABLE_NAME=$PRODUCTS_TABLE,USE_COGNITO_AUTH=true,COGNITO_USER_POOL_ID=$USER_POOL_ID,COGNITO_WEB_CLIENT_ID=$WEB_CLIENT_ID,COGNITO_API_CLIENT_ID=$API_CLIENT_ID,JWT_SECRET_KEY=${var.jwt_secret_key},PRODUCT_SERVICE_URL=${module.api_gateway.api_url}/api}"
+        --environment "Variables={ENV=${var.environment},CARTS_TABLE_NAME=$CARTS_TABLE,PRODUCTS_TABLE_NAME=$PRODUCTS_TABLE,RESERVATIONS_TABLE_NAME=$RESERVATIONS_TABLE,STOCK_SHARDS_TABLE_NAME=$STOCK_SHARDS_TABLE,PRODUCT_READ_MODE=${var.cart_product_read_mode},USE_COGNITO_AUTH=true,COGNITO_USER_POOL_ID=$USER_POOL_ID,COGNITO_WEB_CLIENT_ID=$WEB_CLIENT_ID,COGNITO_API_CLIENT_ID=$API_CLIENT_ID,JWT_SECRET_KEY=${var.jwt_secret_key},SERVICE_API_KEY=${var.service_api_key},PRODUCT_SERVICE_URL=${module.api_gateway.api_url}/api}"
 
       aws lambda update-function-configuration --region $REGION \
         --function-name "$FRONTEND_FN_NAME" \
@@ -355,6 +361,8 @@ resource "null_resource" "update_lambda_env" {
     identity_pool      = module.cognito.identity_pool_id
     products_table     = module.dynamodb.products_table_name
     carts_table        = module.dynamodb.carts_table_name
+    reservations_table = module.dynamodb.reservations_table_name
+    stock_shards_table = module.dynamodb.stock_shards_table_name
     # Force re-run on any code change
     product_src_sha    = sha1(join("", [for f in fileset("${path.root}/../backend", "product-service/**") : filesha1("${path.root}/../backend/${f}")]))
     cart_src_sha       = sha1(join("", [for f in fileset("${path.root}/../backend", "cart-service/**") : filesha1("${path.root}/../backend/${f}")]))
@@ -82,6 +82,89 @@ resource "aws_dynamodb_table" "carts" {
   }
 }
 
+# Stock Reservations Table
+# Expired reservations are returned to stock by product-service, so DynamoDB TTL
+# is deliberately not enabled on expires_at (it would delete them without restocking).
+resource "aws_dynamodb_table" "reservations" {
+  name           = "${var.project_name}-${var.environment}-reservations"
+  billing_mode   = var.billing_mode
+  hash_key       = "reservation_id"
+
+  attribute {
+    name = "reservation_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "product_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "expires_at"
+    type = "N"
+  }
+
+  # Global Secondary Index for finding a product's expired reservations
+  global_secondary_index {
+    name            = "product-expiry-index"
+    hash_key        = "product_id"
+    range_key       = "expires_at"
+    projection_type = "KEYS_ONLY"
+  }
+
+  # Enable point-in-time recovery
+  point_in_time_recovery {
+    enabled = var.enable_point_in_time_recovery
+  }
+
+  # Server-side encryption
+  server_side_encryption {
+    enabled = true
+  }
+
+  # Deletion protection for production
+  deletion_protection_enabled = var.deletion_protection
+
+  tags = {
+    Name        = "${var.project_name}-${var.environment}-reservations"
+    Environment = var.environment
+    Service     = "product-service"
+  }
+}
+
+# Stock Shards Table
+# Sharded stock counters for hot products (<product_id>#<n>, one partition per shard)
+resource "aws_dynamodb_table" "stock_shards" {
+  name           = "${var.project_name}-${var.environment}-stock-shards"
+  billing_mode   = var.billing_mode
+  hash_key       = "shard_id"
+
+  attribute {
+    name = "shard_id"
+    type = "S"
+  }
+
+  # Enable point-in-time recovery
+  point_in_time_recovery {
+    enabled = var.enable_point_in_time_recovery
+  }
+
+  # Server-side encryption
+  server_side_encryption {
+    enabled = true
+  }
+
+  # Deletion protection for production
+  deletion_protection_enabled = var.deletion_protection
+
+  tags = {
+    Name        = "${var.project_name}-${var.environment}-stock-shards"
+    Environment = var.environment
+    Service     = "product-service"
+  }
+}
+
 # IAM Role for ECS tasks to access DynamoDB
 resource "aws_iam_role" "dynamodb_access_role" {
   name = "${var.project_name}-${var.environment}-dynamodb-access"
@@ -128,8 +211,11 @@ resource "aws_iam_policy" "dynamodb_access_policy" {
         Resource = [
           aws_dynamodb_table.products.arn,
           aws_dynamodb_table.carts.arn,
+          aws_dynamodb_table.reservations.arn,
+          aws_dynamodb_table.stock_shards.arn,
           "${aws_dynamodb_table.products.arn}/index/*",
-          "${aws_dynamodb_table.carts.arn}/index/*"
+          "${aws_dynamodb_table.carts.arn}/index/*",
+          "${aws_dynamodb_table.reservations.arn}/index/*"
         ]
       }
     ]
@@ -18,6 +18,26 @@ output "carts_table_arn" {
   value       = aws_dynamodb_table.carts.arn
 }
 
+output "reservations_table_name" {
+  description = "Name of the stock reservations DynamoDB table"
+  value       = aws_dynamodb_table.reservations.name
+}
+
+output "reservations_table_arn" {
+  description = "ARN of the stock reservations DynamoDB table"
+  value       = aws_dynamodb_table.reservations.arn
+}
+
+output "stock_shards_table_name" {
+  description = "Name of the stock shards DynamoDB table"
+  value       = aws_dynamodb_table.stock_shards.name
+}
+
+output "stock_shards_table_arn" {
+  description = "ARN of the stock shards DynamoDB table"
+  value       = aws_dynamodb_table.stock_shards.arn
+}
+
 output "dynamodb_access_role_arn" {
   description = "ARN of the DynamoDB access role"
   value       = aws_iam_role.dynamodb_access_role.arn
@@ -27,7 +47,9 @@ output "table_names" {
   description = "Map of all table names"
   value = {
     products = aws_dynamodb_table.products.name
-    carts    = aws_dynamodb_table.carts.name
+    carts        = aws_dynamodb_table.carts.name
+    reservations = aws_dynamodb_table.reservations.name
+    stock_shards = aws_dynamodb_table.stock_shards.name
   }
 }
 
@@ -35,6 +57,8 @@ output "table_arns" {
   description = "Map of all table ARNs"
   value = {
     products = aws_dynamodb_table.products.arn
-    carts    = aws_dynamodb_table.carts.arn
+    carts        = aws_dynamodb_table.carts.arn
+    reservations = aws_dynamodb_table.reservations.arn
+    stock_shards = aws_dynamodb_table.stock_shards.arn
   }
 }
@@ -56,8 +56,11 @@ resource "aws_iam_role_policy" "lambda_dynamodb_policy" {
         Resource = [
           "arn:aws:dynamodb:${var.aws_region}:*:table/${var.products_table_name}",
           "arn:aws:dynamodb:${var.aws_region}:*:table/${var.carts_table_name}",
+          "arn:aws:dynamodb:${var.aws_region}:*:table/${var.reservations_table_name}",
+          "arn:aws:dynamodb:${var.aws_region}:*:table/${var.stock_shards_table_name}",
           "arn:aws:dynamodb:${var.aws_region}:*:table/${var.products_table_name}/*",
-          "arn:aws:dynamodb:${var.aws_region}:*:table/${var.carts_table_name}/*"
+          "arn:aws:dynamodb:${var.aws_region}:*:table/${var.carts_table_name}/*",
+          "arn:aws:dynamodb:${var.aws_region}:*:table/${var.reservations_table_name}/*"
         ]
       }
     ]
@@ -100,10 +103,13 @@ resource "aws_lambda_function" "product_service" {
       ENV                    = var.environment
       DYNAMODB_ENDPOINT     = ""  # Use default AWS DynamoDB
       PRODUCTS_TABLE_NAME   = var.products_table_name
+      RESERVATIONS_TABLE_NAME = var.reservations_table_name
+      STOCK_SHARDS_TABLE_NAME = var.stock_shards_table_name
       USE_COGNITO_AUTH      = "true"
       COGNITO_USER_POOL_ID  = var.cognito_user_pool_id
       COGNITO_WEB_CLIENT_ID = var.cognito_web_client_id
       JWT_SECRET_KEY        = var.jwt_secret_key
+      SERVICE_API_KEY       = var.service_api_key
     }
   }
 
@@ -150,11 +156,15 @@ resource "aws_lambda_function" "cart_service" {
       DYNAMODB_ENDPOINT      = ""  # Use default AWS DynamoDB
       CARTS_TABLE_NAME       = var.carts_table_name
       PRODUCTS_TABLE_NAME    = var.products_table_name
+      RESERVATIONS_TABLE_NAME = var.reservations_table_name
+      STOCK_SHARDS_TABLE_NAME = var.stock_shards_table_name
+      PRODUCT_READ_MODE      = var.cart_product_read_mode
       USE_COGNITO_AUTH       = "true"
       COGNITO_USER_POOL_ID   = var.cognito_user_pool_id
       COGNITO_WEB_CLIENT_ID  = var.cognito_web_client_id
       COGNITO_API_CLIENT_ID  = var.cognito_api_client_id
       JWT_SECRET_KEY         = var.jwt_secret_key
+      SERVICE_API_KEY        = var.service_api_key
       PRODUCT_SERVICE_URL    = "internal"  # Will be handled by API Gateway
     }
   }
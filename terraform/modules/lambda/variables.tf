@@ -66,6 +66,16 @@ variable "lambda_architecture" {
   }
 }
 
+variable "cart_product_read_mode" {
+  description = "How cart-service reads product price and stock: http (through product-service) or direct (products table)"
+  type        = string
+  default     = "direct"
+  validation {
+    condition     = contains(["http", "direct"], var.cart_product_read_mode)
+    error_message = "Product read mode must be either http or direct."
+  }
+}
+
 # Environment Variables
 variable "jwt_secret_key" {
   description = "JWT secret key for authentication"
@@ -73,6 +83,12 @@ variable "jwt_secret_key" {
   sensitive   = true
 }
 
+variable "service_api_key" {
+  description = "Key cart-service sends to product-service's reservation endpoints (X-Service-Key)"
+  type        = string
+  sensitive   = true
+}
+
 variable "aws_region" {
   description = "AWS region"
   type        = string
@@ -88,6 +104,16 @@ variable "carts_table_name" {
   type        = string
 }
 
+variable "reservations_table_name" {
+  description = "DynamoDB stock reservations table name"
+  type        = string
+}
+
+variable "stock_shards_table_name" {
+  description = "DynamoDB sharded stock counters table name"
+  type        = string
+}
+
 # Cognito Configuration
 variable "cognito_user_pool_id" {
   description = "Cognito User Pool ID"
@@ -53,6 +53,13 @@ variable "jwt_secret_key" {
   default     = "change-this-in-production-use-secrets-manager"
 }
 
+variable "service_api_key" {
+  description = "Key cart-service sends to product-service's reservation endpoints (X-Service-Key)"
+  type        = string
+  sensitive   = true
+  default     = "change-this-in-production-use-secrets-manager"
+}
+
 # Lambda Configuration
 variable "lambda_memory_size" {
   description = "Memory size for Lambda functions (MB)"
@@ -76,6 +83,16 @@ variable "lambda_architecture" {
   }
 }
 
+variable "cart_product_read_mode" {
+  description = "How cart-service reads product price and stock: http (through product-service) or direct (products table)"
+  type        = string
+  default     = "direct"
+  validation {
+    condition     = contains(["http", "direct"], var.cart_product_read_mode)
+    error_message = "Product read mode must be either http or direct."
+  }
+}
+
 # Provisioned Concurrency (optional)
 variable "enable_provisioned_concurrency" {
   description = "Enable provisioned concurrency for Lambda functions"